@@ -0,0 +1,187 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import time
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class MultiPositionAcquisition(QObject):
+    """
+    Walks a list of stage positions and channels, capturing one frame per
+    (position, channel), for one or more rounds. Runs in the GUI thread as a
+    small state machine (no blocking waits):
+
+        move/switch -> settle_ms -> skip settle_frames frames -> grab -> save
+                                                                           |
+        next move is issued once save() has queued the image, while it encodes
+
+    Callables supplied by the owner:
+    - send(bytes)                     serial command (MOVE:x,y / CHAN:n); returns
+                                      None if it could not be queued, which stops
+                                      the run with error()
+    - grab() -> (img, bits, meta)     copy of the newest full-depth frame, or None
+    - save(img, bits, meta, name)     queue the image for writing (must not block)
+    - move(x, y), channel(c)          optional local hooks, e.g. to update the preview/tint
+    frame_arrived() must be connected to a per-frame signal (processor.imageReady).
+    Positions are (x, y) stage coordinates; channels are channel indices.
+    """
+
+    progress = Signal(int, int, int)      # round, position index, channel index (after each capture)
+    roundFinished = Signal(int, float)    # round, cycle time in seconds
+    finished = Signal()
+    error = Signal(str)
+
+    def __init__(self, send, grab, save, move=None, channel=None, parent=None):
+        super().__init__(parent)
+        self._send = send
+        self._grab = grab
+        self._save = save
+        self._move = move
+        self._channel = channel
+        self.positions: list[tuple[float, float]] = []
+        self.channels: list[int] = [0]
+        self.settle_ms = 150
+        self.settle_frames = 1  # frames exposed (partly) before the move finished
+        self.rounds = 1
+        self.running = False
+        self.cycle_times: list[float] = []
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.timeout.connect(self._on_settled)
+        self._steps: list[tuple[int, int]] = []
+        self._step = 0
+        self._round = 0
+        self._last_round = 0
+        self._round_t0 = 0.0
+        self._skip = -1  # frames still to discard; -1 = not waiting for a frame
+        self._cur_pos = None
+        self._cur_chan = None
+
+    # --- position list ---
+    def add_position(self, x: float, y: float) -> int:
+        self.positions.append((float(x), float(y)))
+        return len(self.positions)
+
+    def clear_positions(self):
+        if not self.running:
+            self.positions.clear()
+
+    # --- control ---
+    def start(self, rounds: int | None = None, first_round: int = 1) -> bool:
+        """
+        Run rounds (default self.rounds) rounds, numbered from first_round in
+        file names. Returns False (and emits error) if the first round could
+        not be started.
+        """
+        if self.running:
+            return False
+        if rounds is not None:
+            self.rounds = max(1, int(rounds))
+        self._last_round = first_round - 1 + self.rounds
+        # no list: capture where we are (position index None, no MOVE)
+        indices = range(len(self.positions)) if self.positions else [None]
+        # position-major order: one move per position, channels switched in place
+        self._steps = [(p, c) for p in indices for c in (self.channels or [None])]
+        self._cur_pos = None
+        self._cur_chan = None
+        self._round = first_round - 1
+        self.cycle_times = []
+        try:
+            self._start_round()
+        except Exception as e:
+            self.stop()
+            self.error.emit(f"Acquisition failed to start: {e}")
+            return False
+        self.running = True
+        return True
+
+    def stop(self):
+        self.running = False
+        self._settle_timer.stop()
+        self._skip = -1
+
+    def frame_arrived(self, *_args):
+        if self._skip < 0 or not self.running:
+            return
+        if self._skip > 0:
+            self._skip -= 1
+            return
+        self._skip = -1
+        self._capture()
+
+    # --- state machine ---
+    def _start_round(self):
+        self._round += 1
+        self._round_t0 = time.perf_counter()
+        self._step = 0
+        self._go()
+
+    def _go(self):
+        p, c = self._steps[self._step]
+        moved = False
+        if p is not None and p != self._cur_pos:
+            x, y = self.positions[p]
+            self._command(f"MOVE:{x:.4f},{y:.4f}\r\n".encode("utf-8"))
+            if self._move is not None:
+                self._move(x, y)
+            self._cur_pos = p
+            moved = True
+        if c is not None and c != self._cur_chan:
+            self._command(f"CHAN:{c}\r\n".encode("utf-8"))
+            if self._channel is not None:
+                self._channel(c)
+            self._cur_chan = c
+            moved = True
+        if moved:
+            self._settle_timer.start(self.settle_ms)
+        else:
+            self._skip = self.settle_frames  # may run from start(), before running is set
+
+    def _command(self, data: bytes):
+        if self._send(data) is None:
+            raise OSError(f"{data.strip().decode('utf-8', 'replace')} not sent (serial port not connected)")
+
+    def _on_settled(self):
+        if self.running:
+            self._skip = self.settle_frames
+
+    def _capture(self):
+        frame = self._grab()
+        if frame is None:
+            self.stop()
+            self.error.emit("No frame available")
+            return
+        img, bits, meta = frame
+        p, c = self._steps[self._step]
+        rnd = self._round
+        name = f"r{rnd:03d}_p{(p or 0):02d}_c{(c if c is not None else 0)}"
+        # save() only queues the image: the next move still overlaps with
+        # encoding/writing it
+        try:
+            self._save(img, bits, meta, name)
+        except Exception as e:
+            self.stop()
+            self.error.emit(f"Saving {name} failed: {e}")
+            return
+        self.progress.emit(rnd, p or 0, c if c is not None else -1)
+        self._step += 1
+        try:
+            self._advance()
+        except Exception as e:
+            self.stop()
+            self.error.emit(f"Acquisition stopped: {e}")
+
+    def _advance(self):
+        if self._step < len(self._steps):
+            self._go()
+            return
+        dt = time.perf_counter() - self._round_t0
+        self.cycle_times.append(dt)
+        self.roundFinished.emit(self._round, dt)
+        self._step = 0
+        if self._round >= self._last_round:
+            self.running = False
+            self.finished.emit()
+        else:
+            self._start_round()
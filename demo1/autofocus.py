@@ -0,0 +1,423 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import time
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+def _roi(img: np.ndarray, roi: float, max_side: int) -> np.ndarray:
+    """Central ROI (fraction of each side), stride-reduced to about max_side, as float32."""
+    h, w = img.shape[:2]
+    rh, rw = max(8, int(h * roi)), max(8, int(w * roi))
+    y0, x0 = (h - rh) // 2, (w - rw) // 2
+    crop = img[y0:y0 + rh, x0:x0 + rw]
+    k = max(1, -(-max(rh, rw) // max_side))
+    if k > 1:
+        # area average keeps the high frequencies better than plain decimation
+        crop = cv2.resize(crop, (max(8, rw // k), max(8, rh // k)), interpolation=cv2.INTER_AREA)
+    return crop.astype(np.float32)
+
+
+def variance_of_laplacian(f: np.ndarray) -> float:
+    return float(cv2.Laplacian(f, cv2.CV_32F, ksize=3).var())
+
+
+def brenner(f: np.ndarray) -> float:
+    d = f[:, 2:] - f[:, :-2]
+    return float(np.mean(d * d))
+
+
+def tenengrad(f: np.ndarray) -> float:
+    gx = cv2.Sobel(f, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(f, cv2.CV_32F, 0, 1, ksize=3)
+    return float(np.mean(gx * gx + gy * gy))
+
+
+METRICS = {
+    "laplacian": variance_of_laplacian,
+    "brenner": brenner,
+    "tenengrad": tenengrad,
+}
+
+
+def focus_metric(img: np.ndarray, method: str = "laplacian", roi: float = 0.5, max_side: int = 256) -> float:
+    """
+    Sharpness of the central ROI, normalized by the squared mean intensity so
+    values do not follow exposure/bleaching changes between steps.
+    """
+    f = _roi(img, roi, max_side)
+    m = float(f.mean())
+    return METRICS[method](f) / (m * m + 1e-6)
+
+
+def _send_focus(send, pos: int):
+    """FOCUS:<pos> over send(); raises OSError when it could not be queued (send returned None)."""
+    if send(f"FOCUS:{pos}\r\n".encode("utf-8")) is None:
+        raise OSError(f"FOCUS:{pos} not sent (serial port not connected)")
+
+
+class Autofocus(QObject):
+    """
+    Coarse-to-fine focus search over the serial focus axis (FOCUS:<steps>).
+
+    Coarse pass: scan center +- coarse_range in coarse_step steps, starting
+    at the near end and stopping once the metric has fallen drop_ratio below
+    the best value for two consecutive steps (past the peak). A peak only
+    counts once it stands peak_ratio above the lowest value seen, so the
+    noise floor far from focus cannot end the scan. Fine pass: the
+    same around the coarse peak with fine_step, then a parabola through the
+    best sample and its neighbours gives the final position.
+
+    Each step = move -> settle_ms -> skip settle_frames -> metric of the next
+    frame. The metric is computed in the FrameProcessor thread (analyze() is
+    registered as a processor analyzer); only the number travels to the GUI
+    thread. Per-step timings (move/settle, frame wait, metric) are collected
+    in steps and emitted with stepDone(dict).
+
+    A FOCUS command that cannot be sent, or no frame within frame_timeout_ms
+    of a step settling, ends the run with error(str) instead of finished.
+    """
+
+    stepDone = Signal(dict)
+    finished = Signal(int, float, dict)  # best position, its metric, summary
+    error = Signal(str)
+    _measured = Signal(float, float)     # metric, metric ms (processor thread -> GUI thread)
+
+    def __init__(self, send, parent=None):
+        super().__init__(parent)
+        self._send = send
+        self.method = "laplacian"
+        self.roi = 0.5
+        self.max_side = 256
+        self.coarse_range = 2000
+        self.coarse_step = 250
+        self.fine_step = 25
+        self.drop_ratio = 0.15
+        self.peak_ratio = 1.0
+        self.settle_ms = 60
+        self.settle_frames = 1
+        self.frame_timeout_ms = 2000  # per step, from settled to the measured frame
+        self.position = 0  # current commanded focus position (steps)
+        self.running = False
+        self.steps: list[dict] = []
+        self._wanted = False  # analyzer measures only while a step is waiting
+        self._skip = 0
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.timeout.connect(self._on_settled)
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.timeout.connect(self._on_frame_timeout)
+        self._measured.connect(self._on_measured)
+        self._samples: dict[int, float] = {}
+        self._queue: list[int] = []
+        self._phase = ""
+        self._best_seen = 0.0
+        self._min_seen = float("inf")
+        self._falls = 0
+        self._t0 = 0.0
+        self._step_t0 = 0.0
+        self._wait_t0 = 0.0
+
+    # --- processor thread ---
+    def analyze(self, img: np.ndarray, _bits: int, _meta: dict):
+        """FrameProcessor analyzer: measure one frame when a step asks for it."""
+        if not self._wanted:
+            return
+        if self._skip > 0:
+            self._skip -= 1
+            return
+        self._wanted = False
+        t0 = time.perf_counter()
+        value = focus_metric(img, self.method, self.roi, self.max_side)
+        self._measured.emit(value, (time.perf_counter() - t0) * 1000.0)
+
+    # --- control (GUI thread) ---
+    def start(self, position: int | None = None):
+        if self.running:
+            return
+        if position is not None:
+            self.position = int(position)
+        self.running = True
+        self.steps = []
+        self._samples = {}
+        self._t0 = time.perf_counter()
+        try:
+            self._begin_pass("coarse", self.position, self.coarse_range, self.coarse_step)
+        except Exception as e:
+            self._fail(f"Autofocus failed to start: {e}")
+
+    def stop(self):
+        self.running = False
+        self._wanted = False
+        self._settle_timer.stop()
+        self._frame_timer.stop()
+
+    def _fail(self, message: str):
+        self.stop()
+        self.error.emit(message)
+
+    def _begin_pass(self, phase: str, center: int, half_range: int, step: int):
+        self._phase = phase
+        self._best_seen = 0.0
+        self._min_seen = float("inf")
+        self._falls = 0
+        n = max(1, half_range // step)
+        self._queue = [center + i * step for i in range(-n, n + 1)]
+        self._next_step()
+
+    def _next_step(self):
+        while self._queue and self._queue[0] in self._samples:
+            pos = self._queue.pop(0)  # already measured in the coarse pass
+            self._track(self._samples[pos])
+        if not self._queue or self._falls >= 2:
+            self._end_pass()
+            return
+        pos = self._queue.pop(0)
+        self._step_t0 = time.perf_counter()
+        self._move(pos)
+        self._settle_timer.start(self.settle_ms)
+
+    def _move(self, pos: int):
+        self.position = pos
+        _send_focus(self._send, pos)
+
+    def _on_settled(self):
+        if not self.running:
+            return
+        self._wait_t0 = time.perf_counter()
+        self._skip = self.settle_frames
+        self._wanted = True
+        self._frame_timer.start(self.frame_timeout_ms)
+
+    def _on_frame_timeout(self):
+        if self.running and self._wanted:
+            self._fail(f"No frame within {self.frame_timeout_ms} ms at focus {self.position}")
+
+    def _on_measured(self, value: float, metric_ms: float):
+        if not self.running:
+            return
+        self._frame_timer.stop()
+        now = time.perf_counter()
+        self._samples[self.position] = value
+        step = {
+            "phase": self._phase,
+            "position": self.position,
+            "metric": value,
+            "settle_ms": (self._wait_t0 - self._step_t0) * 1000.0,
+            "frame_wait_ms": (now - self._wait_t0) * 1000.0 - metric_ms,
+            "metric_ms": metric_ms,
+            "step_ms": (now - self._step_t0) * 1000.0,
+        }
+        self.steps.append(step)
+        self.stepDone.emit(step)
+        self._track(value)
+        try:
+            self._next_step()
+        except Exception as e:
+            self._fail(f"Autofocus stopped: {e}")
+
+    def _track(self, value: float):
+        self._min_seen = min(self._min_seen, value)
+        if value > self._best_seen:
+            self._best_seen = value
+            self._falls = 0
+        elif (value < self._best_seen * (1.0 - self.drop_ratio)
+              and self._best_seen > self._min_seen * (1.0 + self.peak_ratio)):
+            self._falls += 1
+
+    def _end_pass(self):
+        best = max(self._samples, key=self._samples.get)
+        if self._phase == "coarse":
+            self._begin_pass("fine", best, self.coarse_step, self.fine_step)
+            return
+        target = self._refine(best)
+        self._move(target)
+        self.running = False
+        total_ms = (time.perf_counter() - self._t0) * 1000.0
+        summary = {
+            "frames": len(self.steps),
+            "total_ms": total_ms,
+            "coarse_steps": sum(1 for s in self.steps if s["phase"] == "coarse"),
+            "fine_steps": sum(1 for s in self.steps if s["phase"] == "fine"),
+            "mean_step_ms": total_ms / max(1, len(self.steps)),
+            "method": self.method,
+        }
+        self.finished.emit(target, self._samples[best], summary)
+
+    def _refine(self, best: int) -> int:
+        """Vertex of the parabola through best and its nearest measured neighbours."""
+        below = [p for p in self._samples if p < best]
+        above = [p for p in self._samples if p > best]
+        if not below or not above:
+            return best
+        x0, x2 = max(below), min(above)
+        y0, y1, y2 = self._samples[x0], self._samples[best], self._samples[x2]
+        # general three-point parabola (samples need not be evenly spaced)
+        denom = (x0 - best) * (x0 - x2) * (best - x2)
+        if denom == 0:
+            return best
+        a = (x2 * (y1 - y0) + best * (y0 - y2) + x0 * (y2 - y1)) / denom
+        b = (x2 * x2 * (y0 - y1) + best * best * (y2 - y0) + x0 * x0 * (y1 - y2)) / denom
+        if a >= 0:
+            return best
+        return int(round(min(x2, max(x0, -b / (2 * a)))))
+
+
+class FocusTracker(QObject):
+    """
+    Keeps focus during long runs with small corrective FOCUS moves.
+
+    analyze() (a FrameProcessor analyzer) measures a cheap metric on every
+    every_n-th frame under a strict time budget: when one measurement takes
+    longer than budget_ms the ROI is downscaled further, and once at the
+    smallest size the stride grows instead; when it runs well under budget
+    the effort is restored. The work per processed frame therefore stays
+    bounded and the live frame rate is not affected.
+
+    In the GUI thread the tracker holds while the metric stays within
+    tolerance of a slowly adapting reference. When it drops, it steps the
+    focus axis (keeping the last successful direction), reverses once if that
+    makes it worse, and settles on the best position seen, never further
+    than max_excursion from where the search began. A FOCUS command that
+    cannot be sent disables tracking and is reported with error(str).
+    """
+
+    corrected = Signal(int, float)  # new focus position, its metric
+    statsUpdated = Signal(dict)
+    error = Signal(str)
+    _measured = Signal(float, float)  # metric, metric ms (processor thread -> GUI thread)
+
+    def __init__(self, send, parent=None):
+        super().__init__(parent)
+        self._send = send
+        self.every_n = 10
+        self.method = "brenner"
+        self.roi = 0.4
+        self.max_side = 128
+        self.min_side = 32
+        self.budget_ms = 2.0
+        self.step = 10
+        self.tolerance = 0.1
+        self.max_excursion = 200
+        self.position = 0
+        self.enabled = False
+        self.corrections = 0
+        self._measured.connect(self._on_measured)
+        # processor-thread state
+        self._count = 0
+        self._stride = self.every_n
+        self._side = self.max_side
+        self._last_ms = 0.0
+        # GUI-thread state
+        self._state = "hold"
+        self._ref = None
+        self._dir = 1
+        self._origin = 0
+        self._best = (0, 0.0)
+        self._reversed = False
+        self._discard = 0
+
+    # --- processor thread ---
+    def analyze(self, img: np.ndarray, _bits: int, _meta: dict):
+        if not self.enabled:
+            return
+        self._count += 1
+        if self._count < self._stride:
+            return
+        self._count = 0
+        t0 = time.perf_counter()
+        value = focus_metric(img, self.method, self.roi, self._side)
+        ms = (time.perf_counter() - t0) * 1000.0
+        self._last_ms = ms
+        if ms > self.budget_ms:
+            if self._side > self.min_side:
+                self._side = max(self.min_side, self._side // 2)
+            else:
+                self._stride = min(self._stride * 2, self.every_n * 16)
+        elif ms < self.budget_ms / 3:
+            if self._stride > self.every_n:
+                self._stride = max(self.every_n, self._stride // 2)
+            elif self._side < self.max_side:
+                self._side = min(self.max_side, self._side * 2)
+        self._measured.emit(value, ms)
+
+    # --- control (GUI thread) ---
+    def start(self, position: int):
+        self.position = int(position)
+        self._state = "hold"
+        self._ref = None
+        self._discard = 0
+        self._count = 0
+        self._stride = self.every_n
+        self._side = self.max_side
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def _move(self, pos: int):
+        self.position = pos
+        self._discard = 1  # the next measurement may straddle the move
+        _send_focus(self._send, pos)
+
+    def _on_measured(self, value: float, metric_ms: float):
+        if not self.enabled:
+            return
+        self.statsUpdated.emit({
+            "metric": value,
+            "metric_ms": metric_ms,
+            "every_n": self._stride,
+            "side": self._side,
+            "state": self._state,
+            "position": self.position,
+            "corrections": self.corrections,
+        })
+        if self._discard:
+            self._discard -= 1
+            return
+        try:
+            self._update(value)
+        except Exception as e:
+            self.enabled = False
+            self._state = "hold"
+            self.error.emit(f"Focus tracking stopped: {e}")
+
+    def _update(self, value: float):
+        if self._state == "hold":
+            if self._ref is None:
+                self._ref = value
+            elif value >= self._ref * (1.0 - self.tolerance):
+                self._ref = 0.9 * self._ref + 0.1 * value  # follow slow changes (bleaching)
+            else:
+                self._state = "search"
+                self._origin = self.position
+                self._best = (self.position, value)
+                self._reversed = False
+                self._move(self.position + self._dir * self.step)
+            return
+        # search
+        best_pos, best_val = self._best
+        if value > best_val:
+            self._best = (self.position, value)
+            nxt = self.position + self._dir * self.step
+            if abs(nxt - self._origin) <= self.max_excursion:
+                self._move(nxt)
+                return
+        elif not self._reversed:
+            self._reversed = True
+            self._dir = -self._dir
+            nxt = best_pos + self._dir * self.step
+            if abs(nxt - self._origin) <= self.max_excursion:
+                self._move(nxt)
+                return
+        best_pos, best_val = self._best
+        if best_pos != self.position:
+            self._move(best_pos)
+        self._state = "hold"
+        self._ref = best_val
+        self.corrections += 1
+        self.corrected.emit(best_pos, best_val)
@@ -0,0 +1,314 @@
+# This Python file uses the following encoding: utf-8
+"""
+End-to-end benchmark of the acquisition path on the synthetic camera:
+
+    camera handler -> FrameRing -> FrameProcessor -> output ring -> Widget._render_tick / update_video_label
+
+    python bench/pipeline_bench.py --sizes 1.3MP,5MP,12MP,20MP --formats Mono8,Mono12p --out bench.json
+
+Each run streams as fast as the pipeline allows (or at --fps) for --seconds
+after a warm-up and reports, as JSON:
+- fps:         frames delivered by the camera, processed, and shown
+- counters:    lost / incomplete / dropped frames
+- latency_ms:  per-stage p50/p95/p99/max, keyed by frame ID
+               transport  exposure start (device timestamp) -> raw copy done in the handler
+               queue      handler -> processing thread picks the frame up
+               process    decode + window + display chain + publish
+               display    published -> drawn by the render tick
+               total      exposure start -> drawn (frames that were drawn)
+- cpu:         process CPU time / wall time (1.0 = one core busy)
+- probes:      perf_probe stage timings (only with --probes; compare a run
+               without it to check the probe overhead)
+- alloc:       from a separate tracemalloc pass (--alloc-seconds): Python and
+               NumPy memory retained per processed frame, allocated blocks
+               retained per frame, and the peak of transient allocations
+The header records the commit, library versions and machine so that
+results of different commits can be compared.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["PCR_CAMERA_BACKEND"] = "synthetic"
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+import PySide6  # noqa: E402
+from PySide6.QtCore import Qt  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from perf_probe import probes  # noqa: E402
+from sim import synthetic_camera  # noqa: E402
+from widget import Widget  # noqa: E402
+
+# common machine-vision sensor sizes
+RESOLUTIONS = {
+    "1.3MP": (1280, 1024),
+    "2.3MP": (1936, 1216),
+    "5MP": (2448, 2048),
+    "12MP": (4096, 3000),
+    "20MP": (5472, 3648),
+}
+STAGES = ("transport", "queue", "process", "display", "total")
+
+
+class _BenchWidget(Widget):
+    """Widget with a fixed pixel format and a hook on every drawn frame."""
+
+    pixel_format = "Mono8"
+    on_shown = None
+
+    def _pixel_format_preference(self):
+        return (self.pixel_format,)
+
+    def _render_tick(self):
+        shown = self._frames_shown
+        super()._render_tick()
+        if self._frames_shown != shown and self.on_shown is not None:
+            self.on_shown(self._frame_ring.meta(self._held_slot))
+
+
+class _Probe:
+    """Per-frame timestamps (perf_counter seconds) keyed by camera frame ID."""
+
+    def __init__(self, cam, worker):
+        self.t0_device = cam._t0 / 1e9  # synthetic device clock starts at this perf_counter time
+        self._worker = worker
+        self.active = False
+        self.exposed = {}
+        self.handled = {}
+        self.picked = {}
+        self.published = {}
+        self.shown = {}
+
+    def tap(self, _raw, meta):  # camera thread, inside the handler
+        if self.active:
+            fid = meta["frame_id"]
+            self.handled[fid] = time.perf_counter()
+            clock = self._worker.clock  # latched device clock mapping, as used by LatencyTrace
+            if clock:
+                self.exposed[fid] = meta["timestamp"] * clock["scale"] + clock["offset"]
+            else:
+                self.exposed[fid] = self.t0_device + meta["timestamp"] / 1e9
+
+    def analyzer(self, _native, _bits, meta):  # processing thread, before the chain
+        if self.active:
+            self.picked[meta.get("frame_id")] = time.perf_counter()
+
+    def image_ready(self, meta_source):
+        def slot(_seq):  # processing thread (direct connection), after publish
+            if self.active:
+                self.published[meta_source().get("frame_id")] = time.perf_counter()
+        return slot
+
+    def shown_frame(self, meta):  # GUI thread, after update_video_label
+        if self.active and meta:
+            self.shown[meta.get("frame_id")] = time.perf_counter()
+
+    def latencies(self) -> dict:
+        pairs = {
+            "transport": (self.exposed, self.handled),
+            "queue": (self.handled, self.picked),
+            "process": (self.picked, self.published),
+            "display": (self.published, self.shown),
+            "total": (self.exposed, self.shown),
+        }
+        out = {}
+        for stage in STAGES:
+            a, b = pairs[stage]
+            ms = np.array([(b[k] - a[k]) * 1000.0 for k in b if k in a], dtype=np.float64)
+            out[stage] = _percentiles(ms)
+        return out
+
+
+def _percentiles(ms: np.ndarray) -> dict:
+    if ms.size == 0:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {"n": int(ms.size), "mean": float(ms.mean()), "p50": float(p50), "p95": float(p95),
+            "p99": float(p99), "max": float(ms.max())}
+
+
+def _spin(app, seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+        time.sleep(0.0005)
+
+
+def _counters(w) -> dict:
+    stats = w.worker.stats.snapshot()
+    disp = w.display_counters()
+    return {"camera": stats["frames"], "lost": stats["lost"], "incomplete": stats["incomplete"],
+            "dropped_handler": stats["dropped"], "processed": disp["processed"],
+            "shown": disp["shown"], "dropped_rings": disp["dropped"]}
+
+
+def run_one(app, w, name: str, fmt: str, args) -> dict:
+    width, height = RESOLUTIONS[name]
+    synthetic_camera.configure(width=width, height=height, fps=args.fps,
+                               bank=4 if width * height > 6e6 else 8)
+    w.pixel_format = fmt
+    w.start_camera()
+    w.worker.setExposureAuto.emit("Off")
+    w.worker.setExposureTime.emit(float(args.exposure_us))
+    _spin(app, 0.2)
+    deadline = time.perf_counter() + 30.0
+    while w.worker._session.cam is None and time.perf_counter() < deadline:
+        _spin(app, 0.05)
+    cam = w.worker._session.cam
+    if cam is None:
+        w.stop_camera()
+        return {"resolution": name, "format": fmt, "error": "camera did not open"}
+    probe = _Probe(cam, w.worker)
+    w.worker.add_frame_tap(probe.tap)
+    w.processor.add_analyzer(probe.analyzer)
+    processor = w.processor
+    w.processor.imageReady.connect(probe.image_ready(lambda: processor.native_meta), Qt.DirectConnection)
+    w.on_shown = probe.shown_frame
+    _spin(app, args.warmup)  # frame bank, first allocations, caches
+
+    probes.reset()
+    start = _counters(w)
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    probe.active = True
+    _spin(app, args.seconds)
+    probe.active = False
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    end = _counters(w)
+    delta = {k: end[k] - start[k] for k in end}
+    probe_snapshot = probes.snapshot() if probes.enabled else None
+
+    alloc = {}
+    if args.alloc_seconds > 0:
+        alloc = _alloc_pass(app, w, args.alloc_seconds)
+    w.on_shown = None
+    w.stop_camera()
+
+    return {
+        "resolution": name, "width": width, "height": height, "format": fmt,
+        "bits": synthetic_camera._BITS[fmt], "seconds": wall,
+        "fps": {"camera": delta["camera"] / wall, "processed": delta["processed"] / wall,
+                "shown": delta["shown"] / wall},
+        "counters": {k: v for k, v in delta.items() if k not in ("camera", "processed", "shown")},
+        "latency_ms": probe.latencies(),
+        "cpu": {"cores": cpu / wall},
+        "probes": probe_snapshot,
+        "alloc": alloc,
+    }
+
+
+def _alloc_pass(app, w, seconds: float) -> dict:
+    tracemalloc.start()
+    try:
+        _spin(app, 0.3)  # let tracing settle
+        frames0 = w.display_counters()["processed"]
+        blocks0 = sys.getallocatedblocks()
+        cur0, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        _spin(app, seconds)
+        frames = max(1, w.display_counters()["processed"] - frames0)
+        cur1, peak = tracemalloc.get_traced_memory()
+        blocks1 = sys.getallocatedblocks()
+    finally:
+        tracemalloc.stop()
+    return {
+        "frames": frames,
+        "retained_kb_per_frame": (cur1 - cur0) / 1024.0 / frames,
+        "retained_blocks_per_frame": (blocks1 - blocks0) / frames,
+        "transient_peak_mb": (peak - cur0) / 1048576.0,
+    }
+
+
+def _git(*cmd) -> str | None:
+    try:
+        return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _header() -> dict:
+    status = _git("status", "--porcelain", "--untracked-files=no", ".")
+    return {
+        "commit": _git("rev-parse", "HEAD") or None,
+        "dirty": bool(status) if status is not None else None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pyside6": PySide6.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Acquisition-to-display pipeline benchmark (synthetic camera)")
+    ap.add_argument("--sizes", default="1.3MP,5MP,12MP,20MP",
+                    help=f"comma separated, from {', '.join(RESOLUTIONS)}")
+    ap.add_argument("--formats", default="Mono8,Mono12p,Mono16",
+                    help=f"comma separated, from {', '.join(str(f) for f in synthetic_camera.PixelFormat)}")
+    ap.add_argument("--seconds", type=float, default=5.0, help="measured time per run")
+    ap.add_argument("--warmup", type=float, default=1.5)
+    ap.add_argument("--alloc-seconds", type=float, default=1.0, help="tracemalloc pass per run (0 = skip)")
+    ap.add_argument("--fps", type=float, default=1000.0, help="camera frame rate (default: as fast as possible)")
+    ap.add_argument("--exposure-us", type=float, default=500.0)
+    ap.add_argument("--view", default="1280x800", help="size of the video area")
+    ap.add_argument("--probes", action="store_true", help="enable the perf_probe stage timers")
+    ap.add_argument("--out", default="-", help="JSON file, '-' for stdout")
+    args = ap.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    for s in sizes:
+        if s not in RESOLUTIONS:
+            ap.error(f"unknown size {s}")
+    for f in formats:
+        if f not in synthetic_camera._BITS:
+            ap.error(f"unknown format {f}")
+
+    probes.enabled = args.probes
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    w = _BenchWidget()
+    vw, vh = (int(v) for v in args.view.lower().split("x"))
+    w.resize(vw, vh)
+    w.show()
+    _spin(app, 0.2)
+
+    result = {"header": _header(), "config": vars(args), "runs": []}
+    for name in sizes:
+        for fmt in formats:
+            run = run_one(app, w, name, fmt, args)
+            result["runs"].append(run)
+            if "error" in run:
+                print(f"{name:>6} {fmt:<8} {run['error']}", file=sys.stderr)
+                continue
+            lat = run["latency_ms"]["total"]
+            print(f"{name:>6} {fmt:<8} camera {run['fps']['camera']:7.1f} fps  "
+                  f"processed {run['fps']['processed']:7.1f} fps  shown {run['fps']['shown']:5.1f} fps  "
+                  f"total p50 {lat.get('p50', float('nan')):6.1f} ms  p99 {lat.get('p99', float('nan')):6.1f} ms  "
+                  f"cpu {run['cpu']['cores']:.2f}", file=sys.stderr)
+    w.close()
+
+    text = json.dumps(result, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
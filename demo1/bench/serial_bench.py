@@ -0,0 +1,253 @@
+# This Python file uses the following encoding: utf-8
+"""
+Command throughput and latency of SerialLink against the pty controller
+simulator (sim/serial_device.py); Linux/macOS only.
+
+    python bench/serial_bench.py --latency 2 --jitter 1 --count 500 --out serial.json
+
+Scenarios, each on a fresh link and simulator:
+- queries:    --count ?POS queries submitted at once (expect_reply); replies/s
+              and per-command latency from send() to the resolved future
+              (includes the wait in the send queue)
+- setpoints:  --count fire-and-forget TEMP/HEAT setpoints alternating L/R;
+              every one must reach the device (nothing coalesced)
+- coalesce:   --burst FOCUS updates per tick at --slider-hz for --seconds,
+              like a dragged slider delivering several valueChanged per
+              event-loop pass; writes that reached the device vs. sent, and
+              whether the last position arrived
+- faults:     queries with --drop-rate / --error-rate injected; timeouts and
+              device errors, and that every future resolved
+link_ms in each scenario is SerialLink.latency_stats() (write -> reply line).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import CancelledError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import PySide6  # noqa: E402
+from PySide6.QtCore import QCoreApplication  # noqa: E402
+
+from serial_link import DeviceError, SerialLink  # noqa: E402
+from sim.serial_device import SerialDeviceSimulator  # noqa: E402
+
+SCENARIOS = ("queries", "setpoints", "coalesce", "faults")
+
+
+class _Timed:
+    """send() wrapper recording the send -> resolved time of every future."""
+
+    def __init__(self, link: SerialLink):
+        self.link = link
+        self.futures = []
+        self.ms = []
+
+    def send(self, data: bytes, **kw):
+        t0 = time.perf_counter()
+        fut = self.link.send(data, **kw)
+        fut.add_done_callback(lambda f: self.ms.append((time.perf_counter() - t0) * 1000.0))
+        self.futures.append(fut)
+        return fut
+
+    def outcome(self) -> dict:
+        out = {"sent": len(self.futures), "ok": 0, "cancelled": 0, "timeouts": 0,
+               "device_errors": 0, "other_errors": 0, "unresolved": 0}
+        for f in self.futures:
+            if not f.done():
+                out["unresolved"] += 1
+                continue
+            try:
+                f.result(0)
+                out["ok"] += 1
+            except CancelledError:
+                out["cancelled"] += 1
+            except TimeoutError:
+                out["timeouts"] += 1
+            except DeviceError:
+                out["device_errors"] += 1
+            except Exception:
+                out["other_errors"] += 1
+        return out
+
+    def done(self) -> bool:
+        return all(f.done() for f in self.futures)
+
+
+def _percentiles(ms) -> dict:
+    ms = np.asarray(ms, dtype=np.float64)
+    if ms.size == 0:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {"n": int(ms.size), "mean": float(ms.mean()), "p50": float(p50), "p95": float(p95),
+            "p99": float(p99), "max": float(ms.max())}
+
+
+def _spin(app, seconds: float, until=None):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+        if until is not None and until():
+            return True
+        time.sleep(0.0005)
+    return until() if until is not None else True
+
+
+def _open(app, args, **faults):
+    sim = SerialDeviceSimulator(latency_ms=args.latency, jitter_ms=args.jitter,
+                                fragment=args.fragment, seed=args.seed, **faults)
+    sim.start()
+    link = SerialLink()
+    link.max_inflight = args.max_inflight
+    opened = []
+    link.opened.connect(opened.append)
+    link.errorOccurred.connect(lambda e: print(f"serial error: {e}", file=sys.stderr))
+    link.open_port(sim.port)
+    if not _spin(app, 5.0, lambda: opened):
+        link.stop()
+        sim.stop()
+        raise RuntimeError(f"could not open {sim.port}")
+    return link, sim
+
+
+def _finish(app, link, sim, timed: _Timed, t0: float, wait_s: float) -> dict:
+    _spin(app, wait_s, timed.done)
+    wall = time.perf_counter() - t0
+    out = {"seconds": wall, **timed.outcome(), "latency_ms": _percentiles(timed.ms),
+           "link_ms": link.latency_stats(),
+           "coalesced": link.coalesced, "device": dict(sim.stats)}
+    link.stop()
+    sim.stop()
+    return out
+
+
+def run_queries(app, args) -> dict:
+    link, sim = _open(app, args)
+    timed = _Timed(link)
+    t0 = time.perf_counter()
+    for _ in range(args.count):
+        timed.send(b"?POS\r\n", expect_reply=True, timeout_ms=args.timeout_ms)
+    out = _finish(app, link, sim, timed, t0, 60.0)
+    out["replies_per_s"] = out["ok"] / out["seconds"] if out["seconds"] > 0 else 0.0
+    return out
+
+
+def run_setpoints(app, args) -> dict:
+    link, sim = _open(app, args)
+    timed = _Timed(link)
+    t0 = time.perf_counter()
+    for i in range(args.count):
+        side = "LR"[i % 2]
+        cmd = f"TEMP:{side},{30 + i % 10}" if i % 4 < 2 else f"HEAT:{side},{(i // 4) % 2}"
+        timed.send(f"{cmd}\r\n".encode("ascii"))
+    _spin(app, 60.0, timed.done)
+    # resolved = handed to the port; wait until the device has read them all
+    _spin(app, 10.0, lambda: sim.stats["commands"] >= args.count)
+    out = _finish(app, link, sim, timed, t0, 0.0)
+    out["delivered"] = out["device"]["commands"]
+    out["commands_per_s"] = out["delivered"] / out["seconds"] if out["seconds"] > 0 else 0.0
+    return out
+
+
+def run_coalesce(app, args) -> dict:
+    link, sim = _open(app, args)
+    timed = _Timed(link)
+    period = 1.0 / args.slider_hz
+    t0 = time.perf_counter()
+    n = 0
+    while time.perf_counter() - t0 < args.seconds:
+        for _ in range(args.burst):
+            timed.send(f"FOCUS:{n}\r\n".encode("ascii"))
+            n += 1
+        _spin(app, period)
+    last = n - 1
+    reached = _spin(app, 5.0, lambda: sim.state["focus"] == last)
+    out = _finish(app, link, sim, timed, t0, 5.0)
+    out["written"] = out["device"]["commands"]
+    out["last_position_reached"] = reached
+    return out
+
+
+def run_faults(app, args) -> dict:
+    link, sim = _open(app, args, drop_rate=args.drop_rate, error_rate=args.error_rate)
+    timed = _Timed(link)
+    t0 = time.perf_counter()
+    for _ in range(args.count):
+        timed.send(b"?POS\r\n", expect_reply=True, timeout_ms=args.timeout_ms)
+    return _finish(app, link, sim, timed, t0, 60.0 + args.count * args.timeout_ms / 1000.0)
+
+
+def _git(*cmd) -> str | None:
+    try:
+        return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _header() -> dict:
+    status = _git("status", "--porcelain", "--untracked-files=no", ".")
+    return {
+        "commit": _git("rev-parse", "HEAD") or None,
+        "dirty": bool(status) if status is not None else None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pyside6": PySide6.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="SerialLink throughput/latency against the controller simulator")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma separated, from {', '.join(SCENARIOS)}")
+    ap.add_argument("--count", type=int, default=300, help="commands per queries/setpoints/faults run")
+    ap.add_argument("--latency", type=float, default=2.0, help="simulated device latency in ms")
+    ap.add_argument("--jitter", type=float, default=1.0, help="extra random latency up to this many ms")
+    ap.add_argument("--fragment", action="store_true", help="split device replies into several writes")
+    ap.add_argument("--max-inflight", type=int, default=1, help="SerialLink.max_inflight")
+    ap.add_argument("--timeout-ms", type=int, default=200, help="reply timeout per query")
+    ap.add_argument("--slider-hz", type=float, default=500.0, help="FOCUS update rate in the coalesce run")
+    ap.add_argument("--burst", type=int, default=10, help="FOCUS updates per tick in the coalesce run")
+    ap.add_argument("--seconds", type=float, default=2.0, help="length of the coalesce run")
+    ap.add_argument("--drop-rate", type=float, default=0.05)
+    ap.add_argument("--error-rate", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="-", help="JSON file, '-' for stdout")
+    args = ap.parse_args(argv)
+    if sys.platform == "win32":
+        ap.error("the controller simulator needs a pty (Linux/macOS)")
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    for s in scenarios:
+        if s not in SCENARIOS:
+            ap.error(f"unknown scenario {s}")
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    runners = {"queries": run_queries, "setpoints": run_setpoints, "coalesce": run_coalesce, "faults": run_faults}
+    result = {"header": _header(), "config": vars(args), "runs": {}}
+    for name in scenarios:
+        run = runners[name](app, args)
+        result["runs"][name] = run
+        lat = run["latency_ms"]
+        print(f"{name:<9} sent {run['sent']:5d}  ok {run['ok']:5d}  cancelled {run['cancelled']:5d}  "
+              f"timeouts {run['timeouts']:4d}  errors {run['device_errors']:4d}  "
+              f"p50 {lat.get('p50', float('nan')):7.2f} ms  p99 {lat.get('p99', float('nan')):7.2f} ms",
+              file=sys.stderr)
+
+    text = json.dumps(result, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,120 @@
 # This Python file uses the following encoding: utf-8
 from __future__ import annotations
 
-from PySide6.QtCore import QThread, Signal
+import importlib
+import os
+import threading
+import time
+from collections import deque
 
-from vmbpy import VmbSystem, PixelFormat, Camera, Stream, Frame
+import numpy as np
+from PySide6.QtCore import QObject, QThread, QTimer, Signal, Slot
+
+from frame_ring import FrameRing
+from perf_probe import probes
+from pixel_unpack import DEFAULT_PREFERENCE, FORMATS, payload_size
+
+
+# backend name -> module providing the VmbPy API subset used below
+# (VmbSystem, PixelFormat, FrameStatus, AllocationMode and the Camera/Frame methods)
+CAMERA_BACKENDS = {
+    'vmbpy': 'vmbpy',
+    'synthetic': 'sim.synthetic_camera',
+}
+
+
+def load_camera_backend(name: str | None = None):
+    """Import a camera backend by name (default: $PCR_CAMERA_BACKEND or 'vmbpy')."""
+    name = name or os.environ.get('PCR_CAMERA_BACKEND') or 'vmbpy'
+    return importlib.import_module(CAMERA_BACKENDS.get(name, name))
+
+
+class StreamStats:
+    """
+    Acquisition counters updated from the VmbPy frame callback.
+    - incomplete: frames delivered with a non-Complete status (not published)
+    - lost:       gaps in the camera frame ID (transport ran out of buffers)
+    - dropped:    frames discarded because every ring slot was held
+    - handler_*:  time spent inside the callback per frame; a handler_load
+                  close to 1.0 means the callback itself limits throughput
+    """
+
+    def __init__(self, window: int = 256):
+        self._lock = threading.Lock()
+        self._times = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.frames = 0
+            self.incomplete = 0
+            self.lost = 0
+            self.dropped = 0
+            self._handler_total = 0.0
+            self._handler_max = 0.0
+            self._times.clear()
+            self._last_id = None
+            self._t_start = time.perf_counter()
+
+    def record(self, frame_id: int | None, complete: bool, published: bool, handler_s: float):
+        with self._lock:
+            self.frames += 1
+            if not complete:
+                self.incomplete += 1
+            elif not published:
+                self.dropped += 1
+            if frame_id is not None:
+                if self._last_id is not None and frame_id > self._last_id + 1:
+                    self.lost += frame_id - self._last_id - 1
+                self._last_id = frame_id
+            self._handler_total += handler_s
+            self._handler_max = max(self._handler_max, handler_s)
+            self._times.append(handler_s)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(1e-9, time.perf_counter() - self._t_start)
+            times = sorted(self._times)
+            p95 = times[int(0.95 * (len(times) - 1))] if times else 0.0
+            return {
+                "frames": self.frames,
+                "incomplete": self.incomplete,
+                "lost": self.lost,
+                "dropped": self.dropped,
+                "fps": self.frames / elapsed,
+                "handler_mean_ms": (self._handler_total / self.frames * 1000.0) if self.frames else 0.0,
+                "handler_p95_ms": p95 * 1000.0,
+                "handler_max_ms": self._handler_max * 1000.0,
+                "handler_load": self._handler_total / elapsed,
+            }
 
 
 class CameraWorker(QThread):
     """
-    QThread-based camera grabber using Allied Vision VmbPy.
-    Outputs Mono8 frames as raw bytes via frameReady(bytes, width, height).
+    QThread-based camera grabber using Allied Vision VmbPy, or any backend
+    module with the same API (see CAMERA_BACKENDS; 'synthetic' needs no
+    hardware). The backend is imported in run(), so a missing vmbpy is
+    reported through error() instead of failing at import time.
+    Frames are written into a preallocated FrameRing (self.ring); only the slot
+    index and sequence number are emitted via frameReady(slot, seq).
+    The ring runs latest-frame-wins: the display pulls the newest frame on its
+    own timer, so older unread frames are recycled instead of queueing up.
+
+    The thread runs a Qt event loop; control signals are delivered to a
+    _CameraSession living in this thread and take effect immediately, and
+    stop() simply quits the loop.
+
+    The pixel format is negotiated once from pixel_format_preference; the
+    callback only copies the native payload out (Mono8 as (h, w), anything else
+    as raw bytes with {'fmt', 'w', 'h'} in ring.meta(slot)). Unpacking happens
+    in the processing stage (pixel_unpack).
+
+    buffer_count / allocation_mode ('AnnounceFrame' | 'AllocAndAnnounceFrame')
+    are passed to start_streaming; statsUpdated(dict) reports StreamStats once
+    per second while the camera is open.
     """
 
-    frameReady = Signal(object, int, int, int)  # numpy array (uint8), width, height, bytes_per_line (Mono8)
+    frameReady = Signal(int, int)  # ring slot index, sequence number (raw frame in self.ring, see ring.meta)
     # Control signals from UI -> worker thread
     setExposureAuto = Signal(str)   # 'Off' | 'Once' | 'Continuous'
     setExposureTime = Signal(float) # in microseconds (typical)
@@ -20,137 +122,615 @@ class CameraWorker(QThread):
     setGain = Signal(float)         # in dB (typical)
     setGammaEnable = Signal(bool)
     setBlackLevel = Signal(float)
+    startStream = Signal()          # resume streaming on the open camera
+    stopStream = Signal()           # pause streaming, keep the camera open
+    switchCamera = Signal(str)      # camera id; '' selects the first camera
+    reconfigure = Signal(dict)      # {feature name: value}, e.g. Width/OffsetX/BinningHorizontal/PixelFormat
+    setViewportRoi = Signal(float, float, float, float, int, int)  # normalized x, y, w, h; display w, h (0 = no binning)
+    setStreamBuffers = Signal(int, str)  # buffer count, allocation mode name
+    setPixelFormatPreference = Signal(object)  # tuple of format names, e.g. HIGH_DEPTH_PREFERENCE
 
     error = Signal(str)
+    tapFailed = Signal(object, str)  # frame tap that raised (now removed), message
     startedStreaming = Signal()
     stoppedStreaming = Signal()
+    reconfigured = Signal(float, dict)  # stream interruption in ms, values actually applied
+    reconfigureFailed = Signal(dict)    # {feature name: requested value} the camera did not accept
+    statsUpdated = Signal(dict)         # StreamStats.snapshot(), about once per second
 
-    def __init__(self, camera_id: str | None = None, parent=None):
+    # Per-frame meta (ring.meta(slot), frame taps, processor.native_meta):
+    #   fmt, w, h     native pixel format and size
+    #   frame_id      camera frame counter
+    #   timestamp     device timestamp in camera ticks (see clock)
+    #   host_time     time.time() when the callback received the frame
+    #   host_t        perf_counter() at the same moment (for latency arithmetic)
+    #   gap           frame IDs missing since the previous published frame
+    #   exposure_us, gain_db   last values read back from the camera
+
+    def __init__(self, camera_id: str | None = None, ring_depth: int = 4,
+                 buffer_count: int = 10, allocation_mode: str = 'AnnounceFrame',
+                 pixel_format_preference=DEFAULT_PREFERENCE, backend: str | None = None, parent=None):
         super().__init__(parent)
         self._camera_id = camera_id
-        self._running = False
+        self.backend = backend
+        self.pixel_format_preference = tuple(pixel_format_preference)
+        self.buffer_count = buffer_count
+        self.allocation_mode = allocation_mode
+        self.stats = StreamStats()
+        self._taps = ()  # callables(raw, meta) run in the frame callback, e.g. FrameRecorder.offer
+        self.acq_state = {}  # last read exposure_us / gain_db, refreshed once per second
+        # device clock -> host perf_counter(): host_t = timestamp * scale + offset;
+        # None until measured ({'scale', 'offset', 'method', 'uncertainty_s'})
+        self.clock = None
+        self.tick_s = 1e-9  # seconds per device timestamp tick, also without a latch
+        # Shared with the GUI; slots are reused for the whole session
+        self.ring = FrameRing(ring_depth, latest_only=True)
+        # Lives in the worker thread; signals emitted before run() starts are
+        # queued and delivered once the event loop is up.
+        self._session = _CameraSession(self)
+        self._session.moveToThread(self)
+        self.setExposureAuto.connect(self._session.set_exposure_auto)
+        self.setExposureTime.connect(self._session.set_exposure_time)
+        self.setGainAuto.connect(self._session.set_gain_auto)
+        self.setGain.connect(self._session.set_gain)
+        self.setGammaEnable.connect(self._session.set_gamma_enable)
+        self.setBlackLevel.connect(self._session.set_black_level)
+        self.startStream.connect(self._session.start_stream)
+        self.stopStream.connect(self._session.stop_stream)
+        self.switchCamera.connect(self._session.switch_camera)
+        self.reconfigure.connect(self._session.reconfigure)
+        self.setViewportRoi.connect(self._session.set_viewport_roi)
+        self.setStreamBuffers.connect(self._session.set_stream_buffers)
+        self.setPixelFormatPreference.connect(self._session.set_pixel_format_preference)
+
+    def add_frame_tap(self, fn):
+        """
+        Call fn(raw, meta) with every published frame from the camera thread.
+        fn must not block (copy and return); it sees every frame, not only the
+        latest one the display takes. A tap that raises is removed and
+        reported through tapFailed; the frame is still published and the
+        stream keeps running.
+        """
+        self._taps = self._taps + (fn,)
+
+    def remove_frame_tap(self, fn):
+        self._taps = tuple(t for t in self._taps if t != fn)
 
     def stop(self):
-        self._running = False
-        self.wait()  # block until thread finishes
+        self.quit()  # leaves exec() right away; run() then closes the camera
+        self.wait()
 
     def run(self):
         try:
-            with VmbSystem.get_instance() as vmb:
-                cams = vmb.get_all_cameras()
-                if not cams:
-                    self.error.emit("No camera found.")
-                    return
-
-                cam = None
-                if self._camera_id:
-                    # try exact id match, else default to first
-                    for c in cams:
-                        if c.get_id() == self._camera_id:
-                            cam = c
-                            break
-                if cam is None:
-                    cam = cams[0]
-
-                def handler(camera: Camera, stream: Stream, frame: Frame):
-                    try:
-                        # Ensure Mono8; if not, convert on the fly (costly but safe)
-                        if frame.get_pixel_format() != PixelFormat.Mono8:
-                            f = frame.convert_pixel_format(PixelFormat.Mono8)
-                        else:
-                            f = frame
-                        w = f.get_width()
-                        h = f.get_height()
-                        # Obtain numpy view and copy to own memory so it outlives callback
-                        arr = f.as_numpy_ndarray()
-                        arr_owned = arr.copy()
-                        bytes_per_line = arr_owned.strides[0]
-                        self.frameReady.emit(arr_owned, w, h, bytes_per_line)
-                    finally:
-                        camera.queue_frame(frame)
-
-                with cam:
-                    # Try to configure commonly helpful features for visibility
-                    def try_set_enum(feature_name: str, value: str):
-                        try:
-                            feat = getattr(cam, feature_name, None)
-                            if feat is not None:
-                                feat.set(value)
-                        except Exception:
-                            pass
+            api = load_camera_backend(self.backend)
+            self._session.api = api
+            with api.VmbSystem.get_instance() as vmb:
+                self._session.vmb = vmb
+                try:
+                    if self._session.open(self._camera_id):
+                        self._session.start_stream()
+                        self.exec()
+                finally:
+                    self._session.close()
+                    self._session.vmb = None
+        except Exception as e:
+            self.error.emit(str(e))
 
-                    def try_set_bool(feature_name: str, value: bool):
-                        try:
-                            feat = getattr(cam, feature_name, None)
-                            if feat is not None:
-                                feat.set(value)
-                        except Exception:
-                            pass
 
-                    # Acquisition Mode: Continuous (if supported)
-                    try_set_enum('AcquisitionMode', 'Continuous')
-                    # Auto exposure/gain to help illumination
-                    try_set_enum('ExposureAuto', 'Continuous')
-                    try_set_enum('GainAuto', 'Continuous')
-                    # Disable gamma if it makes image washed out (best-effort)
-                    try_set_bool('GammaEnable', False)
-
-                    # Connect control signals to feature setters (executed in worker thread)
-                    def on_set_exposure_auto(mode: str):
-                        try_set_enum('ExposureAuto', mode)
-                    def on_set_exposure_time(val: float):
-                        # When exposure auto is Off, set manual time if possible
-                        try:
-                            feat = getattr(cam, 'ExposureTime', None)
-                            if feat is not None:
-                                # Clamp to valid range
-                                lo, hi = feat.get_range()
-                                feat.set(max(lo, min(hi, val)))
-                        except Exception:
-                            pass
-                    def on_set_gain_auto(mode: str):
-                        try_set_enum('GainAuto', mode)
-                    def on_set_gain(val: float):
-                        try:
-                            feat = getattr(cam, 'Gain', None)
-                            if feat is not None:
-                                lo, hi = feat.get_range()
-                                feat.set(max(lo, min(hi, val)))
-                        except Exception:
-                            pass
-                    def on_set_gamma_enable(enabled: bool):
-                        try_set_bool('GammaEnable', enabled)
-                    def on_set_black_level(val: float):
+class _CameraSession(QObject):
+    """Owns the open camera; all slots run in the CameraWorker thread."""
+
+    # Features that GenICam locks while acquiring; changing them needs a pause.
+    # Listed in the order they are applied (binning shrinks the valid ROI range).
+    _STREAM_LOCKED = (
+        'BinningHorizontal', 'BinningVertical', 'PixelFormat',
+        'Width', 'Height', 'TriggerSelector', 'TriggerMode', 'TriggerSource',
+    )
+
+    def __init__(self, worker: CameraWorker):
+        super().__init__()
+        self._worker = worker
+        self.api = None  # backend module, set by CameraWorker.run()
+        self.vmb = None
+        self.cam = None
+        self.streaming = False
+        self._resume_t0 = None  # perf_counter() when a reconfiguration paused the stream
+        self._resume_applied = {}
+        self._roi = {}  # last ROI/binning sent by set_viewport_roi
+        self._stats_timer = None
+        self._last_frame_t = 0.0  # handler entry of the previous frame (perf probes)
+        self._last_published_id = None
+
+    # --- camera life cycle ---
+    def open(self, camera_id: str | None) -> bool:
+        cams = self.vmb.get_all_cameras()
+        if not cams:
+            self._worker.error.emit("No camera found.")
+            return False
+
+        cam = None
+        if camera_id:
+            # try exact id match, else default to first
+            for c in cams:
+                if c.get_id() == camera_id:
+                    cam = c
+                    break
+        if cam is None:
+            cam = cams[0]
+        cam.__enter__()
+        self.cam = cam
+        self._roi = {}
+        if self._stats_timer is None:
+            # created here so it belongs to the worker thread
+            self._stats_timer = QTimer(self)
+            self._stats_timer.setInterval(1000)
+            self._stats_timer.timeout.connect(self._on_stats_tick)
+        self._stats_timer.start()
+        self._refresh_acq_state()
+
+        # Try to configure commonly helpful features for visibility
+        # Acquisition Mode: Continuous (if supported)
+        self._set_value('AcquisitionMode', 'Continuous')
+        # Auto exposure/gain to help illumination
+        self._set_value('ExposureAuto', 'Continuous')
+        self._set_value('GainAuto', 'Continuous')
+        # Disable gamma if it makes image washed out (best-effort)
+        self._set_value('GammaEnable', False)
+
+        if not self._negotiate_pixel_format():
+            self._worker.error.emit("Camera offers no supported native pixel format.")
+            return False
+        return True
+
+    def _negotiate_pixel_format(self) -> bool:
+        """Pick the first preferred format the camera supports natively."""
+        try:
+            available = {str(f): f for f in self.cam.get_pixel_formats()}
+        except Exception:
+            available = {}
+        for name in self._worker.pixel_format_preference:
+            if name in available and name in FORMATS:
+                try:
+                    self.cam.set_pixel_format(available[name])
+                    return True
+                except Exception:
+                    continue
+        # keep whatever the camera is set to if we can decode it
+        try:
+            return str(self.cam.get_pixel_format()) in FORMATS
+        except Exception:
+            return False
+
+    def _on_stats_tick(self):
+        self._refresh_acq_state()
+        self._sync_clock()
+        self._worker.statsUpdated.emit(self._worker.stats.snapshot())
+
+    def _refresh_acq_state(self):
+        # Auto exposure/gain drift; read back here rather than in the frame callback
+        state = {}
+        for key, name in (('exposure_us', 'ExposureTime'), ('gain_db', 'Gain')):
+            try:
+                feat = self._feature(name)
+                if feat is not None:
+                    state[key] = float(feat.get())
+            except Exception:
+                pass
+        self._worker.acq_state = state
+
+    def _sync_clock(self):
+        """
+        Map device timestamps onto perf_counter() by latching the camera clock
+        (TimestampLatch / TimestampLatchValue) between two host readings. The
+        smallest bracket of a few tries bounds the error. Cameras without the
+        latch leave clock unset; LatencyTrace then falls back to an estimate
+        in units of tick_s, which is read from the tick frequency either way.
+        """
+        scale = 1e-9  # most cameras tick in ns
+        for name in ('GevTimestampTickFrequency', 'DeviceTimestampFrequency', 'TimestampTickFrequency'):
+            feat = self._feature(name)
+            try:
+                if feat is not None and float(feat.get()) > 0:
+                    scale = 1.0 / float(feat.get())
+                    break
+            except Exception:
+                pass
+        self._worker.tick_s = scale
+        latch, value = self._feature('TimestampLatch'), self._feature('TimestampLatchValue')
+        if latch is None or value is None:
+            return
+        best = None
+        try:
+            for _ in range(3):
+                t0 = time.perf_counter()
+                latch.run()
+                t1 = time.perf_counter()
+                ticks = int(value.get())
+                if best is None or t1 - t0 < best[1] - best[0]:
+                    best = (t0, t1, ticks)
+        except Exception:
+            return
+        t0, t1, ticks = best
+        self._worker.clock = {
+            'scale': scale,
+            'offset': (t0 + t1) / 2.0 - ticks * scale,
+            'method': 'latch',
+            'uncertainty_s': (t1 - t0) / 2.0,
+        }
+
+    def close(self):
+        if self._stats_timer is not None:
+            self._stats_timer.stop()
+        self.stop_stream()
+        if self.cam is not None:
+            try:
+                self.cam.__exit__(None, None, None)
+            finally:
+                self.cam = None
+
+    @Slot()
+    def start_stream(self):
+        if self.cam is None or self.streaming:
+            return
+        self._worker.stats.reset()
+        self._last_published_id = None
+        self._sync_clock()
+        self._start_streaming()
+        self.streaming = True
+        self._worker.startedStreaming.emit()
+
+    def _start_streaming(self):
+        modes = self.api.AllocationMode
+        mode = getattr(modes, self._worker.allocation_mode, modes.AnnounceFrame)
+        self.cam.start_streaming(
+            self._handler,
+            buffer_count=max(1, int(self._worker.buffer_count)),
+            allocation_mode=mode,
+        )
+
+    @Slot(int, str)
+    def set_stream_buffers(self, count: int, allocation_mode: str):
+        """Change the transport buffer count/allocation; restarts the stream if running."""
+        self._worker.buffer_count = count
+        self._worker.allocation_mode = allocation_mode
+        if self.cam is None or not self.streaming:
+            return
+        t0 = time.perf_counter()
+        self.cam.stop_streaming()
+        self.streaming = False
+        self._resume_t0 = t0
+        self._resume_applied = {'buffer_count': count, 'allocation_mode': allocation_mode}
+        try:
+            self._start_streaming()
+        except Exception as e:
+            self._resume_t0 = None
+            self._worker.stoppedStreaming.emit()
+            self._worker.error.emit(f"Could not restart streaming with {count} buffers: {e}")
+            return
+        self.streaming = True
+
+    @Slot(object)
+    def set_pixel_format_preference(self, preference):
+        """Renegotiate the native pixel format (e.g. Mono8 <-> Mono12); restarts the stream if running."""
+        self._worker.pixel_format_preference = tuple(preference)
+        if self.cam is None:
+            return
+        was_streaming = self.streaming
+        t0 = time.perf_counter()
+        if was_streaming:
+            self.cam.stop_streaming()
+        ok = self._negotiate_pixel_format()
+        try:
+            applied = {'PixelFormat': str(self.cam.get_pixel_format())}
+        except Exception:
+            applied = {}
+        if not ok:
+            self._worker.error.emit("Camera offers no supported native pixel format.")
+        if was_streaming:
+            self._resume_t0 = t0
+            self._resume_applied = applied
+            self._start_streaming()
+        else:
+            self._worker.reconfigured.emit(0.0, applied)
+
+    @Slot()
+    def stop_stream(self):
+        if self.cam is None or not self.streaming:
+            return
+        try:
+            self.cam.stop_streaming()
+        finally:
+            self.streaming = False
+            self._worker.stoppedStreaming.emit()
+
+    @Slot(dict)
+    def reconfigure(self, changes: dict):
+        """
+        Apply feature changes with the shortest possible stream interruption.
+        Live-writable features (offsets, exposure, ...) are written while
+        streaming; stream-locked ones are applied in one short pause that keeps
+        the handler, the frame ring and all signal connections. The interruption
+        (stop -> first new frame) is reported through reconfigured(ms, applied).
+        Features the camera rejects are reported through reconfigureFailed and
+        never pause the stream by themselves.
+        """
+        if self.cam is None:
+            return
+        applied = {}
+        locked = {k: v for k, v in changes.items() if k in self._STREAM_LOCKED}
+        live = {k: v for k, v in changes.items() if k not in self._STREAM_LOCKED}
+        # With a new Width/Height the offsets are only valid for the new size:
+        # they are written in the pause, after it
+        resize = 'Width' in locked or 'Height' in locked
+        for name, value in live.items():
+            if not (resize and name in ('OffsetX', 'OffsetY')):
+                self._write(name, value, applied)
+        if not locked:
+            self._report_failed(changes, applied)
+            self._worker.reconfigured.emit(0.0, applied)
+            return
+
+        was_streaming = self.streaming
+        t0 = time.perf_counter()
+        if was_streaming:
+            self.cam.stop_streaming()
+            self.streaming = False
+        try:
+            offsets = {k: changes[k] for k in ('OffsetX', 'OffsetY') if k in changes and resize}
+            if resize:
+                # make room first so the new size is inside the valid range,
+                # then put untouched offsets back afterwards
+                for name in ('OffsetX', 'OffsetY'):
+                    feat = self._feature(name)
+                    if name not in offsets and feat is not None:
                         try:
-                            feat = getattr(cam, 'BlackLevel', None)
-                            if feat is not None:
-                                lo, hi = feat.get_range()
-                                feat.set(max(lo, min(hi, val)))
+                            offsets[name] = feat.get()
                         except Exception:
                             pass
+                    self._write(name, 0, {})
+            for name in self._STREAM_LOCKED:
+                if name in locked:
+                    self._write(name, locked[name], applied)
+            for name, value in offsets.items():
+                self._write(name, value, applied if name in changes else {})
+        finally:
+            if was_streaming:
+                self._resume_t0 = t0
+                self._resume_applied = applied
+                self._start_streaming()
+                self.streaming = True
+        self._report_failed(changes, applied)
+        if not was_streaming:
+            self._worker.reconfigured.emit((time.perf_counter() - t0) * 1000.0, applied)
+
+    def _report_failed(self, changes: dict, applied: dict):
+        failed = {k: v for k, v in changes.items() if k not in applied}
+        if failed:
+            self._worker.reconfigureFailed.emit(failed)
 
-                    self.setExposureAuto.connect(on_set_exposure_auto)
-                    self.setExposureTime.connect(on_set_exposure_time)
-                    self.setGainAuto.connect(on_set_gain_auto)
-                    self.setGain.connect(on_set_gain)
-                    self.setGammaEnable.connect(on_set_gamma_enable)
-                    self.setBlackLevel.connect(on_set_black_level)
+    @Slot(float, float, float, float, int, int)
+    def set_viewport_roi(self, x: float, y: float, w: float, h: float, view_w: int, view_h: int):
+        """
+        Map a normalized viewport onto OffsetX/OffsetY/Width/Height so only the
+        visible pixels are transferred. With a display size given, binning is
+        raised (powers of two) while the binned ROI still covers the display.
+        Only changed features are sent, so pure panning moves the offsets
+        without pausing the stream.
+        """
+        if self.cam is None:
+            return
+        sensor_w, sensor_h = self._sensor_size()
+        if sensor_w <= 0 or sensor_h <= 0:
+            return
+        x = min(max(x, 0.0), 1.0)
+        y = min(max(y, 0.0), 1.0)
+        roi_w = max(1.0, min(w, 1.0 - x) * sensor_w)
+        roi_h = max(1.0, min(h, 1.0 - y) * sensor_h)
+        b = 1
+        bin_feat = self._feature('BinningHorizontal')
+        if bin_feat is not None and view_w > 0 and view_h > 0:
+            try:
+                max_bin = int(bin_feat.get_range()[1])
+            except Exception:
+                max_bin = 1
+            while b * 2 <= max_bin and roi_w / (b * 2) >= view_w and roi_h / (b * 2) >= view_h:
+                b *= 2
+        roi = {
+            'Width': int(roi_w / b),
+            'Height': int(roi_h / b),
+            'OffsetX': int(x * sensor_w / b),
+            'OffsetY': int(y * sensor_h / b),
+        }
+        if bin_feat is not None:
+            roi['BinningHorizontal'] = b
+            roi['BinningVertical'] = b
+        changes = {k: v for k, v in roi.items() if self._roi.get(k) != v}
+        self._roi = roi
+        if changes:
+            self.reconfigure(changes)
 
-                    # Try to set Mono8 if supported
+    def _sensor_size(self) -> tuple[int, int]:
+        # unbinned sensor size; SensorWidth is optional in GenICam SFNC
+        for wn, hn in (('SensorWidth', 'SensorHeight'), ('WidthMax', 'HeightMax')):
+            fw, fh = self._feature(wn), self._feature(hn)
+            if fw is None or fh is None:
+                continue
+            try:
+                sw, sh = int(fw.get()), int(fh.get())
+            except Exception:
+                continue
+            if wn == 'WidthMax':
+                # WidthMax shrinks with binning
+                for bn, dim in (('BinningHorizontal', 0), ('BinningVertical', 1)):
+                    bf = self._feature(bn)
                     try:
-                        cam.set_pixel_format(PixelFormat.Mono8)
+                        f = int(bf.get()) if bf is not None else 1
                     except Exception:
-                        # Fallback: will convert in handler
-                        pass
+                        f = 1
+                    if dim == 0:
+                        sw *= f
+                    else:
+                        sh *= f
+            return sw, sh
+        return 0, 0
 
-                    self._running = True
-                    cam.start_streaming(handler)
-                    self.startedStreaming.emit()
-                    try:
-                        while self._running:
-                            self.msleep(10)
-                    finally:
-                        cam.stop_streaming()
-                        self.stoppedStreaming.emit()
+    def _write(self, name: str, value, applied: dict):
+        """Write one feature (snapped to its increment/range); returns the value or None."""
+        if name == 'PixelFormat':
+            try:
+                fmt = getattr(self.api.PixelFormat, value) if isinstance(value, str) else value
+                self.cam.set_pixel_format(fmt)
+                applied[name] = str(fmt)
+                return fmt
+            except Exception:
+                return None
+        feat = self._feature(name)
+        if feat is None or value is None:
+            return None
+        try:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lo, hi = feat.get_range()
+                value = max(lo, min(hi, value))
+                try:
+                    inc = feat.get_increment()
+                except Exception:
+                    inc = None
+                if inc:
+                    value = lo + int((value - lo) // inc) * inc
+                if isinstance(lo, int):
+                    value = int(value)
+            feat.set(value)
+            applied[name] = value
+            return value
+        except Exception:
+            return None
+
+    @Slot(str)
+    def switch_camera(self, camera_id: str):
+        was_streaming = self.streaming
+        self.close()
+        try:
+            if self.open(camera_id or None) and was_streaming:
+                self.start_stream()
         except Exception as e:
-            self.error.emit(str(e))
+            self._worker.error.emit(str(e))
+
+    # --- frame callback (backend acquisition thread) ---
+    def _handler(self, camera, stream, frame):
+        t_in = time.perf_counter()
+        timed = probes.enabled
+        if timed:
+            if self._last_frame_t:
+                probes.add('camera', t_in - self._last_frame_t)  # frame interval as seen by the host
+            self._last_frame_t = t_in
+        ring = self._worker.ring
+        complete = True
+        published = False
+        try:
+            frame_id = frame.get_id()
+        except Exception:
+            frame_id = None
+        try:
+            if frame.get_status() != self.api.FrameStatus.Complete:
+                complete = False
+                return
+            # Raw copy-out only; the buffer goes back to VmbPy right after.
+            fmt = str(frame.get_pixel_format())
+            w = frame.get_width()
+            h = frame.get_height()
+            if fmt in FORMATS:
+                nbytes = payload_size(fmt, w, h)
+            else:
+                nbytes = frame.get_buffer_size()
+            src = np.frombuffer(frame.get_buffer(), dtype=np.uint8, count=nbytes)
+            slot = ring.acquire_write(nbytes)
+            if slot < 0:
+                return  # every slot is held; drop this frame
+            try:
+                shape = (h, w) if fmt == 'Mono8' else (nbytes,)
+                last = self._last_published_id
+                # IDs restart after some reconfigurations; only count forward jumps
+                gap = frame_id - last - 1 if frame_id is not None and last is not None and frame_id > last else 0
+                meta = {
+                    'fmt': fmt, 'w': w, 'h': h,
+                    'frame_id': frame_id, 'timestamp': frame.get_timestamp(),
+                    'host_time': time.time(), 'host_t': t_in, 'gap': gap,
+                    **self._worker.acq_state,
+                }
+                dst = ring.writable(slot, shape, np.uint8, meta=meta)
+                np.copyto(dst, src.reshape(shape))
+                for tap in self._worker._taps:
+                    try:
+                        tap(dst, meta)
+                    except Exception as e:
+                        # a failing consumer must not cost the frame or the stream
+                        self._worker.remove_frame_tap(tap)
+                        self._worker.tapFailed.emit(tap, f"Frame tap {getattr(tap, '__qualname__', tap)} "
+                                                         f"failed and was removed: {e!r}")
+                seq = ring.publish(slot)
+            except BaseException:
+                ring.abort_write(slot)  # otherwise the slot stays WRITING for good
+                raise
+            published = True
+            self._last_published_id = frame_id
+            self._worker.frameReady.emit(slot, seq)
+            if self._resume_t0 is not None:
+                # first frame after a reconfiguration pause
+                ms = (time.perf_counter() - self._resume_t0) * 1000.0
+                self._resume_t0 = None
+                self._worker.reconfigured.emit(ms, self._resume_applied)
+        finally:
+            camera.queue_frame(frame)
+            dt = time.perf_counter() - t_in
+            self._worker.stats.record(frame_id, complete, published, dt)
+            if timed:
+                probes.add('handler', dt)
+
+    # --- feature control slots ---
+    @Slot(str)
+    def set_exposure_auto(self, mode: str):
+        self._set_value('ExposureAuto', mode)
+
+    @Slot(float)
+    def set_exposure_time(self, val: float):
+        # When exposure auto is Off, set manual time if possible
+        self._set_clamped('ExposureTime', val)
+
+    @Slot(str)
+    def set_gain_auto(self, mode: str):
+        self._set_value('GainAuto', mode)
+
+    @Slot(float)
+    def set_gain(self, val: float):
+        self._set_clamped('Gain', val)
+
+    @Slot(bool)
+    def set_gamma_enable(self, enabled: bool):
+        self._set_value('GammaEnable', enabled)
+
+    @Slot(float)
+    def set_black_level(self, val: float):
+        self._set_clamped('BlackLevel', val)
+
+    def _feature(self, name: str):
+        if self.cam is None:
+            return None
+        return getattr(self.cam, name, None)
+
+    def _set_value(self, name: str, value):
+        try:
+            feat = self._feature(name)
+            if feat is not None:
+                feat.set(value)
+        except Exception:
+            pass
+
+    def _set_clamped(self, name: str, val: float):
+        try:
+            feat = self._feature(name)
+            if feat is not None:
+                # Clamp to valid range
+                lo, hi = feat.get_range()
+                feat.set(max(lo, min(hi, val)))
+        except Exception:
+            pass
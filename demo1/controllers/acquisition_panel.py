@@ -0,0 +1,212 @@
+# This Python file uses the following encoding: utf-8
+import os
+import time
+
+from PySide6.QtCore import QObject
+from PySide6.QtWidgets import QCheckBox, QHBoxLayout, QLabel, QPushButton, QSpinBox
+
+from acquisition import MultiPositionAcquisition
+from timelapse import TimeLapseScheduler
+
+
+class AcquisitionPanel(QObject):
+    """
+    Multi-position / multi-channel acquisition over the stored position list,
+    and time-lapse (one acquisition round per slot, planned on the monotonic
+    clock). Owns the 多点通道 and 延时拍摄 rows; the position buttons come
+    from the 画面控制 tab (refs of build_video_tab). Images are saved through
+    the SnapshotPanel.
+    """
+
+    def __init__(self, host, refs, snapshots, send, s):
+        super().__init__(host)
+        self._host = host
+        self._snapshots = snapshots
+        self._dir = None
+        self.grid = refs["grid"]
+        self.add_position_btn = refs["add_position_btn"]
+        self.clear_positions_btn = refs["clear_positions_btn"]
+        self.multi_run_btn = refs["multi_run_btn"]
+        self.positions_lbl = refs["positions_lbl"]
+        self.acquisition = MultiPositionAcquisition(
+            send=send,
+            grab=self._grab,
+            save=self._save,
+            move=self.grid.jumpTo,
+            channel=host.select_channel,
+            parent=self,
+        )
+        self.acquisition.progress.connect(self._on_progress)
+        self.acquisition.roundFinished.connect(self._on_round)
+        self.acquisition.finished.connect(lambda: self._set_acq_button(False))
+        self.acquisition.error.connect(self._on_error)
+        self.add_position_btn.clicked.connect(self._add_position)
+        self.clear_positions_btn.clicked.connect(self._clear_positions)
+        self.multi_run_btn.toggled.connect(self._on_run_toggled)
+        self.timelapse = TimeLapseScheduler(
+            trigger=self._on_slot,
+            busy=lambda: self.acquisition.running,
+            parent=self,
+        )
+        self.timelapse.roundTriggered.connect(lambda _i, _late: self._update_timelapse_status())
+        self.timelapse.slotMissed.connect(lambda _i: self._update_timelapse_status())
+        self.timelapse.finished.connect(self._on_timelapse_finished)
+
+        # Channels per position, rounds, status
+        self.channel_chks = []
+        self.acq_row = QHBoxLayout()
+        self.acq_row.setContentsMargins(0, 0, 0, 0)
+        self.acq_row.setSpacing(s(6))
+        self.acq_row.addWidget(QLabel("多点通道:"))
+        for i, b in enumerate(refs["channel_buttons"]):
+            chk = QCheckBox(b.text(), host)
+            chk.setChecked(i == 0)
+            self.channel_chks.append(chk)
+            self.acq_row.addWidget(chk)
+        self.acq_row.addWidget(QLabel("轮数:"))
+        self.rounds_spin = QSpinBox(host)
+        self.rounds_spin.setRange(1, 100000)
+        self.acq_row.addWidget(self.rounds_spin)
+        self.acq_status_lbl = QLabel("--", host)
+        self.acq_status_lbl.setStyleSheet("color:#9aa1a9;")
+        self.acq_row.addWidget(self.acq_status_lbl, 1)
+
+        # Time-lapse: interval x count
+        self.tl_interval_spin = QSpinBox(host)
+        self.tl_interval_spin.setRange(1, 24 * 3600)
+        self.tl_interval_spin.setValue(60)
+        self.tl_interval_spin.setSuffix(" s")
+        self.tl_count_spin = QSpinBox(host)
+        self.tl_count_spin.setRange(1, 100000)
+        self.tl_count_spin.setValue(40)
+        self.tl_btn = QPushButton("开始延时", host)
+        self.tl_btn.setCheckable(True)
+        self.tl_btn.toggled.connect(self._on_timelapse_toggled)
+        self.tl_status_lbl = QLabel("--", host)
+        self.tl_status_lbl.setStyleSheet("color:#9aa1a9;")
+        self.timelapse.error.connect(self.tl_status_lbl.setToolTip)
+        self.tl_row = QHBoxLayout()
+        self.tl_row.setContentsMargins(0, 0, 0, 0)
+        self.tl_row.setSpacing(s(6))
+        self.tl_row.addWidget(QLabel("延时拍摄:"))
+        self.tl_row.addWidget(self.tl_interval_spin)
+        self.tl_row.addWidget(QLabel("x"))
+        self.tl_row.addWidget(self.tl_count_spin)
+        self.tl_row.addWidget(self.tl_btn)
+        self.tl_row.addWidget(self.tl_status_lbl, 1)
+
+    def attach(self, processor):
+        """A new camera session: captures wait for frames from this processor."""
+        processor.imageReady.connect(self.acquisition.frame_arrived)
+
+    def stop(self):
+        self.timelapse.stop()
+        if self.acquisition.running:
+            self.acquisition.stop()
+            self._set_acq_button(False)
+
+    # --- Multi-position acquisition ---
+    def _add_position(self):
+        n = self.acquisition.add_position(*self.grid.pan())
+        self.positions_lbl.setText(f"位置: {n}")
+
+    def _clear_positions(self):
+        if self.acquisition.running:
+            return
+        self.acquisition.clear_positions()
+        self.positions_lbl.setText("位置: 0")
+
+    def _on_run_toggled(self, on: bool):
+        if not on:
+            self.acquisition.stop()
+            self._set_acq_button(False)
+            return
+        if self._host.processor is None:
+            self.acq_status_lbl.setText("相机未启动")
+            self._set_acq_button(False)
+            return
+        if self.timelapse.running:
+            self._set_acq_button(False)
+            return
+        self._prepare("acq")
+        self.acq_status_lbl.setText("采集中…")
+        self._set_acq_button(True)
+        if not self.acquisition.start(self.rounds_spin.value()):
+            self._set_acq_button(False)
+
+    def _prepare(self, prefix: str):
+        self.acquisition.channels = [i for i, chk in enumerate(self.channel_chks) if chk.isChecked()]
+        self._dir = os.path.join(self._host.image_save_dir, time.strftime(f"{prefix}_%Y%m%d_%H%M%S"))
+
+    def _set_acq_button(self, on: bool):
+        self.multi_run_btn.blockSignals(True)
+        self.multi_run_btn.setChecked(on)
+        self.multi_run_btn.blockSignals(False)
+        self.multi_run_btn.setText("停止采集" if on else "多点采集")
+
+    def _grab(self):
+        processor = self._host.processor
+        frame = processor.native_frame() if processor is not None else None
+        if frame is None:
+            return None
+        img, bits = frame
+        return img, bits, processor.native_meta
+
+    def _save(self, img, bits: int, meta: dict, name: str):
+        self._snapshots.save(img, bits, meta, os.path.join(self._dir, name))
+
+    def _on_progress(self, rnd: int, pos: int, chan: int):
+        total = max(1, len(self.acquisition.positions))
+        text = f"第 {rnd} 轮  位置 {pos + 1}/{total}  通道 {chan}"
+        if self.acquisition.cycle_times:
+            text += f"  上轮周期 {self.acquisition.cycle_times[-1]:.2f} s"
+        self.acq_status_lbl.setText(text)
+
+    def _on_round(self, rnd: int, cycle_s: float):
+        self.acq_status_lbl.setText(f"第 {rnd} 轮完成  周期 {cycle_s:.2f} s")
+        self.acq_status_lbl.setToolTip(self._dir or "")
+
+    def _on_error(self, msg: str):
+        self._set_acq_button(False)
+        self.acq_status_lbl.setText(msg)
+
+    # --- Time-lapse ---
+    def _on_timelapse_toggled(self, on: bool):
+        if not on:
+            self.timelapse.stop()
+            return
+        if self._host.processor is None or self.acquisition.running:
+            self.tl_status_lbl.setText("相机未启动" if self._host.processor is None else "采集进行中")
+            self._set_timelapse_button(False)
+            return
+        self._prepare("timelapse")
+        self._set_timelapse_button(True)
+        self.timelapse.start(self.tl_interval_spin.value(), self.tl_count_spin.value())
+
+    def _on_slot(self, index: int) -> bool:
+        # a slot whose round cannot start is counted as missed by the scheduler
+        return self.acquisition.start(rounds=1, first_round=index + 1)
+
+    def _update_timelapse_status(self):
+        st = self.timelapse.lateness_stats()
+        done = len(self.timelapse.records)
+        self.tl_status_lbl.setText(
+            f"{done}/{self.timelapse.count}  延迟 {st['late_mean_ms']:.1f}/{st['late_max_ms']:.1f} ms  错过 {st['missed']}"
+        )
+        self.tl_status_lbl.setStyleSheet("color:#e0a040;" if st['missed'] else "color:#9aa1a9;")
+
+    def _on_timelapse_finished(self):
+        self._set_timelapse_button(False)
+        self._update_timelapse_status()
+        if self._dir and self.timelapse.records:
+            try:
+                os.makedirs(self._dir, exist_ok=True)
+                self.timelapse.save_log(os.path.join(self._dir, "timelapse.csv"))
+            except OSError as e:
+                self.tl_status_lbl.setText(f"日志保存失败: {e}")
+
+    def _set_timelapse_button(self, on: bool):
+        self.tl_btn.blockSignals(True)
+        self.tl_btn.setChecked(on)
+        self.tl_btn.blockSignals(False)
+        self.tl_btn.setText("停止延时" if on else "开始延时")
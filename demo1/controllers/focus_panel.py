@@ -0,0 +1,117 @@
+# This Python file uses the following encoding: utf-8
+from PySide6.QtCore import QObject
+from PySide6.QtWidgets import QCheckBox, QComboBox, QHBoxLayout, QLabel
+
+from autofocus import Autofocus, FocusTracker, METRICS
+
+
+class FocusPanel(QObject):
+    """
+    Focus sliders and 自动对焦 of the 画面控制 tab (refs of build_video_tab),
+    the 聚焦指标 row, and the autofocus / focus tracking over the serial focus
+    axis. Both metrics run as processor analyzers, see attach().
+    """
+
+    def __init__(self, host, refs, send, s):
+        super().__init__(host)
+        self._host = host
+        self._send = send
+        self.coarse = refs["focus_coarse"]
+        self.fine = refs["focus_fine"]
+        self.autofocus = Autofocus(send=send, parent=self)
+        self.autofocus.stepDone.connect(self._on_af_step)
+        self.autofocus.finished.connect(self._on_af_finished)
+        self.autofocus.error.connect(self._on_af_error)
+        refs["af_btn"].clicked.connect(self.start_autofocus)
+        self.tracker = FocusTracker(send=send, parent=self)
+        self.tracker.corrected.connect(lambda pos, _m: self._set_sliders(pos))
+        self.tracker.statsUpdated.connect(self._on_tracker_stats)
+        self.tracker.error.connect(self._on_tracker_error)
+        self.coarse.valueChanged.connect(lambda _v: self._on_slider())
+        self.fine.valueChanged.connect(lambda _v: self._on_slider())
+
+        # Autofocus metric + per-run timing
+        self.method_cb = QComboBox(host)
+        self.method_cb.addItems(list(METRICS))
+        self.status_lbl = QLabel("--", host)
+        self.status_lbl.setStyleSheet("color:#9aa1a9;")
+        self.track_chk = QCheckBox("焦点跟踪")
+        self.track_chk.setToolTip("每 N 帧评估清晰度并小步校正焦点（限时计算，不影响帧率）")
+        self.track_chk.toggled.connect(lambda _on: self.apply_tracking())
+        self.row = QHBoxLayout()
+        self.row.setContentsMargins(0, 0, 0, 0)
+        self.row.setSpacing(s(6))
+        self.row.addWidget(QLabel("聚焦指标:"))
+        self.row.addWidget(self.method_cb)
+        self.row.addWidget(self.track_chk)
+        self.row.addWidget(self.status_lbl, 1)
+
+    def attach(self, processor):
+        """A new camera session: measure on frames of this processor."""
+        processor.add_analyzer(self.autofocus.analyze)
+        processor.add_analyzer(self.tracker.analyze)
+
+    def stop(self):
+        self.autofocus.stop()
+        self.tracker.stop()
+
+    def position(self) -> int:
+        """Focus axis position in steps: coarse slider x10 plus fine slider."""
+        return self.coarse.value() * 10 + self.fine.value()
+
+    def apply_tracking(self):
+        if self.track_chk.isChecked() and self._host.processor is not None and not self.autofocus.running:
+            self.tracker.start(self.position())
+        else:
+            self.tracker.stop()
+
+    def start_autofocus(self):
+        if self._host.processor is None or self.autofocus.running:
+            self.status_lbl.setText("相机未启动" if self._host.processor is None else "聚焦中…")
+            return
+        self.autofocus.method = self.method_cb.currentText()
+        self.tracker.stop()
+        self.status_lbl.setText("聚焦中…")
+        self.autofocus.start(self.position())
+
+    def _set_sliders(self, pos: int):
+        coarse = int(round(pos / 10.0))
+        for w, v in ((self.coarse, coarse), (self.fine, pos - coarse * 10)):
+            w.blockSignals(True)
+            w.setValue(v)
+            w.blockSignals(False)
+
+    def _on_slider(self):
+        if not self.autofocus.running:
+            self._send(f"FOCUS:{self.position()}\r\n".encode("utf-8"))
+            self.apply_tracking()  # manual focus: track from the new position
+
+    def _on_tracker_stats(self, st: dict):
+        if self.autofocus.running:
+            return
+        self.status_lbl.setText(
+            f"跟踪 {st['state']}  焦点 {st['position']}  每 {st['every_n']} 帧  "
+            f"{st['metric_ms']:.2f} ms  校正 {st['corrections']}"
+        )
+
+    def _on_tracker_error(self, msg: str):
+        self.track_chk.setChecked(False)
+        self.status_lbl.setText(f"跟踪已停止: {msg}")
+
+    def _on_af_step(self, step: dict):
+        self.status_lbl.setText(
+            f"{step['phase']} {step['position']}  {step['step_ms']:.0f} ms "
+            f"(等待帧 {step['frame_wait_ms']:.0f}, 指标 {step['metric_ms']:.1f})"
+        )
+
+    def _on_af_finished(self, pos: int, _metric: float, summary: dict):
+        self._set_sliders(pos)
+        self.apply_tracking()
+        self.status_lbl.setText(
+            f"焦点 {pos}  {summary['frames']} 帧 ({summary['coarse_steps']}+{summary['fine_steps']})  "
+            f"{summary['total_ms']:.0f} ms, {summary['mean_step_ms']:.0f} ms/步"
+        )
+
+    def _on_af_error(self, msg: str):
+        self.apply_tracking()
+        self.status_lbl.setText(f"自动聚焦失败: {msg}")
@@ -0,0 +1,119 @@
+# This Python file uses the following encoding: utf-8
+import os
+import time
+
+from PySide6.QtCore import QObject
+from PySide6.QtWidgets import QComboBox, QHBoxLayout, QLabel
+
+from recorder import FrameRecorder
+
+
+class RecordingPanel(QObject):
+    """
+    存储图片 toggles continuous recording of the frame stream: a FrameRecorder
+    fed by a CameraWorker frame tap. Also builds the 录制格式 row.
+    """
+
+    def __init__(self, host, record_btn, s):
+        super().__init__(host)
+        self._host = host
+        self.recorder = None
+        self._error = None
+        self.button = record_btn
+        self.button.setCheckable(True)
+        self.button.toggled.connect(self._on_toggled)
+        self.format_cb = QComboBox(host)
+        self.format_cb.addItems(["raw", "npy", "tiff"])
+        self.format_cb.setToolTip(
+            "raw: 带帧索引的 .rawseq 序列 (np.memmap 随机访问); npy: 内存映射数组; tiff: 分块多页 TIFF (需要 tifffile)"
+        )
+        self.stats_lbl = QLabel("--", host)
+        self.stats_lbl.setStyleSheet("color:#9aa1a9;")
+        self.row = QHBoxLayout()
+        self.row.setContentsMargins(0, 0, 0, 0)
+        self.row.setSpacing(s(6))
+        self.row.addWidget(QLabel("录制格式:"))
+        self.row.addWidget(self.format_cb)
+        self.row.addWidget(self.stats_lbl, 1)
+
+    def start(self):
+        if self.recorder is not None:
+            return
+        host = self._host
+        if host.worker is None:
+            self.stats_lbl.setText("相机未启动")
+            self._set_button(False)
+            return
+        self._error = None
+        base = os.path.join(host.image_save_dir, time.strftime("rec_%Y%m%d_%H%M%S"))
+        self.recorder = FrameRecorder(base, self.format_cb.currentText(), metadata={
+            "objectives": [b.text() for b in host.obj_buttons],
+            "channels": [b.text() for b in host.channel_buttons],
+            "fluorescence": host.camera_mode_fluorescence,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        self.update_context()
+        self.recorder.statsUpdated.connect(self._on_stats)
+        self.recorder.error.connect(self._on_error)
+        self.recorder.start()
+        host.worker.add_frame_tap(self.recorder.offer)
+        self._set_button(True)
+
+    def stop(self):
+        if self.recorder is None:
+            return
+        if self._host.worker is not None:
+            self._host.worker.remove_frame_tap(self.recorder.offer)
+        self.recorder.stop()  # drains the queue before returning
+        st = self.recorder.stats()
+        paths = self.recorder.paths
+        self.recorder = None
+        self._on_stats(st)
+        if paths:
+            self.stats_lbl.setToolTip("\n".join(paths))
+        self._set_button(False)
+
+    def update_context(self):
+        """Tag the following frames with the selected channel/objective."""
+        if self.recorder is None:
+            return
+        host = self._host
+        self.recorder.set_context(
+            channel=next((i for i, b in enumerate(host.channel_buttons) if b.isChecked()), -1),
+            objective=next((i for i, b in enumerate(host.obj_buttons) if b.isChecked()), -1),
+        )
+
+    def tap_failed(self, tap, msg: str) -> bool:
+        """CameraWorker.tapFailed: stop with the error if tap was ours; False otherwise."""
+        if self.recorder is None or tap != self.recorder.offer:
+            return False
+        self._on_error(msg)
+        return True
+
+    def _on_toggled(self, on: bool):
+        if on:
+            self.start()
+        else:
+            self.stop()
+
+    def _set_button(self, on: bool):
+        self.button.blockSignals(True)
+        self.button.setChecked(on)
+        self.button.blockSignals(False)
+        self.button.setText("停止录制" if on else "存储图片")
+
+    def _on_stats(self, st: dict):
+        if self.recorder is None and self._error:
+            return  # keep the error visible over late statistics
+        self.stats_lbl.setText(
+            f"{st['frames']} 帧  {st['mb_s']:.1f} MB/s  队列 {st['queue_depth']}/{st['queue_size']}  丢弃 {st['dropped']}"
+        )
+        # Queue more than half full: the disk does not keep up
+        busy = st['dropped'] > 0 or st['queue_depth'] > st['queue_size'] // 2
+        self.stats_lbl.setStyleSheet("color:#e0a040;" if busy else "color:#9aa1a9;")
+
+    def _on_error(self, msg: str):
+        self._error = msg
+        self.stop()
+        self.stats_lbl.setText(msg)
+        self.stats_lbl.setStyleSheet("color:#e0a040;")
@@ -0,0 +1,138 @@
+# This Python file uses the following encoding: utf-8
+import os
+
+from PySide6.QtCore import QObject
+from PySide6.QtSerialPort import QSerialPortInfo
+from PySide6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QPushButton
+
+from serial_link import SerialLink
+
+
+class SerialPanel(QObject):
+    """
+    串口 row of the 其他设置 tab and the SerialLink behind it. Serial I/O
+    runs in its own thread; send() only queues the command.
+    """
+
+    def __init__(self, parent, s):
+        super().__init__(parent)
+        self.link = SerialLink(self)
+        self.link.opened.connect(self._on_opened)
+        self.link.closed.connect(self._on_closed)
+        self.link.errorOccurred.connect(self._on_error)
+        self.link.sent.connect(self._on_sent)
+        self.link.lineReceived.connect(self._on_line)
+        self.link.replied.connect(self._on_replied)
+        self._port_name = ""
+        self.port_cb = QComboBox(parent)
+        self.refresh_btn = QPushButton("刷新", parent)
+        self.toggle_btn = QPushButton("连接", parent)
+        self.toggle_btn.setCheckable(True)
+        self.status_lbl = QLabel("未连接", parent)
+        self.status_lbl.setStyleSheet("color:#9aa1a9;")
+        self.refresh_btn.clicked.connect(self.refresh_ports)
+        self.toggle_btn.toggled.connect(self._on_toggle)
+        self.row = QHBoxLayout()
+        self.row.setContentsMargins(0, 0, 0, 0)
+        self.row.setSpacing(s(10))
+        self.row.addWidget(QLabel("串口:"))
+        self.row.addWidget(self.port_cb, 1)
+        self.row.addWidget(self.refresh_btn)
+        self.row.addWidget(self.toggle_btn)
+        self.row.addWidget(self.status_lbl)
+        self.refresh_ports()
+
+    def send(self, data: bytes, **kw):
+        """Queue a command on the serial thread; returns its Future (None when not connected)."""
+        if not self.link.is_open:
+            self.status_lbl.setText("未连接，无法发送")
+            return None
+        return self.link.send(data, **kw)
+
+    def stop(self):
+        self.link.stop()
+
+    def refresh_ports(self):
+        cur = self.port_cb.currentData()
+        cur = cur.get("sysloc") if isinstance(cur, dict) else cur
+        self.port_cb.blockSignals(True)
+        try:
+            self.port_cb.clear()
+            for info in QSerialPortInfo.availablePorts():
+                name = info.portName()
+                sysloc = info.systemLocation() or name
+                desc = info.description() or ""
+                label = f"{name}  {desc}" if desc else name
+                # store both info object and props for robust opening
+                self.port_cb.addItem(label, {"name": name, "sysloc": sysloc, "info": info})
+            # ports not enumerated by Qt, e.g. the pty of sim/serial_device.py
+            for path in filter(None, os.environ.get("PCR_SERIAL_PORTS", "").split(os.pathsep)):
+                self.port_cb.addItem(path, {"name": os.path.basename(path), "sysloc": path, "info": None})
+            # try restore selection (by sysloc)
+            if cur is not None:
+                for i in range(self.port_cb.count()):
+                    d = self.port_cb.itemData(i)
+                    if isinstance(d, dict) and d.get("sysloc") == cur:
+                        self.port_cb.setCurrentIndex(i)
+                        break
+        finally:
+            self.port_cb.blockSignals(False)
+
+    def _on_toggle(self, on: bool):
+        if on:
+            data = self.port_cb.currentData()
+            if not data:
+                self._set_button(False)
+                self.status_lbl.setText("未选择端口")
+                return
+            sysloc = data.get("sysloc") if isinstance(data, dict) else str(data)
+            name = data.get("name") if isinstance(data, dict) else None
+            self._port_name = name or sysloc or ""
+            self.toggle_btn.setText("断开")
+            self.status_lbl.setText("连接中...")
+            self.link.open_port(sysloc or name or "")
+        else:
+            self.link.close_port()
+            self.toggle_btn.setText("连接")
+            self.status_lbl.setText("未连接")
+
+    def _set_button(self, on: bool):
+        self.toggle_btn.blockSignals(True)
+        self.toggle_btn.setChecked(on)
+        self.toggle_btn.blockSignals(False)
+        self.toggle_btn.setText("断开" if on else "连接")
+
+    def _on_opened(self, port: str):
+        self.status_lbl.setText(f"已连接: {self._port_name or port}")
+
+    def _on_closed(self):
+        self._set_button(False)
+
+    def _on_error(self, msg: str):
+        if not self.link.is_open:
+            self._set_button(False)
+            self.status_lbl.setText(f"连接失败: {msg}")
+        else:
+            self.status_lbl.setText(f"串口错误: {msg}")
+
+    def _on_sent(self, _cid: int, data: bytes):
+        disp = data if len(data) < 24 else (data[:21] + b"...")
+        self.status_lbl.setText(f"已发送 {len(data)}B: {disp!r}")
+
+    def _on_line(self, line: bytes):
+        disp = line if len(line) < 24 else (line[:21] + b"...")
+        self.status_lbl.setText(f"收到: {disp!r}")
+
+    def _on_replied(self, _cid: int, line: bytes):
+        # round-trip statistics per command type, e.g. "CHAN  n=12  p50 3.1 ms  p95 4.0 ms"
+        rows = []
+        for kind, st in sorted(self.link.latency_stats().items()):
+            row = f"{kind}  n={st['count']}"
+            if "p50_ms" in st:
+                row += f"  p50 {st['p50_ms']:.1f} ms  p95 {st['p95_ms']:.1f} ms  max {st['max_ms']:.1f} ms"
+            if st["timeouts"] or st["errors"]:
+                row += f"  超时 {st['timeouts']}  错误 {st['errors']}"
+            rows.append(row)
+        self.status_lbl.setToolTip("\n".join(rows))
+        disp = line if len(line) < 24 else (line[:21] + b"...")
+        self.status_lbl.setText(f"应答: {disp!r}")
@@ -0,0 +1,85 @@
+# This Python file uses the following encoding: utf-8
+import os
+import time
+
+from PySide6.QtCore import QObject
+from PySide6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QSpinBox
+
+from snapshot import SnapshotService
+
+
+class SnapshotPanel(QObject):
+    """
+    拍照 button and the 拍照格式 row. The current full-depth frame is encoded
+    on a thread pool (SnapshotService); the host provides current_frame(),
+    processor, image_save_dir and the channel/objective buttons.
+    """
+
+    def __init__(self, host, capture_btn, s):
+        super().__init__(host)
+        self._host = host
+        self.service = SnapshotService(parent=self)
+        self.service.saved.connect(self._on_saved)
+        self.service.failed.connect(self._on_failed)
+        capture_btn.clicked.connect(self.take)
+        self.format_cb = QComboBox(host)
+        self.format_cb.addItems(["png", "tiff"])
+        self.level_spin = QSpinBox(host)
+        self.level_spin.setRange(0, 9)
+        self.level_spin.setValue(3)
+        self.level_spin.setToolTip("无损压缩等级 (0 = 不压缩, 9 = 最小文件)")
+        self.status_lbl = QLabel("--", host)
+        self.status_lbl.setStyleSheet("color:#9aa1a9;")
+        self.row = QHBoxLayout()
+        self.row.setContentsMargins(0, 0, 0, 0)
+        self.row.setSpacing(s(6))
+        self.row.addWidget(QLabel("拍照格式:"))
+        self.row.addWidget(self.format_cb)
+        self.row.addWidget(QLabel("压缩:"))
+        self.row.addWidget(self.level_spin)
+        self.row.addWidget(self.status_lbl, 1)
+
+    def take(self):
+        """Queue the current full-depth frame for saving; returns the target path or None."""
+        frame = self._host.current_frame()
+        if frame is None:
+            self.status_lbl.setText("无图像")
+            return None
+        img, bits = frame
+        processor = self._host.processor
+        meta = processor.native_meta if processor is not None else {}
+        base = os.path.join(self._host.image_save_dir, time.strftime("img_%Y%m%d_%H%M%S"))
+        base += f"_{int(time.time() * 1000) % 1000:03d}"
+        path = self.save(img, bits, meta, base)
+        self.status_lbl.setText(f"保存中 ({self.service.pending()})…")
+        return path
+
+    def save(self, img, bits: int, meta: dict, base_path: str):
+        """Queue img with the current format, compression and capture metadata."""
+        return self.service.save(img, base_path, self.format_cb.currentText(),
+                                 self.level_spin.value(), self._metadata(bits, meta))
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self.service.wait(msecs)
+
+    def _metadata(self, bits: int, frame_meta: dict) -> dict:
+        host = self._host
+        channel = next((b.text() for b in host.channel_buttons if b.isChecked()), None)
+        objective = next((b.text() for b in host.obj_buttons if b.isChecked()), None)
+        md = {k: frame_meta[k] for k in ('fmt', 'frame_id', 'timestamp', 'host_time', 'exposure_us', 'gain_db')
+              if k in frame_meta}
+        md.update({
+            "bits": bits,
+            "channel": channel if host.camera_mode_fluorescence else None,
+            "objective": objective,
+            "fluorescence": host.camera_mode_fluorescence,
+            "saved": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        return md
+
+    def _on_saved(self, path: str, ms: float):
+        self.status_lbl.setText(f"已保存 {os.path.basename(path)} ({ms:.0f} ms)")
+        self.status_lbl.setToolTip(path)
+
+    def _on_failed(self, msg: str):
+        self.status_lbl.setText(msg)
@@ -0,0 +1,444 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import threading
+import time
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from PySide6.QtGui import QImage
+
+from frame_ring import FrameRing
+from perf_probe import probes
+from pixel_unpack import auto_window, bit_depth, unpack, window_lut
+
+
+# Pseudo-colour tints (R, G, B) per fluorescence channel name
+CHANNEL_TINTS = {
+    "DAPI": (77, 124, 255),
+    "GFP": (60, 230, 90),
+    "RFP": (255, 96, 64),
+    "TX RED": (230, 30, 40),
+}
+
+DEFAULT_CHAIN = ("downscale", "equalize", "pseudocolor")
+
+
+def _fit_size(w: int, h: int, vw: int, vh: int) -> tuple[int, int]:
+    """w x h fitted into vw x vh with the integer math of QSize.scaled(KeepAspectRatio)."""
+    rw = vh * w // h
+    if rw <= vw:
+        return max(1, rw), vh
+    return vw, max(1, vw * h // w)
+
+
+class PreviewScaler:
+    """
+    Fast live-preview downscaler with cached buffers; output always fits the
+    viewport exactly so the GUI never rescales live frames.
+    - 'decimate': integer stride decimation (img[::k, ::k]) into a cached buffer,
+                  then a cheap INTER_LINEAR touch-up of the small image to the fit size
+    - 'area':     cv2.resize INTER_AREA straight into the output buffer
+    - 'auto':     decimate when the integer factor lands close to the fit size
+                  (>= decimate_fill of it), area otherwise
+    The plan and buffers are rebuilt only when the viewport or source size changes.
+    """
+
+    def __init__(self, mode: str = "auto", decimate_fill: float = 0.75):
+        if mode not in ("auto", "decimate", "area"):
+            raise ValueError(f"Unknown preview scaling mode: {mode}")
+        self.mode = mode
+        self.decimate_fill = decimate_fill
+        self._key = None
+        self._step = 1
+        self._size = (0, 0)
+        self._dec: np.ndarray | None = None
+        self._out: np.ndarray | None = None
+        self.reallocations = 0
+
+    def scale(self, img: np.ndarray, viewport: tuple[int, int]) -> np.ndarray:
+        key = (viewport, img.shape, img.dtype)
+        if key != self._key:
+            self._plan(img, viewport)
+            self._key = key
+        if self._out is None:
+            return img
+        if self._step > 1:
+            np.copyto(self._dec, img[::self._step, ::self._step])
+            if self._dec.shape == self._out.shape:
+                return self._dec
+            cv2.resize(self._dec, self._size, dst=self._out, interpolation=cv2.INTER_LINEAR)
+        else:
+            cv2.resize(img, self._size, dst=self._out, interpolation=cv2.INTER_AREA)
+        return self._out
+
+    def _plan(self, img: np.ndarray, viewport: tuple[int, int]):
+        vw, vh = viewport
+        h, w = img.shape[:2]
+        self._out = None
+        self._dec = None
+        self._step = 1
+        if vw <= 0 or vh <= 0 or (w <= vw and h <= vh):
+            return
+        fit_w, fit_h = _fit_size(w, h, vw, vh)
+        self._size = (fit_w, fit_h)
+        self._out = np.empty((fit_h, fit_w) + img.shape[2:], dtype=img.dtype)
+        k = -(-w // vw) if w / vw >= h / vh else -(-h // vh)  # smallest step that fits
+        dec_w = -(-w // k)
+        use_dec = self.mode == "decimate" or (
+            self.mode == "auto" and dec_w >= self.decimate_fill * fit_w
+        )
+        if use_dec and k > 1:
+            self._step = k
+            self._dec = np.empty((-(-h // k), dec_w) + img.shape[2:], dtype=img.dtype)
+        self.reallocations += 1
+
+
+class FrameProcessor(QThread):
+    """
+    Display processing stage between CameraWorker and the GUI.
+    Pulls the newest frame from the camera ring, runs a configurable chain of
+    operations and publishes a ready-to-blit image (sized to the viewport) into
+    its own output ring. The GUI only converts that image to a pixmap.
+    Raw camera payloads (packed 10/12-bit, Mono16, Bayer, see ring meta) are
+    unpacked here first, off the camera callback, into cached buffers. The
+    full-depth image is kept (native_frame()) and only the display copy is
+    reduced to 8 bits through a window/level LUT (set_window / set_auto_window).
+
+    Chain operations (executed in the given order):
+    - 'equalize'    global histogram equalization
+    - 'equalize_lut' the same tone curve, computed but not applied: it travels
+                    with the output frame as meta['lut'] for a GPU display
+                    that applies it in the shader
+    - 'clahe'       contrast limited adaptive histogram equalization
+    - 'downscale'   fit into the viewport keeping aspect ratio (PreviewScaler)
+    - 'pseudocolor' map grey to the current channel tint (must come last)
+
+    After stop(), still_frame() re-runs the chain on the last frame at full
+    resolution so a paused view can be smooth-scaled by the GUI.
+
+    A frame that fails to decode or process is skipped (its slot released,
+    counted in failed); error is emitted once per run of failing frames and
+    the loop keeps going. An analyzer that raises is removed and reported.
+    """
+
+    imageReady = Signal(int)  # sequence number of the published display image
+    error = Signal(str)
+
+    def __init__(self, source: FrameRing, parent=None):
+        super().__init__(parent)
+        self._source = source
+        # Output images; latest-wins so the GUI never renders a stale one
+        self.output = FrameRing(3, latest_only=True)
+        self._wake = threading.Event()
+        self._running = False
+        self._cfg_lock = threading.Lock()
+        self._chain = list(DEFAULT_CHAIN)
+        self._viewport = (0, 0)
+        self._tint: tuple[int, int, int] | None = None
+        self._tint_lut = None
+        self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        self._held = None  # input slot kept until the next frame is taken
+        self._last_input: np.ndarray | None = None
+        self._scaler = PreviewScaler()
+        self._bufs: dict[str, np.ndarray] = {}
+        self._window = (0.0, 1.0)  # normalized to the native full scale
+        self._auto_window = False
+        self._wlut: np.ndarray | None = None
+        self._wlut_key = None
+        self.window_native = (0, 255)  # window actually applied, native units
+        self._native_lock = threading.Lock()
+        self._native: np.ndarray | None = None  # last full-depth frame
+        self.native_meta: dict = {}  # ring meta of that frame (format, frame ID, timestamp, ...)
+        self._bits = 8
+        self._frame_lut: np.ndarray | None = None  # set by 'equalize_lut' for the frame in _process
+        self._analyzers = ()  # callables(native, bits, meta) run in this thread, e.g. autofocus
+        self.processed = 0
+        self.failed = 0  # frames skipped because decoding/processing raised
+
+    # --- configuration (any thread) ---
+    def set_chain(self, ops):
+        unknown = [op for op in ops if op not in self._OPS]
+        if unknown:
+            raise ValueError(f"Unknown processing ops: {unknown}")
+        with self._cfg_lock:
+            self._chain = list(ops)
+
+    def chain(self) -> list[str]:
+        with self._cfg_lock:
+            return list(self._chain)
+
+    def set_viewport(self, w: int, h: int):
+        with self._cfg_lock:
+            self._viewport = (max(0, int(w)), max(0, int(h)))
+
+    def set_tint(self, rgb: tuple[int, int, int] | None):
+        """Pseudo-colour tint for 'pseudocolor'; None keeps the image grey."""
+        lut = None
+        if rgb is not None:
+            ramp = np.arange(256, dtype=np.float32) / 255.0
+            # applyColorMap expects a 256x1x3 BGR table
+            lut = np.empty((256, 1, 3), dtype=np.uint8)
+            for i, c in enumerate((rgb[2], rgb[1], rgb[0])):
+                lut[:, 0, i] = np.round(ramp * c).astype(np.uint8)
+        with self._cfg_lock:
+            self._tint = rgb
+            self._tint_lut = lut
+
+    def set_window(self, lo: float, hi: float):
+        """Display window as fractions of the native full scale (0..1)."""
+        with self._cfg_lock:
+            self._window = (float(lo), max(float(lo) + 1e-6, float(hi)))
+
+    def set_auto_window(self, on: bool):
+        """Follow the 0.1 / 99.9 percentiles of every frame instead of the fixed window."""
+        with self._cfg_lock:
+            self._auto_window = bool(on)
+
+    def add_analyzer(self, fn):
+        """
+        Call fn(native, bits, meta) in the processing thread for every frame
+        taken, before the display chain. fn gets the full-depth frame and must
+        not keep a reference to it. An fn that raises is removed (see error).
+        """
+        self._analyzers = self._analyzers + (fn,)
+
+    def remove_analyzer(self, fn):
+        self._analyzers = tuple(a for a in self._analyzers if a != fn)
+
+    def native_frame(self) -> tuple[np.ndarray, int] | None:
+        """Copy of the last frame at full bit depth (uint8/uint16) and its significant bits."""
+        with self._native_lock:
+            if self._native is None:
+                return None
+            return self._native.copy(), self._bits
+
+    # --- thread control ---
+    def notify(self, *_args):
+        """Wake the processing loop; safe to call from the camera thread."""
+        self._wake.set()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        self.wait()
+
+    def run(self):
+        self._running = True
+        failing = False
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            if not self._running:
+                break
+            latest = self._source.acquire_latest()
+            if latest is None:
+                continue
+            slot, _seq, arr = latest
+            try:
+                self._take(slot, arr)
+                failing = False
+            except Exception as e:
+                self._skip_frame(slot)
+                if not failing:  # once per run of bad frames, not at frame rate
+                    self.error.emit(f"Frame processing failed: {e!r}")
+                failing = True
+        with self._native_lock:
+            if self._held is not None:
+                self._source.release(self._held)
+                self._held = None
+            if self._native is not None and self._native.base is not None:
+                self._native = self._native.copy()  # Mono8 frames live in the ring slot
+
+    def _take(self, slot: int, arr: np.ndarray):
+        timed = probes.enabled
+        with self._native_lock:
+            if self._held is not None:
+                self._source.release(self._held)
+            self._held = slot
+            if timed:
+                t0 = time.perf_counter()
+            arr = self._decode(arr, self._source.meta(slot))
+            if timed:
+                t1 = time.perf_counter()
+                probes.add('decode', t1 - t0)
+            for analyze in self._analyzers:
+                try:
+                    analyze(self._native, self._bits, self.native_meta)
+                except Exception as e:
+                    self.remove_analyzer(analyze)
+                    self.error.emit(f"Analyzer {getattr(analyze, '__qualname__', analyze)} "
+                                    f"failed and was removed: {e!r}")
+            if timed and self._analyzers:
+                probes.add('analyze', time.perf_counter() - t1)
+        self._last_input = arr
+        self._process(arr, timed)
+
+    def _skip_frame(self, slot: int):
+        self.failed += 1
+        with self._native_lock:
+            # the partly decoded frame is not kept; Mono8 frames live in the slot
+            self._source.release(slot)
+            if self._held == slot:
+                self._held = None
+            self._native = None
+            self.native_meta = {}
+        self._last_input = None
+
+    def still_frame(self) -> np.ndarray | None:
+        """
+        Full-resolution display image of the last frame, processed with the
+        current chain minus 'downscale'. Call only after stop(), once the camera
+        no longer writes into the source ring.
+        """
+        if self._last_input is None or self.isRunning():
+            return None
+        with self._cfg_lock:
+            chain = [op for op in self._chain if op != "downscale"]
+            lut = self._tint_lut
+        img = self._last_input
+        for op in chain:
+            img = self._OPS[op](self, img, (0, 0), lut)
+        return img.copy()
+
+    # --- processing ---
+    def _decode(self, raw: np.ndarray, meta: dict | None) -> np.ndarray:
+        """Native payload -> full-depth frame (kept) -> windowed Mono8 for the display chain."""
+        if meta is None or meta.get('fmt') == 'Mono8':
+            native, bits = raw, 8
+        else:
+            fmt, w, h = meta['fmt'], meta['w'], meta['h']
+            bits = bit_depth(fmt)
+            buf = self._buf("unpack", (h, w), np.uint8 if bits == 8 else np.uint16)
+            native = unpack(raw, fmt, w, h, out=buf)
+        self._native = native
+        self._bits = bits
+        self.native_meta = meta or {}
+        return self._apply_window(native, bits)
+
+    def _apply_window(self, img: np.ndarray, bits: int) -> np.ndarray:
+        with self._cfg_lock:
+            window = self._window
+            auto = self._auto_window
+        full = (1 << bits) - 1
+        if auto:
+            lo, hi = auto_window(img, bits)
+        else:
+            lo, hi = round(window[0] * full), round(window[1] * full)
+        self.window_native = (lo, hi)
+        if img.dtype == np.uint8 and (lo, hi) == (0, 255):
+            return img
+        key = (bits, lo, hi)
+        if key != self._wlut_key:
+            self._wlut = window_lut(bits, lo, hi, out=self._wlut)
+            self._wlut_key = key
+        dst = self._buf("display8", img.shape)
+        if img.dtype == np.uint8:
+            cv2.LUT(img, self._wlut, dst=dst)
+        else:
+            np.take(self._wlut, img, out=dst, mode='clip')
+        return dst
+
+    def _process(self, arr: np.ndarray, timed: bool = False):
+        with self._cfg_lock:
+            chain = list(self._chain)
+            viewport = self._viewport
+            lut = self._tint_lut
+        img = arr
+        self._frame_lut = None
+        for op in chain:
+            if timed:
+                t0 = time.perf_counter()
+            img = self._OPS[op](self, img, viewport, lut)
+            if timed:
+                probes.add(op, time.perf_counter() - t0)
+        if timed:
+            t0 = time.perf_counter()
+        out_slot = self.output.acquire_write(img.nbytes)
+        if out_slot < 0:
+            if timed:
+                probes.count('output_full')
+            return
+        # the display image carries the camera meta (frame ID, timestamps) of its
+        # source frame, plus proc_t: perf_counter() when processing finished
+        meta = dict(self.native_meta)
+        meta['proc_t'] = time.perf_counter()
+        if self._frame_lut is not None:
+            meta['lut'] = self._frame_lut
+        try:
+            dst = self.output.writable(out_slot, img.shape, img.dtype, meta=meta)
+            np.copyto(dst, img)
+            seq = self.output.publish(out_slot)
+        except BaseException:
+            self.output.abort_write(out_slot)
+            raise
+        self.processed += 1
+        if timed:
+            probes.add('publish', time.perf_counter() - t0)
+        self.imageReady.emit(seq)
+
+    def _buf(self, key: str, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        # per-op scratch buffers, reallocated only when the shape changes
+        b = self._bufs.get(key)
+        if b is None or b.shape != shape or b.dtype != dtype:
+            b = np.empty(shape, dtype=dtype)
+            self._bufs[key] = b
+        return b
+
+    def _op_equalize(self, img, _viewport, _lut):
+        if img.ndim != 2:
+            return img
+        dst = self._buf("equalize", img.shape)
+        cv2.equalizeHist(img, dst=dst)
+        return dst
+
+    def _op_equalize_lut(self, img, _viewport, _lut):
+        if img.ndim == 2:
+            self._frame_lut = equalize_lut(img)  # new array per frame: safe to hand to the GUI
+        return img
+
+    def _op_clahe(self, img, _viewport, _lut):
+        if img.ndim != 2:
+            return img
+        dst = self._buf("clahe", img.shape)
+        self._clahe.apply(img, dst=dst)
+        return dst
+
+    def _op_downscale(self, img, viewport, _lut):
+        return self._scaler.scale(img, viewport)
+
+    def _op_pseudocolor(self, img, _viewport, lut):
+        if lut is None or img.ndim != 2:
+            return img
+        dst = self._buf("pseudocolor", img.shape + (3,))
+        cv2.applyColorMap(img, lut, dst=dst)
+        return dst
+
+    _OPS = {
+        "equalize": _op_equalize,
+        "equalize_lut": _op_equalize_lut,
+        "clahe": _op_clahe,
+        "downscale": _op_downscale,
+        "pseudocolor": _op_pseudocolor,
+    }
+
+
+def equalize_lut(arr: np.ndarray) -> np.ndarray:
+    """256-entry tone curve equivalent to cv2.equalizeHist for a Mono8 image."""
+    hist = np.bincount(arr.ravel(), minlength=256)
+    cdf = np.cumsum(hist)
+    nz = cdf[cdf > 0]
+    cdf_min = nz[0] if nz.size else 0
+    total = cdf[-1]
+    if total <= cdf_min:
+        return np.arange(256, dtype=np.uint8)
+    lut = np.round((cdf - cdf_min) * 255.0 / (total - cdf_min))
+    return np.clip(lut, 0, 255).astype(np.uint8)
+
+
+def to_qimage(arr: np.ndarray) -> QImage:
+    """Wrap a processed display array (grey or BGR) as a QImage without copying."""
+    h, w = arr.shape[:2]
+    fmt = QImage.Format_BGR888 if arr.ndim == 3 else QImage.Format_Grayscale8
+    return QImage(arr.data, w, h, arr.strides[0], fmt)
@@ -0,0 +1,139 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class FrameRing:
+    """
+    Fixed-depth ring of preallocated frame slots shared by CameraWorker (writer)
+    and the GUI (reader). Slots are flat byte buffers reused across frames; only
+    the slot index and a sequence number travel through Qt signals.
+
+    Slot life cycle: FREE -> WRITING -> READY -> HELD -> FREE.
+    When no FREE slot is left, the oldest READY slot (published but not yet
+    picked up by the reader) is reclaimed and counted as dropped.
+    With latest_only=True, publishing a frame immediately recycles any older
+    unread frame, so at most one frame is ever waiting for the reader.
+    """
+
+    FREE, WRITING, READY, HELD = range(4)
+
+    def __init__(self, depth: int = 4, latest_only: bool = False):
+        if depth < 2:
+            raise ValueError("FrameRing needs at least 2 slots")
+        self._lock = threading.Lock()
+        self._depth = depth
+        self._bufs: list[np.ndarray | None] = [None] * depth
+        self._state = [self.FREE] * depth
+        self._seq = [0] * depth
+        self._shape: list[tuple] = [()] * depth
+        self._dtype: list[np.dtype] = [np.dtype(np.uint8)] * depth
+        self._meta: list[dict | None] = [None] * depth
+        self._ready: deque[int] = deque()
+        self._next_seq = 1
+        self.latest_only = latest_only
+        self.dropped = 0  # READY frames reclaimed before the reader got them
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    # --- writer side (camera thread) ---
+    def acquire_write(self, nbytes: int) -> int:
+        """Reserve a slot able to hold nbytes. Returns -1 if every slot is busy."""
+        with self._lock:
+            slot = -1
+            for i, st in enumerate(self._state):
+                if st == self.FREE:
+                    slot = i
+                    break
+            if slot < 0:
+                if not self._ready:
+                    return -1
+                # drop-oldest: reader fell behind, recycle the stalest frame
+                slot = self._ready.popleft()
+                self.dropped += 1
+            self._state[slot] = self.WRITING
+        buf = self._bufs[slot]
+        if buf is None or buf.nbytes < nbytes:
+            # grows only when the frame size increases (first frame, larger ROI)
+            self._bufs[slot] = np.empty(nbytes, dtype=np.uint8)
+        return slot
+
+    def writable(self, slot: int, shape: tuple, dtype=np.uint8, meta: dict | None = None) -> np.ndarray:
+        """
+        Return a writable ndarray view of a WRITING slot with the given layout.
+        meta travels with the slot (e.g. pixel format of a raw payload).
+        """
+        dtype = np.dtype(dtype)
+        self._shape[slot] = tuple(shape)
+        self._dtype[slot] = dtype
+        self._meta[slot] = meta
+        return self._view(slot)
+
+    def meta(self, slot: int) -> dict | None:
+        """Metadata stored with the slot by writable(); valid while the slot is held."""
+        return self._meta[slot]
+
+    def publish(self, slot: int) -> int:
+        """Mark a WRITING slot READY and return its sequence number."""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._seq[slot] = seq
+            self._state[slot] = self.READY
+            if self.latest_only:
+                self._drop_ready()
+            self._ready.append(slot)
+            return seq
+
+    def abort_write(self, slot: int):
+        """Give a WRITING slot back unpublished (the frame could not be copied)."""
+        with self._lock:
+            if self._state[slot] == self.WRITING:
+                self._state[slot] = self.FREE
+
+    # --- reader side (GUI thread) ---
+    def acquire_latest(self) -> tuple[int, int, np.ndarray] | None:
+        """
+        Take ownership of the newest READY slot, recycling any older unread ones.
+        Returns (slot, seq, view) or None when nothing new was published.
+        """
+        with self._lock:
+            if not self._ready:
+                return None
+            slot = self._ready.pop()
+            self._drop_ready()
+            self._state[slot] = self.HELD
+            seq = self._seq[slot]
+        return slot, seq, self._view(slot)
+
+    def release(self, slot: int):
+        """Hand a HELD slot back to the writer."""
+        with self._lock:
+            if self._state[slot] == self.HELD:
+                self._state[slot] = self.FREE
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._ready)
+
+    @property
+    def published(self) -> int:
+        return self._next_seq - 1
+
+    def _drop_ready(self):
+        # caller holds the lock
+        while self._ready:
+            self._state[self._ready.popleft()] = self.FREE
+            self.dropped += 1
+
+    def _view(self, slot: int) -> np.ndarray:
+        shape = self._shape[slot]
+        dtype = self._dtype[slot]
+        n = int(np.prod(shape)) * dtype.itemsize
+        return self._bufs[slot][:n].view(dtype).reshape(shape)
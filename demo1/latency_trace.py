@@ -0,0 +1,167 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LatencyTrace:
+    """
+    Glass-to-glass latency and missing frames, from the per-frame meta that
+    CameraWorker attaches (frame_id, timestamp, host_t, gap).
+
+    - on_frame(raw, meta)      camera frame tap: every published frame; counts
+                               gaps and refines the fallback clock estimate
+    - on_shown(meta, t_shown)  render tick: one record per frame put on screen
+
+    Device timestamps are mapped onto perf_counter() with clock() (the
+    worker's latched mapping). Without one, timestamps are scaled by tick()
+    (seconds per device tick, default 1 ns) and the offset is estimated as the
+    smallest (host receive - device timestamp) seen so far, which leaves out
+    the fixed part of the transport delay; summary() reports which method
+    was used. Glass-to-glass = shown - device timestamp (exposure start on
+    most cameras, see the camera manual).
+
+    The histogram covers every shown frame since reset(); per-frame records
+    and the gap log keep the last `keep` entries for export.
+    """
+
+    def __init__(self, clock=None, tick=None, bin_ms: float = 1.0, max_ms: float = 1000.0,
+                 keep: int = 100000):
+        self._clock = clock or (lambda: None)
+        self._tick = tick or (lambda: 1e-9)
+        self.bin_ms = bin_ms
+        self._nbins = int(max_ms / bin_ms)
+        self._lock = threading.Lock()
+        self._keep = keep
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = np.zeros(self._nbins + 1, dtype=np.int64)  # last bin: >= max_ms
+            self.records: deque = deque(maxlen=self._keep)
+            self.gaps: deque = deque(maxlen=self._keep)  # (frame_id, missing before it, host time.time())
+            self.received = 0
+            self.missing = 0
+            self.shown = 0
+            self._min_offset = None
+            self._min_scale = None  # tick the estimate was made with
+            self._first_id = None
+            self._last_id = None
+
+    # --- feeding (camera thread / GUI thread) ---
+    def on_frame(self, _raw, meta: dict):
+        fid = meta.get('frame_id')
+        gap = meta.get('gap', 0)
+        with self._lock:
+            self.received += 1
+            if self._first_id is None:
+                self._first_id = fid
+            self._last_id = fid
+            if gap:
+                self.missing += gap
+                self.gaps.append((fid, gap, meta.get('host_time')))
+            ts, host_t = meta.get('timestamp'), meta.get('host_t')
+            if ts is not None and host_t is not None:
+                scale = self._tick()
+                if scale != self._min_scale:  # another camera: start over
+                    self._min_scale, self._min_offset = scale, None
+                off = host_t - ts * scale
+                if self._min_offset is None or off < self._min_offset:
+                    self._min_offset = off
+
+    def on_shown(self, meta: dict | None, t_shown: float | None = None):
+        if not meta or meta.get('timestamp') is None:
+            return
+        t_shown = time.perf_counter() if t_shown is None else t_shown
+        scale, offset, _method = self._mapping()
+        if offset is None:
+            return
+        exposed = meta['timestamp'] * scale + offset
+        host_t = meta.get('host_t')
+        proc_t = meta.get('proc_t')
+        g2g = (t_shown - exposed) * 1000.0
+        with self._lock:
+            self.shown += 1
+            self.counts[min(self._nbins, max(0, int(g2g / self.bin_ms)))] += 1
+            self.records.append((
+                meta.get('frame_id'), meta['timestamp'], meta.get('host_time'),
+                g2g,
+                (host_t - exposed) * 1000.0 if host_t is not None else None,
+                (proc_t - host_t) * 1000.0 if proc_t is not None and host_t is not None else None,
+                (t_shown - proc_t) * 1000.0 if proc_t is not None else None,
+            ))
+
+    def _mapping(self):
+        clock = self._clock()
+        if clock:
+            return clock['scale'], clock['offset'], clock.get('method', 'latch')
+        return self._min_scale or 1e-9, self._min_offset, 'min-delay estimate'
+
+    # --- results ---
+    def histogram(self) -> tuple[np.ndarray, np.ndarray]:
+        """(bin edges in ms, counts); the last bin collects everything above max_ms."""
+        with self._lock:
+            counts = self.counts.copy()
+        edges = np.arange(self._nbins + 2, dtype=np.float64) * self.bin_ms
+        edges[-1] = np.inf
+        return edges, counts
+
+    def summary(self, last: int | None = None) -> dict:
+        """Counters and latency percentiles (ms) over the kept records, or only the last `last`."""
+        with self._lock:
+            records = list(self.records)
+            if last is not None:
+                records = records[-last:]
+            g2g = np.array([r[3] for r in records], dtype=np.float64)
+            stages = [np.array([r[i] for r in records if r[i] is not None], dtype=np.float64)
+                      for i in (4, 5, 6)]
+            first_id, last_id = self._first_id, self._last_id
+            out = {"received": self.received, "shown": self.shown, "missing": self.missing,
+                   "gap_events": len(self.gaps)}
+        expected = 0
+        if first_id is not None and last_id is not None and last_id >= first_id:
+            expected = last_id - first_id + 1
+        out["missing_ratio"] = self.missing / expected if expected else 0.0
+        out["clock"] = self._mapping()[2]
+        for name, xs in (("glass_to_glass", g2g), ("transport", stages[0]), ("process", stages[1]),
+                         ("display", stages[2])):
+            if xs.size:
+                p50, p95, p99 = np.percentile(xs, (50, 95, 99))
+                out[name + "_ms"] = {"mean": float(xs.mean()), "p50": float(p50), "p95": float(p95),
+                                     "p99": float(p99), "max": float(xs.max())}
+        return out
+
+    def export(self, path: str) -> list[str]:
+        """
+        Write <path>.json (summary, histogram, gaps) and <path>_frames.csv
+        (one row per shown frame); path is given without extension.
+        Returns the files written.
+        """
+        edges, counts = self.histogram()
+        nz = np.nonzero(counts)[0]
+        with self._lock:
+            gaps = list(self.gaps)
+            records = list(self.records)
+        doc = {
+            "summary": self.summary(),
+            "histogram": {
+                "bin_ms": self.bin_ms,
+                # sparse: lower edge in ms -> count; the last bin is open-ended
+                "bins": {f"{edges[i]:g}": int(counts[i]) for i in nz},
+            },
+            "gaps": [{"frame_id": f, "missing": n, "host_time": t} for f, n, t in gaps],
+        }
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+        with open(path + "_frames.csv", "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["frame_id", "device_timestamp", "host_time", "glass_to_glass_ms",
+                        "transport_ms", "process_ms", "display_ms"])
+            w.writerows(records)
+        return [path + ".json", path + "_frames.csv"]
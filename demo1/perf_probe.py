@@ -0,0 +1,65 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class PerfProbes:
+    """
+    Stage timers and counters for the frame path, shared by all threads.
+    Hot paths read `enabled` once per frame and only then take timestamps:
+
+        timed = probes.enabled
+        if timed:
+            t0 = time.perf_counter()
+        ...
+        if timed:
+            probes.add('decode', time.perf_counter() - t0)
+
+    Disabled, a stage costs one attribute test. Each stage keeps its last
+    `window` durations (seconds); snapshot() turns them into milliseconds.
+    """
+
+    def __init__(self, window: int = 512):
+        self.enabled = False
+        self._window = window
+        self._lock = threading.Lock()
+        self._stages: dict[str, deque] = {}
+        self._counters: dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float):
+        d = self._stages.get(stage)
+        if d is None:
+            with self._lock:
+                d = self._stages.setdefault(stage, deque(maxlen=self._window))
+        d.append(seconds)  # deque.append is atomic; no lock on the hot path
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        """{'stages': {stage: {n, mean_ms, p50_ms, p95_ms, max_ms}}, 'counters': {...}}"""
+        with self._lock:
+            stages = {k: list(v) for k, v in self._stages.items()}
+            counters = dict(self._counters)
+        out = {}
+        for stage, xs in stages.items():
+            if not xs:
+                continue
+            ms = np.asarray(xs) * 1000.0
+            p50, p95 = np.percentile(ms, (50, 95))
+            out[stage] = {"n": len(xs), "mean_ms": float(ms.mean()), "p50_ms": float(p50),
+                          "p95_ms": float(p95), "max_ms": float(ms.max())}
+        return {"stages": out, "counters": counters}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+
+probes = PerfProbes()
@@ -0,0 +1,181 @@
+# This Python file uses the following encoding: utf-8
+"""
+Vectorised conversion of raw camera payloads (as copied out of the VmbPy
+callback) into Mono8 / Mono16 numpy images.
+
+Packed layouts follow the GenICam PFNC:
+- Mono10p / Mono12p: LSB-first bit stream (4 px / 5 bytes, 2 px / 3 bytes)
+- Mono12Packed:      legacy GigE Vision layout (2 px / 3 bytes, nibbles in the middle byte)
+Unpacked 10/12/14/16-bit formats are little-endian uint16 and are only viewed.
+Bayer formats are reduced to grey with OpenCV (fluorescence work is mono).
+"""
+from __future__ import annotations
+
+import cv2
+import numpy as np
+
+
+# format name -> (significant bits, payload kind)
+FORMATS = {
+    'Mono8': (8, 'u8'),
+    'Mono10': (10, 'u16'),
+    'Mono12': (12, 'u16'),
+    'Mono14': (14, 'u16'),
+    'Mono16': (16, 'u16'),
+    'Mono10p': (10, '10p'),
+    'Mono12p': (12, '12p'),
+    'Mono12Packed': (12, '12packed'),
+}
+# OpenCV names a Bayer pattern after the second row (pixels 1,1 and 1,2),
+# GenICam after the first, so the names are swapped: GenICam BayerRG is
+# OpenCV's BayerBG, and so on.
+_BAYER_TO_GRAY = {
+    'BayerGR': cv2.COLOR_BayerGB2GRAY,
+    'BayerRG': cv2.COLOR_BayerBG2GRAY,
+    'BayerGB': cv2.COLOR_BayerGR2GRAY,
+    'BayerBG': cv2.COLOR_BayerRG2GRAY,
+}
+for _pattern in _BAYER_TO_GRAY:
+    FORMATS[_pattern + '8'] = (8, 'u8')
+    for _bits in (10, 12, 16):
+        FORMATS[f'{_pattern}{_bits}'] = (_bits, 'u16')
+    FORMATS[_pattern + '10p'] = (10, '10p')
+    FORMATS[_pattern + '12p'] = (12, '12p')
+    FORMATS[_pattern + '12Packed'] = (12, '12packed')
+
+# Native formats in order of preference when negotiating with the camera:
+# cheapest to move and decode first, then packed high bit depth.
+DEFAULT_PREFERENCE = (
+    'Mono8', 'Mono12p', 'Mono10p', 'Mono12', 'Mono10', 'Mono16', 'Mono14', 'Mono12Packed',
+    'BayerRG8', 'BayerGR8', 'BayerGB8', 'BayerBG8',
+)
+# Full dynamic range for quantification: deepest mono formats first
+HIGH_DEPTH_PREFERENCE = (
+    'Mono16', 'Mono14', 'Mono12p', 'Mono12', 'Mono12Packed', 'Mono10p', 'Mono10', 'Mono8',
+    'BayerRG12p', 'BayerRG12', 'BayerRG8',
+)
+
+
+def bit_depth(fmt: str) -> int:
+    return FORMATS[fmt][0]
+
+
+def payload_size(fmt: str, w: int, h: int) -> int:
+    """Bytes occupied by a w x h frame in the given format."""
+    kind = FORMATS[fmt][1]
+    n = w * h
+    if kind == 'u8':
+        return n
+    if kind == 'u16':
+        return 2 * n
+    if kind == '10p':
+        return (n * 10 + 7) // 8
+    return (n * 12 + 7) // 8
+
+
+def unpack(raw: np.ndarray, fmt: str, w: int, h: int, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Convert a raw uint8 payload into a (h, w) uint8 (8-bit formats) or uint16
+    image holding the native bit depth. out, when given, must have the matching
+    shape/dtype and is filled in place (no per-frame allocation of the result).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported pixel format: {fmt}")
+    kind = FORMATS[fmt][1]
+    n = w * h
+    raw = raw.reshape(-1)
+    if kind == 'u8':
+        img = raw[:n].reshape(h, w)
+    elif kind == 'u16':
+        img = raw[:2 * n].view('<u2').reshape(h, w)
+    else:
+        if out is None:
+            out = np.empty((h, w), dtype=np.uint16)
+        if kind == '10p':
+            _unpack_10p(raw, out.reshape(-1))
+        elif kind == '12p':
+            _unpack_12p(raw, out.reshape(-1))
+        else:
+            _unpack_12packed(raw, out.reshape(-1))
+        img = out
+    for pattern, code in _BAYER_TO_GRAY.items():
+        if fmt.startswith(pattern):
+            dst = None
+            if out is not None and out.dtype == img.dtype and out is not img:
+                dst = out
+            return cv2.cvtColor(img, code, dst=dst)
+    if out is not None and out is not img:
+        np.copyto(out, img)
+        return out
+    return img
+
+
+def _padded(raw: np.ndarray, nbytes: int) -> np.ndarray:
+    if raw.size >= nbytes:
+        return raw[:nbytes]
+    pad = np.zeros(nbytes, dtype=np.uint8)
+    pad[:raw.size] = raw
+    return pad
+
+
+def _unpack_10p(raw: np.ndarray, out: np.ndarray):
+    n = out.size
+    groups = -(-n // 4)
+    b = _padded(raw, groups * 5).reshape(groups, 5).astype(np.uint16)
+    px = np.empty((groups, 4), dtype=np.uint16)
+    px[:, 0] = b[:, 0] | ((b[:, 1] & 0x03) << 8)
+    px[:, 1] = (b[:, 1] >> 2) | ((b[:, 2] & 0x0F) << 6)
+    px[:, 2] = (b[:, 2] >> 4) | ((b[:, 3] & 0x3F) << 4)
+    px[:, 3] = (b[:, 3] >> 6) | (b[:, 4] << 2)
+    out[:] = px.reshape(-1)[:n]
+
+
+def _unpack_12p(raw: np.ndarray, out: np.ndarray):
+    n = out.size
+    groups = -(-n // 2)
+    b = _padded(raw, groups * 3).reshape(groups, 3).astype(np.uint16)
+    px = np.empty((groups, 2), dtype=np.uint16)
+    px[:, 0] = b[:, 0] | ((b[:, 1] & 0x0F) << 8)
+    px[:, 1] = (b[:, 1] >> 4) | (b[:, 2] << 4)
+    out[:] = px.reshape(-1)[:n]
+
+
+def _unpack_12packed(raw: np.ndarray, out: np.ndarray):
+    n = out.size
+    groups = -(-n // 2)
+    b = _padded(raw, groups * 3).reshape(groups, 3).astype(np.uint16)
+    px = np.empty((groups, 2), dtype=np.uint16)
+    px[:, 0] = (b[:, 0] << 4) | (b[:, 1] & 0x0F)
+    px[:, 1] = (b[:, 2] << 4) | (b[:, 1] >> 4)
+    out[:] = px.reshape(-1)[:n]
+
+
+def window_lut(bits: int, lo: float, hi: float, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    uint8 lookup table with 2**bits entries mapping native values linearly from
+    [lo, hi] (native units) to [0, 255], clipped outside the window.
+    """
+    n = 1 << bits
+    if out is None or out.shape != (n,):
+        out = np.empty(n, dtype=np.uint8)
+    lo = float(lo)
+    span = max(1e-6, float(hi) - lo)
+    ramp = (np.arange(n, dtype=np.float32) - lo) * (255.0 / span)
+    np.clip(ramp, 0, 255, out=ramp)
+    np.rint(ramp, out=ramp)
+    out[:] = ramp
+    return out
+
+
+def auto_window(img: np.ndarray, bits: int, low_pct: float = 0.1, high_pct: float = 99.9,
+                step: int = 4) -> tuple[int, int]:
+    """Percentile window (native units) from a strided sample of the image."""
+    sample = img[::step, ::step]
+    hist = np.bincount(sample.ravel(), minlength=1 << bits)
+    cdf = np.cumsum(hist)
+    total = cdf[-1]
+    if total == 0:
+        return 0, (1 << bits) - 1
+    lo = int(np.searchsorted(cdf, total * low_pct / 100.0))
+    hi = int(np.searchsorted(cdf, total * high_pct / 100.0))
+    return lo, max(hi, lo + 1)
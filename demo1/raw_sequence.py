@@ -0,0 +1,145 @@
+# This Python file uses the following encoding: utf-8
+"""
+Raw image sequence container (.rawseq) for long time-lapse captures.
+
+File layout (little-endian):
+    [0, 4096)           fixed header: struct _HEADER followed by UTF-8 JSON metadata
+    [4096, index)       frame data, n contiguous (h, w) frames of one dtype
+    [index, EOF)        frame index, n records of INDEX_DTYPE
+
+Frame i lives at 4096 + i * frame_bytes, so any frame is one np.memmap slice
+away (O(1) seek) and nothing is loaded into RAM until it is touched. The index
+is written when the writer closes; a file whose writer died still opens, with
+the frame count recovered from the file size and an empty index.
+"""
+from __future__ import annotations
+
+import json
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b"PCRSEQ\x00\x01"
+VERSION = 1
+HEADER_SIZE = 4096
+# magic, version, width, height, bits, dtype str, frame count, data offset, index offset
+_HEADER = struct.Struct("<8sIIII8sQQQ")
+
+INDEX_DTYPE = np.dtype([
+    ("frame_id", "<i8"),      # camera frame ID (-1 if unknown)
+    ("timestamp", "<i8"),     # camera timestamp (device ticks, usually ns)
+    ("host_time", "<f8"),     # host time.time() when the frame was received
+    ("exposure_us", "<f4"),
+    ("gain_db", "<f4"),
+    ("channel", "<i2"),       # index into the channel buttons (-1 if unknown)
+    ("objective", "<i2"),     # index into the objective buttons (-1 if unknown)
+])
+
+
+class RawSequenceWriter:
+    """Sequential writer; append() costs one write() of the frame plus one index record."""
+
+    def __init__(self, path: str, shape: tuple, dtype, bits: int | None = None,
+                 metadata: dict | None = None):
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.bits = bits or self.dtype.itemsize * 8
+        self.metadata = dict(metadata or {})
+        self.count = 0
+        self._index = np.zeros(256, dtype=INDEX_DTYPE)
+        self._f = open(path, "wb")
+        self._write_header(0, 0)
+        self._f.seek(HEADER_SIZE)
+
+    def append(self, img: np.ndarray, frame_id: int = -1, timestamp: int = -1,
+               host_time: float = 0.0, exposure_us: float = np.nan, gain_db: float = np.nan,
+               channel: int = -1, objective: int = -1):
+        if img.shape != self.shape:
+            raise ValueError(f"Frame shape {img.shape} does not match sequence shape {self.shape}")
+        if not img.flags.c_contiguous or img.dtype != self.dtype:
+            img = np.ascontiguousarray(img, dtype=self.dtype)
+        self._f.write(img.data)
+        if self.count == len(self._index):
+            self._index = np.resize(self._index, 2 * len(self._index))
+        self._index[self.count] = (frame_id, timestamp, host_time, exposure_us, gain_db, channel, objective)
+        self.count += 1
+
+    def close(self):
+        if self._f is None:
+            return
+        index_offset = HEADER_SIZE + self.count * self.frame_bytes
+        self._f.seek(index_offset)
+        self._f.write(self._index[:self.count].tobytes())
+        self._f.truncate()
+        self._write_header(self.count, index_offset)
+        self._f.close()
+        self._f = None
+
+    @property
+    def frame_bytes(self) -> int:
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def _write_header(self, count: int, index_offset: int):
+        h, w = self.shape
+        head = _HEADER.pack(MAGIC, VERSION, w, h, self.bits, self.dtype.str.encode("ascii"),
+                            count, HEADER_SIZE, index_offset)
+        meta = json.dumps(self.metadata, ensure_ascii=False).encode("utf-8")
+        if len(head) + len(meta) > HEADER_SIZE:
+            raise ValueError("Sequence metadata does not fit into the header")
+        self._f.seek(0)
+        self._f.write(head + meta + b"\x00" * (HEADER_SIZE - len(head) - len(meta)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RawSequence:
+    """
+    Read-only view of a .rawseq file.
+    seq[i] / seq.frames[a:b] are np.memmap views; seq.index is the structured
+    per-frame index (also memory-mapped).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < _HEADER.size or raw[:8] != MAGIC:
+            raise ValueError(f"Not a raw sequence file: {path}")
+        (_magic, self.version, w, h, self.bits, dtype, count,
+         data_offset, index_offset) = _HEADER.unpack_from(raw)
+        meta = raw[_HEADER.size:].rstrip(b"\x00")
+        self.metadata = json.loads(meta.decode("utf-8")) if meta else {}
+        self.shape = (h, w)
+        self.dtype = np.dtype(dtype.rstrip(b"\x00").decode("ascii"))
+        frame_bytes = h * w * self.dtype.itemsize
+        if index_offset == 0:
+            # writer never closed: keep the complete frames, no index
+            count = (os.path.getsize(path) - data_offset) // frame_bytes if frame_bytes else 0
+        self.frames = (
+            np.memmap(path, dtype=self.dtype, mode="r", offset=data_offset, shape=(count, h, w))
+            if count else np.empty((0, h, w), dtype=self.dtype)
+        )
+        if index_offset and count:
+            self.index = np.memmap(path, dtype=INDEX_DTYPE, mode="r", offset=index_offset, shape=(count,))
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, i):
+        return self.frames[i]
+
+    def record(self, i: int) -> dict:
+        """Index entry of frame i as a plain dict (empty if the index is missing)."""
+        if i >= len(self.index):
+            return {}
+        rec = self.index[i]
+        return {name: rec[name].item() for name in INDEX_DTYPE.names}
@@ -0,0 +1,302 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+
+from pixel_unpack import FORMATS, bit_depth, unpack
+from raw_sequence import RawSequenceWriter
+
+
+class _NpyStream:
+    """
+    Growing (n, h, w) .npy file written through np.memmap.
+    The header reserves room for any frame count and is rewritten with the
+    real count on close, so the file always loads with np.load(mmap_mode='r').
+    """
+
+    _GROW = 64  # frames added to the mapping at a time
+
+    def __init__(self, path: str, shape: tuple, dtype):
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._header_len = len(self._header(10 ** 12))
+        with open(path, "wb") as f:
+            f.write(self._header(0, self._header_len))
+        self._map = None
+        self._capacity = 0
+
+    def _header(self, n: int, length: int = 0) -> bytes:
+        """npy v1.0 header for n frames, space-padded to length bytes (or 64-byte aligned)."""
+        d = {'descr': self.dtype.str, 'fortran_order': False, 'shape': (n,) + self.shape}
+        text = repr(d)
+        # magic(6) + version(2) + length(2) + text + padding + '\n'
+        used = 10 + len(text) + 1
+        pad = length - used if length else (-used) % 64
+        body = (text + " " * pad + "\n").encode("latin1")
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(body)) + body
+
+    def write(self, img: np.ndarray, _meta: dict):
+        if self.count == self._capacity:
+            self._grow()
+        self._map[self.count] = img
+        self.count += 1
+
+    def _grow(self):
+        if self._map is not None:
+            self._map.flush()
+        self._capacity += self._GROW
+        # np.memmap extends the file in r+ mode when the mapping is larger
+        self._map = np.memmap(self.path, dtype=self.dtype, mode="r+",
+                              offset=self._header_len, shape=(self._capacity,) + self.shape)
+
+    def close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map = None  # unmap before truncating
+        with open(self.path, "r+b") as f:
+            f.write(self._header(self.count, self._header_len))
+            f.truncate(self._header_len + self.count * self._frame_bytes)
+
+
+class _TiffStream:
+    """Multi-page TIFF written in chunks of frames (optional tifffile dependency)."""
+
+    def __init__(self, path: str, shape: tuple, dtype, chunk: int = 16):
+        import tifffile  # optional; ImportError is reported by the recorder
+
+        self.path = path
+        self.shape = tuple(shape)
+        self.count = 0
+        self._writer = tifffile.TiffWriter(path, bigtiff=True)
+        self._chunk = np.empty((chunk,) + self.shape, dtype=dtype)
+        self._fill = 0
+
+    def write(self, img: np.ndarray, _meta: dict):
+        self._chunk[self._fill] = img
+        self._fill += 1
+        self.count += 1
+        if self._fill == len(self._chunk):
+            self._flush()
+
+    def _flush(self):
+        if self._fill:
+            self._writer.write(self._chunk[:self._fill], contiguous=True)
+            self._fill = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+class _RawSeqStream:
+    """.rawseq container (raw_sequence) with the per-frame index filled from the frame meta."""
+
+    _FIELDS = ('frame_id', 'timestamp', 'host_time', 'exposure_us', 'gain_db', 'channel', 'objective')
+
+    def __init__(self, path: str, shape: tuple, dtype, bits: int, metadata: dict):
+        self.path = path
+        self.shape = tuple(shape)
+        self._writer = RawSequenceWriter(path, shape, dtype, bits, metadata)
+
+    def write(self, img: np.ndarray, meta: dict):
+        self._writer.append(img, **{k: meta[k] for k in self._FIELDS if meta.get(k) is not None})
+
+    def close(self):
+        self._writer.close()
+
+
+class FrameRecorder(QThread):
+    """
+    Records the camera stream to disk from a dedicated writer thread.
+
+    offer() is the tap called from the camera callback: it copies the raw
+    payload into a preallocated buffer from a bounded pool and returns at once;
+    when the pool is exhausted the frame is dropped (counted), acquisition is
+    never blocked. The pool holds at most queue_size buffers and max_bytes in
+    total, so large sensor formats get fewer buffers instead of gigabytes.
+    The writer thread unpacks frames to their native depth and appends them to
+    - 'raw':  a .rawseq container with a per-frame index (raw_sequence)
+    - 'npy':  a growing np.memmap'ed (n, h, w) .npy file
+    - 'tiff': a multi-page BigTIFF written in chunks (needs tifffile)
+    set_context() stamps acquisition settings (channel, objective, ...) that
+    the camera does not report onto every following frame.
+    A change of frame size starts a new numbered segment.
+    statsUpdated(dict) reports frames, dropped, queue_depth and MB/s about
+    once per second and when recording ends.
+    """
+
+    statsUpdated = Signal(dict)
+    error = Signal(str)
+    segmentClosed = Signal(str)  # path of a finished file
+
+    _EXT = {"raw": "rawseq", "npy": "npy", "tiff": "tif"}
+
+    def __init__(self, base_path: str, fmt: str = "raw", queue_size: int = 64,
+                 tiff_chunk: int = 16, metadata: dict | None = None,
+                 max_bytes: int = 512 * 2 ** 20, parent=None):
+        super().__init__(parent)
+        if fmt not in self._EXT:
+            raise ValueError(f"Unknown recording format: {fmt}")
+        self.base_path = base_path
+        self.fmt = fmt
+        self.tiff_chunk = tiff_chunk
+        self.metadata = dict(metadata or {})
+        self._context: dict = {}
+        self._free: queue.Queue = queue.Queue()
+        self._filled: queue.Queue = queue.Queue()
+        for _ in range(max(1, queue_size)):
+            self._free.put(np.empty(0, dtype=np.uint8))
+        self._queue_size = max(1, queue_size)
+        self.max_bytes = max_bytes
+        self._pool_bytes = 0  # sum of buffer sizes; only changed by offer()
+        self._running = False
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.paths: list[str] = []
+        self._t0 = None
+        self._sink = None
+        self._sink_dtype = None
+        self._segment = 0
+        self._native: dict[tuple, np.ndarray] = {}
+
+    # --- producer side (camera thread) ---
+    def offer(self, raw: np.ndarray, meta: dict | None) -> bool:
+        """Queue a copy of one frame; never blocks. Returns False if the frame was dropped."""
+        if not self._running:
+            return False
+        try:
+            buf = self._free.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.dropped += 1
+            return False
+        n = raw.nbytes
+        if buf.size < n:
+            # grows once per size change, within the byte budget
+            grown = None
+            if self._pool_bytes - buf.size + n <= self.max_bytes:
+                try:
+                    grown = np.empty(n, dtype=np.uint8)
+                except MemoryError:
+                    pass
+            if grown is None:
+                self._free.put(buf)
+                with self._lock:
+                    self.dropped += 1
+                return False
+            self._pool_bytes += n - buf.size
+            buf = grown
+        np.copyto(buf[:n], raw.reshape(-1).view(np.uint8))
+        if meta is None:
+            meta = {'fmt': 'Mono8', 'w': raw.shape[1], 'h': raw.shape[0]}
+        if self._context:
+            meta = {**meta, **self._context}
+        self._filled.put((buf, n, meta))
+        return True
+
+    def set_context(self, **fields):
+        """Per-frame fields (e.g. channel=1, objective=0) for frames offered from now on."""
+        self._context = {**self._context, **fields}  # swapped whole; read lock-free by offer()
+
+    # --- thread control ---
+    def start(self, *args):
+        self._running = True
+        super().start(*args)
+
+    def stop(self):
+        self._running = False
+        self._filled.put(None)  # wake the writer; queued frames are still written
+        self.wait()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._t0 if self._t0 is not None else 0.0
+        with self._lock:
+            dropped = self.dropped
+        return {
+            "frames": self.frames,
+            "dropped": dropped,
+            "queue_depth": self._filled.qsize(),
+            "queue_size": self._queue_size,
+            "pool_mb": self._pool_bytes / 1e6,
+            "mb_s": self.bytes_written / elapsed / 1e6 if elapsed > 0 else 0.0,
+            "elapsed_s": elapsed,
+        }
+
+    def run(self):
+        self._t0 = time.perf_counter()
+        next_report = self._t0 + 1.0
+        try:
+            while True:
+                try:
+                    item = self._filled.get(timeout=0.2)
+                except queue.Empty:
+                    item = None
+                if item is not None:
+                    buf, n, meta = item
+                    try:
+                        self._write(buf[:n], meta)
+                    finally:
+                        self._free.put(buf)
+                elif not self._running and self._filled.empty():
+                    break  # stop() requested and everything queued is on disk
+                now = time.perf_counter()
+                if now >= next_report:
+                    self.statsUpdated.emit(self.stats())
+                    next_report = now + 1.0
+        except Exception as e:
+            self._running = False
+            self.error.emit(f"Recording failed: {e}")
+        finally:
+            self._close_sink()
+            self.statsUpdated.emit(self.stats())
+
+    # --- writer side ---
+    def _write(self, raw: np.ndarray, meta: dict):
+        fmt, w, h = meta['fmt'], meta['w'], meta['h']
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported pixel format: {fmt}")
+        dtype = np.uint8 if bit_depth(fmt) == 8 else np.uint16
+        key = ((h, w), np.dtype(dtype))
+        out = self._native.get(key)
+        if out is None:
+            out = self._native[key] = np.empty((h, w), dtype=dtype)
+        img = unpack(raw, fmt, w, h, out=out)
+        if self._sink is None or self._sink.shape != img.shape or self._sink_dtype != img.dtype:
+            self._open_sink(img.shape, img.dtype, bit_depth(fmt), fmt)
+        self._sink.write(img, meta)
+        self.frames += 1
+        self.bytes_written += img.nbytes
+
+    def _open_sink(self, shape, dtype, bits: int, pixel_format: str):
+        self._close_sink()
+        suffix = f"_{self._segment}" if self._segment else ""
+        path = f"{self.base_path}{suffix}.{self._EXT[self.fmt]}"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.fmt == "raw":
+            meta = {**self.metadata, 'pixel_format': pixel_format, 'segment': self._segment}
+            self._sink = _RawSeqStream(path, shape, dtype, bits, meta)
+        elif self.fmt == "npy":
+            self._sink = _NpyStream(path, shape, dtype)
+        else:
+            self._sink = _TiffStream(path, shape, dtype, self.tiff_chunk)
+        self._sink_dtype = np.dtype(dtype)
+        self._segment += 1
+        self.paths.append(path)
+
+    def _close_sink(self):
+        if self._sink is not None:
+            sink, self._sink = self._sink, None
+            sink.close()
+            self.segmentClosed.emit(sink.path)
@@ -0,0 +1,426 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from PySide6.QtCore import QObject, QThread, QTimer, Signal, Slot
+from PySide6.QtSerialPort import QSerialPort
+
+
+ACK_WORDS = (b"OK", b"ACK")
+NAK_WORDS = (b"ERR", b"ERROR", b"NAK")
+# absolute position commands: only the newest queued target matters
+COALESCE_KINDS = frozenset({"FOCUS", "MOVE", "CHAN"})
+
+
+class DeviceError(RuntimeError):
+    """The device answered a command with ERR/NAK."""
+
+
+def command_kind(data: bytes) -> str:
+    """Command type used for reply matching and statistics: CHAN:1 -> CHAN, ?TEMP -> TEMP."""
+    head = data.strip().split(b":", 1)[0].split(b" ", 1)[0].lstrip(b"?")
+    return head.decode("ascii", "replace").upper()
+
+
+def parse_reply(line: bytes) -> tuple[str | None, bool | None]:
+    """
+    Classify a device line -> (kind, status). status is True for an ack,
+    False for an error and None for a data line; kind names the command the
+    line refers to, or None when it does not say.
+        OK / ERR:busy           -> (None, True) / (None, False)
+        OK CHAN:1 / ERR FOCUS   -> ("CHAN", True) / ("FOCUS", False)
+        CHAN:OK / MOVE:ERR,lim  -> ("CHAN", True) / ("MOVE", False)
+        TEMP:25.1               -> ("TEMP", None)
+        25.1                    -> (None, None)
+    """
+    head, sep, rest = line.strip().partition(b":")
+    word, _sp, tail = head.partition(b" ")
+    up = word.upper()
+    if up in ACK_WORDS or up in NAK_WORDS:
+        ok = up in ACK_WORDS
+        kind = command_kind(tail) if tail and not tail[:1].isdigit() else None
+        return kind, ok
+    if not sep:
+        return None, None
+    status = rest.split(b",", 1)[0].strip().upper()
+    if status in ACK_WORDS:
+        return command_kind(head), True
+    if status in NAK_WORDS:
+        return command_kind(head), False
+    return command_kind(head), None
+
+
+class LineParser:
+    """
+    Incremental line splitter for a byte stream. Chunks are appended to one
+    reused buffer; the partial tail is never rescanned and consumed lines are
+    dropped with a single compaction per feed(). Lines longer than max_line
+    (no terminator from a noisy link) are discarded up to the next newline
+    and counted in overflows.
+    """
+
+    def __init__(self, max_line: int = 4096):
+        self.max_line = max_line
+        self.overflows = 0
+        self._buf = bytearray()
+        self._scan = 0         # bytes of the partial line already searched
+        self._discard = False  # inside an over-long line
+
+    def feed(self, data) -> list[bytes]:
+        buf = self._buf
+        buf += data
+        lines = []
+        start = 0
+        while True:
+            i = buf.find(b"\n", self._scan)
+            if i < 0:
+                break
+            if self._discard:
+                self._discard = False
+            else:
+                end = i - 1 if i > start and buf[i - 1] == 0x0D else i
+                lines.append(bytes(buf[start:end]))
+            start = self._scan = i + 1
+        if start:
+            del buf[:start]
+        self._scan = len(buf)
+        if self._scan > self.max_line:
+            buf.clear()
+            self._scan = 0
+            if not self._discard:
+                self.overflows += 1
+            self._discard = True
+        return lines
+
+    def clear(self):
+        self._buf.clear()
+        self._scan = 0
+        self._discard = False
+
+
+class LatencyStats:
+    """Round-trip times per command kind, last `window` samples each."""
+
+    def __init__(self, window: int = 256):
+        self._window = window
+        self._lock = threading.Lock()
+        self._kinds: dict[str, dict] = {}
+
+    def _entry(self, kind):
+        e = self._kinds.get(kind)
+        if e is None:
+            e = self._kinds[kind] = {"samples": deque(maxlen=self._window), "count": 0,
+                                     "timeouts": 0, "errors": 0, "unacked": 0}
+        return e
+
+    def add(self, kind: str, ms: float, ok: bool = True):
+        with self._lock:
+            e = self._entry(kind)
+            e["samples"].append(ms)
+            e["count"] += 1
+            if not ok:
+                e["errors"] += 1
+
+    def miss(self, kind: str, field: str):
+        with self._lock:
+            self._entry(kind)[field] += 1
+
+    def snapshot(self) -> dict[str, dict]:
+        """kind -> count, timeouts, errors, unacked, mean_ms, p50_ms, p95_ms, max_ms."""
+        out = {}
+        with self._lock:
+            for kind, e in self._kinds.items():
+                xs = sorted(e["samples"])
+                d = {k: e[k] for k in ("count", "timeouts", "errors", "unacked")}
+                if xs:
+                    d.update(mean_ms=sum(xs) / len(xs), p50_ms=xs[len(xs) // 2],
+                             p95_ms=xs[min(len(xs) - 1, int(len(xs) * 0.95))], max_ms=xs[-1])
+                out[kind] = d
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._kinds.clear()
+
+
+class _Command:
+    __slots__ = ("id", "key", "kind", "data", "expect_reply", "timeout_ms", "future",
+                 "t_queued", "t_sent", "deadline")
+
+    def __init__(self, cid, key, data, expect_reply, timeout_ms):
+        self.id = cid
+        self.key = key
+        self.kind = command_kind(data)
+        self.data = data
+        self.expect_reply = expect_reply
+        self.timeout_ms = timeout_ms
+        self.future: Future = Future()
+        self.t_queued = time.perf_counter()
+        self.t_sent = 0.0
+        self.deadline = 0.0
+
+
+class SerialLink(QThread):
+    """
+    Serial transport in its own thread; the GUI thread never waits on the port.
+
+    send() queues a command and returns a concurrent.futures.Future at once:
+    - fire-and-forget commands resolve with the number of bytes handed to the port
+    - expect_reply=True commands resolve with the reply line (bytes, without
+      the line ending) or fail with TimeoutError after timeout_ms; one reply
+      is outstanding at a time, later commands wait in the queue
+    Commands with the same key that are still queued are coalesced: the
+    newer payload takes the queued slot and the older future is cancelled.
+    By default only the position commands in COALESCE_KINDS (FOCUS, MOVE,
+    CHAN) get a key; setpoints such as TEMP:L,50 / TEMP:R,60 address
+    different targets and are all sent unless the caller passes a key.
+
+    Incoming lines are correlated with sent commands (see parse_reply): a line
+    naming a command kind goes to the oldest outstanding command of that
+    kind, a bare OK/ERR or data line to the oldest one waiting for a reply.
+    Fire-and-forget commands stay outstanding for ack_timeout_ms so that an
+    ack, if the device sends one, is matched and timed instead of being taken
+    for the reply to another command. Everything else is lineReceived.
+    Round-trip times per command kind are in latency_stats().
+
+    Commands may be sent before open_port(); they stay queued until the port
+    is open, including across a reopen. Commands still waiting for a reply on
+    the old port fail with ConnectionError, as does everything queued when
+    the port is closed or cannot be opened.
+    """
+
+    opened = Signal(str)          # port name
+    closed = Signal()
+    errorOccurred = Signal(str)
+    lineReceived = Signal(bytes)  # unsolicited line from the device
+    sent = Signal(int, bytes)     # command id, payload (after it was written)
+    replied = Signal(int, bytes)  # command id, reply line
+    timedOut = Signal(int)        # command id
+
+    _openPort = Signal(str, int)
+    _closePort = Signal()
+    _kick = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._queue: OrderedDict = OrderedDict()  # key -> _Command, in send order
+        self._next_id = 1
+        self.coalesced = 0
+        self.is_open = False
+        self.max_inflight = 1        # replies awaited at once (pipelining depth)
+        self.ack_timeout_ms = 1000   # how long a fire-and-forget command may still be acked
+        self.latency = LatencyStats()
+        self._session = _SerialSession(self)
+        self._session.moveToThread(self)
+        self._openPort.connect(self._session.open_port)
+        self._closePort.connect(self._session.close_port)
+        self._kick.connect(self._session.pump)
+
+    # --- any thread ---
+    def open_port(self, port_name: str, baud: int = 115200):
+        if not self.isRunning():
+            self.start()
+        self._openPort.emit(port_name, baud)
+
+    def close_port(self):
+        self._closePort.emit()
+
+    def send(self, data: bytes, key: str | None = None, expect_reply: bool = False,
+             timeout_ms: int = 500, coalesce: bool = True) -> Future:
+        with self._lock:
+            cid = self._next_id
+            self._next_id += 1
+            if key is None and coalesce and not data.lstrip().startswith(b"?"):
+                kind = command_kind(data)
+                key = kind if kind in COALESCE_KINDS else None
+            if not coalesce or key is None:
+                key = ("#", cid)  # unique: never merged
+            cmd = _Command(cid, key, data, expect_reply, timeout_ms)
+            old = self._queue.get(key)
+            if old is not None:
+                old.future.cancel()
+                self.coalesced += 1
+                cmd.t_queued = old.t_queued  # keep the slot (and age) of the first request
+            self._queue[key] = cmd
+        self._kick.emit()
+        return cmd.future
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def latency_stats(self) -> dict[str, dict]:
+        return self.latency.snapshot()
+
+    def stop(self):
+        self._closePort.emit()
+        self.quit()
+        self.wait()
+
+    def _take(self) -> _Command | None:
+        with self._lock:
+            while self._queue:
+                _key, cmd = self._queue.popitem(last=False)
+                if cmd.future.set_running_or_notify_cancel():
+                    return cmd
+        return None
+
+    def run(self):
+        self.exec()
+        self._session.close_port()
+
+
+class _SerialSession(QObject):
+    """Owns the QSerialPort; all slots run in the SerialLink thread."""
+
+    def __init__(self, link: SerialLink):
+        super().__init__()
+        self._link = link
+        self.port = None
+        self._parser = LineParser()
+        self._outstanding: deque[_Command] = deque()  # sent, not yet answered, in send order
+        self._waiting = 0  # outstanding commands with expect_reply
+        self._timer = None
+
+    @Slot(str, int)
+    def open_port(self, name: str, baud: int):
+        self._release_port()  # queued commands wait for the new port
+        if self._timer is None:
+            self._timer = QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self._on_timeout)
+        port = QSerialPort(self)
+        port.setPortName(name)
+        port.setBaudRate(baud)
+        port.setDataBits(QSerialPort.Data8)
+        port.setParity(QSerialPort.NoParity)
+        port.setStopBits(QSerialPort.OneStop)
+        port.setFlowControl(QSerialPort.NoFlowControl)
+        if not port.open(QSerialPort.ReadWrite):
+            self._link.errorOccurred.emit(port.errorString())
+            port.deleteLater()
+            self.close_port()  # nothing will send the queued commands
+            return
+        try:
+            # Some devices need DTR/RTS asserted
+            port.setDataTerminalReady(True)
+            port.setRequestToSend(True)
+        except Exception:
+            pass
+        port.readyRead.connect(self._on_ready_read)
+        port.errorOccurred.connect(self._on_error)
+        self.port = port
+        self._parser.clear()
+        self._link.is_open = True
+        self._link.opened.emit(name)
+        self.pump()
+
+    @Slot()
+    def close_port(self):
+        self._release_port()
+        while (cmd := self._link._take()) is not None:
+            cmd.future.set_exception(ConnectionError("Serial port closed"))
+
+    def _release_port(self):
+        """Close the port and fail the commands sent on it; the send queue is kept."""
+        if self._timer is not None:
+            self._timer.stop()
+        while self._outstanding:
+            cmd = self._outstanding.popleft()
+            if cmd.expect_reply:
+                cmd.future.set_exception(ConnectionError("Serial port closed"))
+        self._waiting = 0
+        if self.port is not None:
+            port, self.port = self.port, None
+            port.close()
+            port.deleteLater()
+            self._link.is_open = False
+            self._link.closed.emit()
+
+    @Slot()
+    def pump(self):
+        """Write queued commands until max_inflight replies are awaited."""
+        if self.port is None:
+            return
+        while self._waiting < max(1, self._link.max_inflight):
+            cmd = self._link._take()
+            if cmd is None:
+                break
+            n = self.port.write(cmd.data)
+            cmd.t_sent = time.perf_counter()
+            if n < 0:
+                cmd.future.set_exception(IOError(self.port.errorString()))
+                continue
+            self._link.sent.emit(cmd.id, cmd.data)
+            if cmd.expect_reply:
+                cmd.deadline = cmd.t_sent + cmd.timeout_ms / 1000.0
+                self._waiting += 1
+            else:
+                cmd.deadline = cmd.t_sent + self._link.ack_timeout_ms / 1000.0
+                cmd.future.set_result(n)
+            self._outstanding.append(cmd)
+        self._arm_timer()
+
+    def _arm_timer(self):
+        if not self._outstanding:
+            self._timer.stop()
+            return
+        first = min(c.deadline for c in self._outstanding)
+        self._timer.start(max(0, int((first - time.perf_counter()) * 1000.0) + 1))
+
+    def _on_ready_read(self):
+        for line in self._parser.feed(self.port.readAll().data()):
+            self._on_line(line)
+
+    def _match(self, kind: str | None, status: bool | None) -> _Command | None:
+        # data lines only answer commands waiting for a reply; acks may confirm any command
+        for cmd in self._outstanding:
+            if kind is not None and cmd.kind != kind:
+                continue
+            if cmd.expect_reply or status is not None:
+                return cmd
+        return None
+
+    def _on_line(self, line: bytes):
+        kind, status = parse_reply(line)
+        cmd = self._match(kind, status)
+        if cmd is None:
+            self._link.lineReceived.emit(line)
+            return
+        self._outstanding.remove(cmd)
+        self._link.latency.add(cmd.kind, (time.perf_counter() - cmd.t_sent) * 1000.0, status is not False)
+        if cmd.expect_reply:
+            self._waiting -= 1
+            if status is False:
+                cmd.future.set_exception(DeviceError(line.decode("utf-8", "replace")))
+            else:
+                cmd.future.set_result(line)
+        self._link.replied.emit(cmd.id, line)
+        self.pump()
+
+    def _on_timeout(self):
+        now = time.perf_counter()
+        expired = [c for c in self._outstanding if c.deadline <= now]
+        for cmd in expired:
+            self._outstanding.remove(cmd)
+            if cmd.expect_reply:
+                self._waiting -= 1
+                self._link.latency.miss(cmd.kind, "timeouts")
+                cmd.future.set_exception(TimeoutError(f"No reply to {cmd.data!r} within {cmd.timeout_ms} ms"))
+                self._link.timedOut.emit(cmd.id)
+            else:
+                self._link.latency.miss(cmd.kind, "unacked")
+        self.pump()
+
+    def _on_error(self, err):
+        if err in (QSerialPort.NoError, QSerialPort.TimeoutError):
+            return
+        msg = self.port.errorString() if self.port is not None else str(err)
+        self._link.errorOccurred.emit(msg)
+        if err == QSerialPort.ResourceError:  # device unplugged
+            self.close_port()
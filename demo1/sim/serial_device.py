@@ -0,0 +1,273 @@
+# This Python file uses the following encoding: utf-8
+"""
+Pty-based stand-in for the instrument controller, for running the serial
+layer without hardware (Linux/macOS).
+
+    python sim/serial_device.py --latency 5 --jitter 2 --error-rate 0.01
+    PCR_SERIAL_PORTS=/dev/pts/7 python widget.py
+
+Protocol (one command per line, CR/LF tolerated):
+    CHAN:<n>              -> OK CHAN
+    MOVE:<x>,<y>          -> OK MOVE          (after the simulated travel time)
+    FOCUS:<pos>           -> OK FOCUS
+    TEMP:<L|R>,<degC>     -> OK TEMP          setpoint
+    HEAT:<L|R>,<0|1>      -> OK HEAT          heater switch
+    PRES:<L|R>,<kPa>      -> OK PRES          pressure setpoint
+    PUMP:<L|R>,<0|1>      -> OK PUMP          pump switch
+    PLINK:<0|1>           -> OK PLINK         left/right pumps linked
+    ?POS ?FOCUS ?CHAN     -> POS:<x>,<y> / FOCUS:<pos> / CHAN:<n>
+    ?TEMP ?PRES           -> TEMP:<L>,<R> / PRES:<L>,<R>
+    anything else         -> ERR:unknown
+Malformed arguments answer ERR:args. With report_s > 0 the device also
+sends TEMP:<L>,<R> on its own, like a controller streaming readings.
+
+The device is sequential: a command is answered latency (+ jitter) after
+it was read or after the previous reply, whichever is later. Faults are
+injected per command: error_rate answers ERR:injected, drop_rate never
+answers, garble_rate flips bytes in the reply, and fragment splits replies
+into several writes to exercise line reassembly on the host.
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+
+class SerialDeviceSimulator:
+    """Serves the controller protocol on the slave side of a pty; port is its path."""
+
+    def __init__(self, latency_ms: float = 2.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 drop_rate: float = 0.0, garble_rate: float = 0.0, fragment: bool = False,
+                 move_speed: float = 0.0, report_s: float = 0.0, seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.garble_rate = garble_rate
+        self.fragment = fragment
+        self.move_speed = move_speed  # stage units per second; 0 = moves take no extra time
+        self.report_s = report_s
+        self.port = ""
+        self.stats = {"commands": 0, "replies": 0, "errors": 0, "dropped": 0, "garbled": 0,
+                      "unknown": 0, "reports": 0}
+        self.log: list[tuple[float, bytes]] = []  # (monotonic time, command) of every command read
+        self.state = {"chan": 0, "x": 0.0, "y": 0.0, "focus": 0,
+                      "temp": {"L": 25.0, "R": 25.0}, "temp_set": {"L": 37.0, "R": 37.0},
+                      "heat": {"L": False, "R": False},
+                      "pres": {"L": 0.0, "R": 0.0}, "pres_set": {"L": 0.0, "R": 0.0},
+                      "pump": {"L": False, "R": False}, "plink": False}
+        self._rng = random.Random(seed)
+        self._master = -1
+        self._slave = -1
+        self._thread = None
+        self._stop = threading.Event()
+        self._outbox: list[tuple[float, int, bytes]] = []  # heap of (due, seq, reply)
+        self._seq = 0
+        self._busy_until = 0.0
+        self._t_model = 0.0
+
+    # --- lifecycle ---
+    def start(self) -> str:
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop.clear()
+        self._t_model = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="serial-sim", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd >= 0:
+                os.close(fd)
+        self._master = self._slave = -1
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- device loop ---
+    def _run(self):
+        buf = bytearray()
+        next_report = time.monotonic() + self.report_s if self.report_s > 0 else None
+        while not self._stop.is_set():
+            now = time.monotonic()
+            wait = 0.05
+            if self._outbox:
+                wait = min(wait, max(0.0, self._outbox[0][0] - now))
+            if next_report is not None:
+                wait = min(wait, max(0.0, next_report - now))
+            try:
+                readable, _w, _x = select.select([self._master], [], [], wait)
+            except (OSError, ValueError):
+                return
+            if readable:
+                try:
+                    chunk = os.read(self._master, 4096)
+                except OSError:
+                    return
+                buf += chunk
+                while True:
+                    i = buf.find(b"\n")
+                    if i < 0:
+                        break
+                    line = bytes(buf[:i]).strip()
+                    del buf[:i + 1]
+                    if line:
+                        self._on_command(line)
+            now = time.monotonic()
+            if next_report is not None and now >= next_report:
+                self._advance_model(now)
+                self._write(self._temp_line() + b"\r\n")
+                self.stats["reports"] += 1
+                next_report += self.report_s
+            while self._outbox and self._outbox[0][0] <= now:
+                _due, _seq, reply = heapq.heappop(self._outbox)
+                self._write(reply)
+                self.stats["replies"] += 1
+
+    def _write(self, data: bytes):
+        try:
+            if self.fragment and len(data) > 2:
+                cut = sorted(self._rng.sample(range(1, len(data)), min(2, len(data) - 1)))
+                for a, b in zip([0] + cut, cut + [len(data)]):
+                    os.write(self._master, data[a:b])
+                    time.sleep(0.0002)
+            else:
+                os.write(self._master, data)
+        except OSError:
+            pass
+
+    def _on_command(self, line: bytes):
+        now = time.monotonic()
+        self.stats["commands"] += 1
+        self.log.append((now, line))
+        self._advance_model(now)
+        reply, extra_s = self._execute(line)
+        rng = self._rng
+        if self.drop_rate and rng.random() < self.drop_rate:
+            self.stats["dropped"] += 1
+            return
+        if self.error_rate and rng.random() < self.error_rate:
+            reply, extra_s = b"ERR:injected", 0.0
+            self.stats["errors"] += 1
+        delay = (self.latency_ms + (rng.uniform(0.0, self.jitter_ms) if self.jitter_ms > 0 else 0.0)) / 1000.0
+        due = max(now, self._busy_until) + delay + extra_s
+        self._busy_until = due
+        data = reply + b"\r\n"
+        if self.garble_rate and rng.random() < self.garble_rate:
+            data = bytes(b ^ 0x20 if rng.random() < 0.3 and b not in (10, 13) else b for b in data)
+            self.stats["garbled"] += 1
+        self._seq += 1
+        heapq.heappush(self._outbox, (due, self._seq, data))
+
+    # --- protocol ---
+    def _execute(self, line: bytes) -> tuple[bytes, float]:
+        st = self.state
+        try:
+            text = line.decode("ascii").upper()
+        except UnicodeDecodeError:
+            return b"ERR:unknown", 0.0
+        cmd, _sep, arg = text.partition(":")
+        args = [a.strip() for a in arg.split(",")] if arg else []
+        try:
+            if cmd == "CHAN":
+                st["chan"] = int(args[0])
+            elif cmd == "MOVE":
+                x, y = float(args[0]), float(args[1])
+                dist = ((x - st["x"]) ** 2 + (y - st["y"]) ** 2) ** 0.5
+                st["x"], st["y"] = x, y
+                return b"OK MOVE", (dist / self.move_speed if self.move_speed > 0 else 0.0)
+            elif cmd == "FOCUS":
+                st["focus"] = int(float(args[0]))
+            elif cmd in ("TEMP", "PRES"):
+                key = "temp_set" if cmd == "TEMP" else "pres_set"
+                st[key][self._side(args[0])] = float(args[1])
+            elif cmd in ("HEAT", "PUMP"):
+                key = "heat" if cmd == "HEAT" else "pump"
+                st[key][self._side(args[0])] = args[1] not in ("0", "OFF")
+            elif cmd == "PLINK":
+                st["plink"] = args[0] not in ("0", "OFF")
+            elif cmd == "?POS":
+                return f"POS:{st['x']:.4f},{st['y']:.4f}".encode(), 0.0
+            elif cmd == "?FOCUS":
+                return f"FOCUS:{st['focus']}".encode(), 0.0
+            elif cmd == "?CHAN":
+                return f"CHAN:{st['chan']}".encode(), 0.0
+            elif cmd == "?TEMP":
+                return self._temp_line(), 0.0
+            elif cmd == "?PRES":
+                return f"PRES:{st['pres']['L']:.1f},{st['pres']['R']:.1f}".encode(), 0.0
+            else:
+                self.stats["unknown"] += 1
+                return b"ERR:unknown", 0.0
+        except (IndexError, ValueError):
+            return b"ERR:args", 0.0
+        return b"OK " + cmd.encode(), 0.0
+
+    @staticmethod
+    def _side(arg: str) -> str:
+        if arg not in ("L", "R"):
+            raise ValueError(arg)
+        return arg
+
+    def _temp_line(self) -> bytes:
+        t = self.state["temp"]
+        return f"TEMP:{t['L']:.1f},{t['R']:.1f}".encode()
+
+    def _advance_model(self, now: float):
+        """First-order response of heaters and pumps towards their setpoints."""
+        dt = now - self._t_model
+        self._t_model = now
+        st = self.state
+        k = min(1.0, dt / 20.0)  # ~20 s time constant
+        for side in ("L", "R"):
+            target = st["temp_set"][side] if st["heat"][side] else 25.0
+            st["temp"][side] += (target - st["temp"][side]) * k
+            on = st["pump"][side] or (st["plink"] and (st["pump"]["L"] or st["pump"]["R"]))
+            target = st["pres_set"][side] if on else 0.0
+            st["pres"][side] += (target - st["pres"][side]) * min(1.0, dt / 2.0)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serial controller simulator on a pty")
+    ap.add_argument("--latency", type=float, default=2.0, help="reply latency in ms")
+    ap.add_argument("--jitter", type=float, default=0.0, help="extra uniform 0..jitter ms per reply")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--drop-rate", type=float, default=0.0)
+    ap.add_argument("--garble-rate", type=float, default=0.0)
+    ap.add_argument("--fragment", action="store_true", help="split replies into several writes")
+    ap.add_argument("--move-speed", type=float, default=0.0, help="stage units per second (0 = instant)")
+    ap.add_argument("--report", type=float, default=0.0, help="unsolicited TEMP report period in s")
+    ap.add_argument("--seed", type=int, default=None)
+    a = ap.parse_args(argv)
+    sim = SerialDeviceSimulator(a.latency, a.jitter, a.error_rate, a.drop_rate, a.garble_rate,
+                                a.fragment, a.move_speed, a.report, a.seed)
+    print(sim.start(), flush=True)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        print(sim.stats)
+
+
+if __name__ == "__main__":
+    main()
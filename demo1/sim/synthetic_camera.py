@@ -0,0 +1,452 @@
+# This Python file uses the following encoding: utf-8
+"""
+Synthetic camera backend: the subset of the VmbPy API that CameraWorker
+uses (VmbSystem, PixelFormat, FrameStatus, AllocationMode, camera features,
+start_streaming/queue_frame, Frame getters), producing fluorescence-like
+frames without hardware.
+
+    PCR_CAMERA_BACKEND=synthetic PCR_SIM_CAMERA=1936x1216@60 python widget.py
+
+The scene (blurred cells and puncta on a dim background) is rendered once
+at sensor resolution. ROI, binning, exposure and gain are applied to it and
+a small bank of noisy frames (shot noise + read noise) is
+pre-encoded in the current pixel format; the acquisition thread cycles
+through the bank at AcquisitionFrameRate, so the host sees realistic
+payloads at a near-zero generation cost. Buffers that are not handed back
+with queue_frame() in time cause lost frame IDs, as on a real transport.
+"""
+from __future__ import annotations
+
+import enum
+import os
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from pixel_unpack import payload_size
+
+
+class PixelFormat(enum.Enum):
+    Mono8 = 'Mono8'
+    Mono10 = 'Mono10'
+    Mono10p = 'Mono10p'
+    Mono12 = 'Mono12'
+    Mono12p = 'Mono12p'
+    Mono16 = 'Mono16'
+
+    def __str__(self):
+        return self.value
+
+
+class FrameStatus(enum.Enum):
+    Complete = 0
+    Incomplete = -1
+
+
+class AllocationMode(enum.IntEnum):
+    AnnounceFrame = 0
+    AllocAndAnnounceFrame = 1
+
+
+_BITS = {'Mono8': 8, 'Mono10': 10, 'Mono10p': 10, 'Mono12': 12, 'Mono12p': 12, 'Mono16': 16}
+
+# defaults for new cameras; see configure()
+_CONFIG = {
+    'width': 1936,
+    'height': 1216,
+    'fps': 30.0,
+    'full_well': 10000.0,      # electrons at saturation (gain 0 dB)
+    'read_noise': 2.5,         # electrons rms
+    'background': 0.04,        # fraction of full well at the reference exposure
+    'cells': 60,
+    'bank': 8,                 # distinct noisy frames cycled per configuration
+    'incomplete_rate': 0.0,    # fraction of frames delivered as FrameStatus.Incomplete
+    'cameras': 1,
+    'seed': 1,
+}
+
+
+def configure(**kw):
+    """Change the defaults used for cameras created afterwards (width, height, fps, ...)."""
+    unknown = set(kw) - set(_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown synthetic camera option(s): {', '.join(sorted(unknown))}")
+    _CONFIG.update(kw)
+
+
+def _config_from_env():
+    # e.g. PCR_SIM_CAMERA=1936x1216@60
+    m = re.fullmatch(r'\s*(\d+)x(\d+)(?:@([\d.]+))?\s*', os.environ.get('PCR_SIM_CAMERA', ''))
+    if m:
+        _CONFIG['width'], _CONFIG['height'] = int(m.group(1)), int(m.group(2))
+        if m.group(3):
+            _CONFIG['fps'] = float(m.group(3))
+
+
+_config_from_env()
+
+
+def render_scene(w: int, h: int, cells: int, seed: int) -> np.ndarray:
+    """Noise-free fluorescence-like scene in [0, 1] (float32, h x w)."""
+    rng = np.random.default_rng(seed)
+    img = np.zeros((h, w), np.float32)
+    scale = min(w, h) / 1000.0
+    for _ in range(cells):
+        cx, cy = int(rng.uniform(0, w)), int(rng.uniform(0, h))
+        ax = max(2, int(rng.uniform(15, 40) * scale))
+        ay = max(2, int(ax * rng.uniform(0.5, 1.0)))
+        cv2.ellipse(img, (cx, cy), (ax, ay), float(rng.uniform(0, 180)), 0, 360,
+                    float(rng.uniform(0.15, 0.45)), -1)
+        # nucleus-like bright core
+        cv2.circle(img, (cx, cy), max(1, ax // 3), float(rng.uniform(0.3, 0.6)), -1)
+    sigma = max(1.0, 3.0 * scale)
+    img = cv2.GaussianBlur(img, (0, 0), sigma)
+    spots = rng.integers(0, w * h, size=max(1, cells * 8))
+    img.reshape(-1)[spots] += rng.uniform(2.0, 6.0, size=spots.size).astype(np.float32)
+    img = cv2.GaussianBlur(img, (0, 0), max(0.7, 1.0 * scale))
+    return np.clip(img, 0.0, 1.0)
+
+
+def encode(img: np.ndarray, fmt: str) -> np.ndarray:
+    """Pack a uint16 image (values < 2**bits) into the raw payload of fmt (uint8)."""
+    flat = img.reshape(-1)
+    if fmt == 'Mono8':
+        return flat.astype(np.uint8)
+    if fmt in ('Mono10', 'Mono12', 'Mono16'):
+        return flat.astype('<u2').view(np.uint8)
+    n = flat.size
+    if fmt == 'Mono12p':
+        groups = -(-n // 2)
+        p = np.zeros(groups * 2, np.uint16)
+        p[:n] = flat
+        p = p.reshape(groups, 2)
+        b = np.empty((groups, 3), np.uint8)
+        b[:, 0] = p[:, 0] & 0xFF
+        b[:, 1] = (p[:, 0] >> 8) | ((p[:, 1] & 0x0F) << 4)
+        b[:, 2] = p[:, 1] >> 4
+        return b.reshape(-1)[:payload_size(fmt, n, 1)]
+    if fmt == 'Mono10p':
+        groups = -(-n // 4)
+        p = np.zeros(groups * 4, np.uint16)
+        p[:n] = flat
+        p = p.reshape(groups, 4)
+        b = np.empty((groups, 5), np.uint8)
+        b[:, 0] = p[:, 0] & 0xFF
+        b[:, 1] = (p[:, 0] >> 8) | ((p[:, 1] & 0x3F) << 2)
+        b[:, 2] = (p[:, 1] >> 6) | ((p[:, 2] & 0x0F) << 4)
+        b[:, 3] = (p[:, 2] >> 4) | ((p[:, 3] & 0x03) << 6)
+        b[:, 4] = p[:, 3] >> 2
+        return b.reshape(-1)[:payload_size(fmt, n, 1)]
+    raise ValueError(f"Unsupported pixel format: {fmt}")
+
+
+class _Feature:
+    """GenICam-style feature: get/set with a (possibly dynamic) range and increment."""
+
+    def __init__(self, cam: Camera, name: str, value, lo=None, hi=None, inc=None, locked=False):
+        self._cam = cam
+        self.name = name
+        self._value = value
+        self._lo = lo
+        self._hi = hi
+        self._inc = inc
+        self.locked = locked  # not writable while streaming
+
+    def get(self):
+        return self._value
+
+    def get_range(self):
+        lo = self._lo() if callable(self._lo) else self._lo
+        hi = self._hi() if callable(self._hi) else self._hi
+        return lo, hi
+
+    def get_increment(self):
+        return self._inc
+
+    def set(self, value):
+        if self.locked and self._cam._streaming:
+            raise RuntimeError(f"{self.name} is not writable while streaming")
+        if self._lo is not None and not isinstance(value, (bool, str)):
+            lo, hi = self.get_range()
+            if not lo <= value <= hi:
+                raise ValueError(f"{self.name}={value} outside [{lo}, {hi}]")
+            if self._inc and (value - lo) % self._inc:
+                raise ValueError(f"{self.name}={value} not a multiple of {self._inc}")
+        self._value = value
+        self._cam._invalidate(self.name)
+
+
+class _Command:
+    """GenICam command feature (run())."""
+
+    def __init__(self, name: str, action):
+        self.name = name
+        self._action = action
+
+    def run(self):
+        self._action()
+
+
+class Frame:
+    def __init__(self):
+        self._buf = None
+        self._id = 0
+        self._ts = 0
+        self._status = FrameStatus.Complete
+        self._fmt = PixelFormat.Mono8
+        self._w = 0
+        self._h = 0
+
+    def get_id(self) -> int:
+        return self._id
+
+    def get_status(self) -> FrameStatus:
+        return self._status
+
+    def get_pixel_format(self) -> PixelFormat:
+        return self._fmt
+
+    def get_width(self) -> int:
+        return self._w
+
+    def get_height(self) -> int:
+        return self._h
+
+    def get_buffer(self):
+        return self._buf
+
+    def get_buffer_size(self) -> int:
+        return self._buf.size
+
+    def get_timestamp(self) -> int:
+        return self._ts
+
+    def as_numpy_ndarray(self) -> np.ndarray:
+        return self._buf[:self._w * self._h].reshape(self._h, self._w, 1)
+
+
+class Camera:
+    """One synthetic sensor; features are attributes, as on a VmbPy camera."""
+
+    def __init__(self, cam_id: str, config: dict):
+        self._id = cam_id
+        self._cfg = dict(config)
+        sw, sh = int(self._cfg['width']), int(self._cfg['height'])
+        self._sensor = (sw, sh)
+        self._format = PixelFormat.Mono8
+        self._streaming = False
+        self._lock = threading.Lock()
+        self._scene = None
+        self._bank: list[np.ndarray] = []
+        self._dirty = True
+        self._thread = None
+        self._stop = threading.Event()
+        self._free: list[Frame] = []
+        self._t0 = time.perf_counter_ns()
+        self._rng = np.random.default_rng(int(self._cfg['seed']) + 1)
+        binned = lambda feat, full: full // self._features[feat].get()
+        f = self._features = {}
+        f['SensorWidth'] = _Feature(self, 'SensorWidth', sw)
+        f['SensorHeight'] = _Feature(self, 'SensorHeight', sh)
+        f['BinningHorizontal'] = _Feature(self, 'BinningHorizontal', 1, 1, 4, 1, locked=True)
+        f['BinningVertical'] = _Feature(self, 'BinningVertical', 1, 1, 4, 1, locked=True)
+        f['WidthMax'] = _Feature(self, 'WidthMax', sw)
+        f['HeightMax'] = _Feature(self, 'HeightMax', sh)
+        f['Width'] = _Feature(self, 'Width', sw, 8, lambda: binned('BinningHorizontal', sw) - f['OffsetX'].get(),
+                              8, locked=True)
+        f['Height'] = _Feature(self, 'Height', sh, 2, lambda: binned('BinningVertical', sh) - f['OffsetY'].get(),
+                               2, locked=True)
+        f['OffsetX'] = _Feature(self, 'OffsetX', 0, 0, lambda: binned('BinningHorizontal', sw) - f['Width'].get(), 8)
+        f['OffsetY'] = _Feature(self, 'OffsetY', 0, 0, lambda: binned('BinningVertical', sh) - f['Height'].get(), 2)
+        f['ExposureTime'] = _Feature(self, 'ExposureTime', 10000.0, 10.0, 10_000_000.0)
+        f['ExposureAuto'] = _Feature(self, 'ExposureAuto', 'Off')
+        f['Gain'] = _Feature(self, 'Gain', 0.0, 0.0, 24.0)
+        f['GainAuto'] = _Feature(self, 'GainAuto', 'Off')
+        f['GammaEnable'] = _Feature(self, 'GammaEnable', False)
+        f['BlackLevel'] = _Feature(self, 'BlackLevel', 0.0, 0.0, 255.0)
+        f['AcquisitionMode'] = _Feature(self, 'AcquisitionMode', 'Continuous')
+        f['AcquisitionFrameRate'] = _Feature(self, 'AcquisitionFrameRate', float(self._cfg['fps']), 0.1, 1000.0)
+        f['TriggerMode'] = _Feature(self, 'TriggerMode', 'Off', locked=True)
+        # device clock in ns since the camera was created; frames are stamped at exposure start
+        f['TimestampLatchValue'] = _Feature(self, 'TimestampLatchValue', 0)
+        f['TimestampLatch'] = _Command('TimestampLatch', self._latch_timestamp)
+
+    def __getattr__(self, name):
+        feats = self.__dict__.get('_features')
+        if feats is not None and name in feats:
+            return feats[name]
+        raise AttributeError(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_streaming()
+
+    def get_id(self) -> str:
+        return self._id
+
+    def get_pixel_formats(self) -> tuple:
+        return tuple(PixelFormat)
+
+    def get_pixel_format(self) -> PixelFormat:
+        return self._format
+
+    def set_pixel_format(self, fmt):
+        if self._streaming:
+            raise RuntimeError("PixelFormat is not writable while streaming")
+        self._format = PixelFormat(str(fmt))
+        self._invalidate('PixelFormat')
+
+    # --- streaming ---
+    def start_streaming(self, handler, buffer_count: int = 5, allocation_mode=AllocationMode.AnnounceFrame):
+        if self._streaming:
+            raise RuntimeError("Camera is already streaming")
+        self._free = [Frame() for _ in range(max(1, int(buffer_count)))]
+        self._stop.clear()
+        self._streaming = True
+        self._thread = threading.Thread(target=self._acquire, args=(handler,), name="synthetic-camera", daemon=True)
+        self._thread.start()
+
+    def stop_streaming(self):
+        if not self._streaming:
+            return
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self._streaming = False
+
+    def is_streaming(self) -> bool:
+        return self._streaming
+
+    def queue_frame(self, frame: Frame):
+        with self._lock:
+            self._free.append(frame)
+
+    # features that change the image; anything else leaves the frame bank alone
+    _IMAGE_FEATURES = frozenset((
+        'PixelFormat', 'Width', 'Height', 'OffsetX', 'OffsetY', 'BinningHorizontal', 'BinningVertical',
+        'ExposureTime', 'Gain', 'BlackLevel',
+    ))
+
+    def _latch_timestamp(self):
+        self._features['TimestampLatchValue']._value = time.perf_counter_ns() - self._t0
+
+    def _invalidate(self, name: str = ''):
+        if name not in self._IMAGE_FEATURES:
+            return
+        if name.startswith('Binning'):
+            # like most cameras, shrink the ROI to fit the binned sensor
+            f = self._features
+            for size, off, full, b in (('Width', 'OffsetX', self._sensor[0], 'BinningHorizontal'),
+                                       ('Height', 'OffsetY', self._sensor[1], 'BinningVertical')):
+                room = full // f[b].get()
+                inc = f[size].get_increment()
+                f[off]._value = min(f[off].get(), max(0, room - f[size].get()) // inc * inc)
+                f[size]._value = min(f[size].get(), (room - f[off].get()) // inc * inc)
+        self._dirty = True
+
+    def _acquire(self, handler):
+        frame_id = 0
+        next_t = time.perf_counter()
+        i = 0
+        while not self._stop.is_set():
+            if self._dirty:
+                self._build_bank()
+            fps = float(self.AcquisitionFrameRate.get())
+            # a frame cannot be shorter than its exposure
+            period = max(1.0 / max(fps, 1e-3), float(self.ExposureTime.get()) * 1e-6)
+            next_t += period
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                if self._stop.wait(delay):
+                    break
+            elif delay < -period:
+                next_t = time.perf_counter()  # fell behind (slow handler): do not burst
+            frame_id += 1
+            with self._lock:
+                frame = self._free.pop() if self._free else None
+            if frame is None:
+                continue  # no buffer queued: the frame is lost, its ID skipped
+            frame._id = frame_id
+            frame._ts = time.perf_counter_ns() - self._t0 - int(float(self.ExposureTime.get()) * 1000)
+            frame._fmt = self._format
+            frame._w, frame._h = self._size
+            frame._buf = self._bank[i % len(self._bank)]
+            i += 1
+            rate = float(self._cfg['incomplete_rate'])
+            frame._status = (FrameStatus.Incomplete if rate and self._rng.random() < rate
+                             else FrameStatus.Complete)
+            try:
+                handler(self, None, frame)
+            except Exception:
+                pass  # like VmbPy: a failing handler does not stop acquisition
+
+    def _build_bank(self):
+        self._dirty = False
+        cfg = self._cfg
+        if self._scene is None:
+            self._scene = render_scene(*self._sensor, int(cfg['cells']), int(cfg['seed']))
+        bh, bv = int(self.BinningHorizontal.get()), int(self.BinningVertical.get())
+        w, h = int(self.Width.get()), int(self.Height.get())
+        ox, oy = int(self.OffsetX.get()), int(self.OffsetY.get())
+        roi = self._scene[oy * bv:(oy + h) * bv, ox * bh:(ox + w) * bh]
+        if bh > 1 or bv > 1:
+            # binning adds the charge of bh x bv pixels
+            roi = roi.reshape(h, bv, w, bh).sum(axis=(1, 3))
+        fmt = str(self._format)
+        bits = _BITS[fmt]
+        full_well = float(cfg['full_well'])
+        exposure = float(self.ExposureTime.get()) / 10000.0  # relative to 10 ms
+        electrons = (roi + float(cfg['background'])) * (full_well * 0.8 * exposure)
+        adu_per_e = (2 ** bits - 1) / full_well * 10 ** (float(self.Gain.get()) / 20.0)
+        black = float(self.BlackLevel.get()) * (2 ** bits - 1) / 255.0
+        # shot + read noise as one Gaussian (sqrt(e + r^2)); far cheaper than
+        # Poisson draws and indistinguishable at fluorescence signal levels
+        sigma = np.sqrt(electrons + float(cfg['read_noise']) ** 2)
+        bank = []
+        for _ in range(max(1, int(cfg['bank']))):
+            e = self._rng.standard_normal(electrons.shape, dtype=np.float32)
+            e *= sigma
+            e += electrons
+            adu = np.clip(e * adu_per_e + black, 0, 2 ** bits - 1).astype(np.uint16)
+            bank.append(np.ascontiguousarray(encode(adu, fmt)))
+        self._size = (w, h)
+        self._bank = bank
+
+
+class VmbSystem:
+    _instance = None
+
+    def __init__(self):
+        self._cameras = None
+
+    @classmethod
+    def get_instance(cls) -> VmbSystem:
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __enter__(self):
+        if self._cameras is None:
+            n = max(1, int(_CONFIG['cameras']))
+            self._cameras = [Camera(f"SIM-{i}", _CONFIG) for i in range(n)]
+        return self
+
+    def __exit__(self, *exc):
+        for cam in self._cameras or ():
+            cam.stop_streaming()
+        self._cameras = None
+
+    def get_all_cameras(self) -> tuple:
+        return tuple(self._cameras or ())
+
+    def get_camera_by_id(self, cam_id: str) -> Camera:
+        for cam in self._cameras or ():
+            if cam.get_id() == cam_id:
+                return cam
+        raise LookupError(f"No camera with id {cam_id}")
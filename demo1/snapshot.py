@@ -0,0 +1,133 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import io
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+def encode_png(img: np.ndarray, level: int = 3, metadata: dict | None = None) -> bytes:
+    """Lossless PNG (8/16-bit) with metadata as JSON in an iTXt 'Description' chunk."""
+    ok, buf = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, int(level)])
+    if not ok:
+        raise RuntimeError("PNG encoding failed")
+    data = buf.tobytes()
+    if not metadata:
+        return data
+    # keyword \0 compression flag, method \0 language \0 translated keyword \0 text
+    text = b"Description\x00\x00\x00\x00\x00" + json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+    chunk = struct.pack(">I", len(text)) + b"iTXt" + text + struct.pack(">I", zlib.crc32(b"iTXt" + text))
+    ihdr_end = 8 + 8 + 13 + 4  # signature, IHDR length/type, IHDR data, CRC
+    return data[:ihdr_end] + chunk + data[ihdr_end:]
+
+
+def encode_tiff(img: np.ndarray, level: int = 6, metadata: dict | None = None) -> tuple[bytes, str | None]:
+    """
+    Lossless TIFF -> (file bytes, sidecar JSON or None). With tifffile: zlib
+    at the given level and the metadata JSON as ImageDescription. Without it:
+    OpenCV LZW (level > 0) and the metadata returned for a .json sidecar.
+    """
+    desc = json.dumps(metadata or {}, ensure_ascii=False)
+    try:
+        import tifffile
+    except ImportError:
+        tifffile = None
+    if tifffile is not None:
+        kw = {"compression": "zlib", "compressionargs": {"level": int(level)}} if level > 0 else {}
+        out = io.BytesIO()
+        tifffile.imwrite(out, img, description=desc, metadata=None, **kw)
+        return out.getvalue(), None
+    ok, buf = cv2.imencode(".tiff", img, [cv2.IMWRITE_TIFF_COMPRESSION, 5 if level > 0 else 1])
+    if not ok:
+        raise RuntimeError("TIFF encoding failed")
+    return buf.tobytes(), (desc if metadata else None)
+
+
+class _SnapshotJob(QRunnable):
+    def __init__(self, service: SnapshotService, img, path, fmt, level, metadata):
+        super().__init__()
+        self._service = service
+        self._img = img
+        self._path = path
+        self._fmt = fmt
+        self._level = level
+        self._metadata = metadata
+
+    def run(self):
+        t0 = time.perf_counter()
+        tmp = self._path + ".part"
+        try:
+            sidecar = None
+            if self._fmt == "png":
+                data = encode_png(self._img, self._level, self._metadata)
+            else:
+                data, sidecar = encode_tiff(self._img, self._level, self._metadata)
+            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            if sidecar is not None:
+                with open(os.path.splitext(self._path)[0] + ".json", "w", encoding="utf-8") as f:
+                    f.write(sidecar)
+            os.replace(tmp, self._path)  # never leave a half-written image under the real name
+        except Exception as e:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            self._service._done()
+            self._service.failed.emit(f"Saving {os.path.basename(self._path)} failed: {e}")
+            return
+        self._service._done()
+        self._service.saved.emit(self._path, (time.perf_counter() - t0) * 1000.0)
+
+
+class SnapshotService(QObject):
+    """
+    Encodes and writes still images on a small QThreadPool.
+    save() only queues the job (the caller hands over its own copy of the
+    frame) and returns the target path; the job creates missing folders.
+    saved(path, ms) or failed(msg) is delivered to the caller's thread when
+    the file is on disk.
+    """
+
+    saved = Signal(str, float)  # path, encode + write time in ms
+    failed = Signal(str)
+
+    FORMATS = {"png": ".png", "tiff": ".tif"}
+
+    def __init__(self, max_threads: int = 2, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, max_threads))
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def save(self, img: np.ndarray, base_path: str, fmt: str = "png", level: int = 3,
+             metadata: dict | None = None) -> str:
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown snapshot format: {fmt}")
+        path = base_path + self.FORMATS[fmt]
+        with self._lock:
+            self._pending += 1
+        self._pool.start(_SnapshotJob(self, img, path, fmt, level, metadata))
+        return path
+
+    def pending(self) -> int:
+        """Snapshots queued or being written."""
+        return self._pending
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Block until all queued snapshots are written (e.g. on shutdown)."""
+        return self._pool.waitForDone(msecs)
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
@@ -179,6 +179,15 @@ def build_video_tab(parent, s, make_card):
     row5 = QHBoxLayout()
     capture_btn = QPushButton("拍照", tab)
     row5.addWidget(capture_btn)
+    left_btns = QVBoxLayout()
+    add_position_btn = QPushButton("添加位置", tab)
+    multi_run_btn = QPushButton("多点采集", tab)
+    multi_run_btn.setCheckable(True)
+    left_btns.addWidget(add_position_btn)
+    left_btns.addWidget(multi_run_btn)
+    row5.addLayout(left_btns)
+    positions_lbl = QLabel("位置: 0", tab)
+    row5.addWidget(positions_lbl)
     row5.addStretch(1)
     right_btns = QVBoxLayout()
     clear_positions_btn = QPushButton("清空拍摄位置", tab)
@@ -209,5 +218,8 @@ def build_video_tab(parent, s, make_card):
         "capture_btn": capture_btn,
         "clear_positions_btn": clear_positions_btn,
         "save_image_btn": save_image_btn,
+        "add_position_btn": add_position_btn,
+        "multi_run_btn": multi_run_btn,
+        "positions_lbl": positions_lbl,
     }
     return tab, refs
@@ -0,0 +1,87 @@
+# This Python file uses the following encoding: utf-8
+import numpy as np
+
+from acquisition import MultiPositionAcquisition
+
+
+def _acquisition(sent, saved):
+    frame = (np.zeros((4, 4), np.uint8), 8, {})
+    # send returns a Future when queued, None when the port is not connected
+    acq = MultiPositionAcquisition(send=lambda data: sent.append(data) or True, grab=lambda: frame,
+                                   save=lambda img, bits, meta, name: saved.append(name))
+    acq.settle_frames = 0
+    return acq
+
+
+def test_empty_position_list_captures_in_place(qapp):
+    sent, saved, finished = [], [], []
+    acq = _acquisition(sent, saved)
+    acq.channels = []
+    acq.finished.connect(lambda: finished.append(True))
+    assert acq.start(rounds=2)
+    assert acq.running
+    acq.frame_arrived()
+    acq.frame_arrived()
+    assert saved == ["r001_p00_c0", "r002_p00_c0"]
+    assert not any(cmd.startswith(b"MOVE") for cmd in sent)
+    assert finished and not acq.running
+
+
+def test_start_failure_leaves_it_restartable(qapp):
+    saved, errors = [], []
+
+    def send(_data):
+        raise OSError("port closed")
+
+    acq = _acquisition([], saved)
+    acq._send = send
+    acq.add_position(1.0, 2.0)
+    acq.error.connect(errors.append)
+    assert not acq.start()
+    assert not acq.running and errors
+    acq._send = lambda _data: True
+    assert acq.start()
+    acq.frame_arrived()  # settle timer not elapsed yet: ignored
+    assert saved == []
+
+
+def test_unsent_command_stops_the_run(qapp):
+    saved, errors = [], []
+    acq = _acquisition([], saved)
+    acq.add_position(1.0, 2.0)
+    acq.error.connect(errors.append)
+    acq._send = lambda _data: None  # not connected
+    assert not acq.start()
+    assert not acq.running and "not connected" in errors[0]
+
+
+def test_failed_save_stops_before_moving_on(qapp):
+    sent, errors, progress = [], [], []
+
+    def save(_img, _bits, _meta, name):
+        raise OSError("disk full")
+
+    acq = _acquisition(sent, [])
+    acq._save = save
+    acq.channels = [0, 1]
+    acq.error.connect(errors.append)
+    acq.progress.connect(lambda *a: progress.append(a))
+    assert acq.start()
+    acq._on_settled()  # CHAN:0 settled
+    acq.frame_arrived()
+    assert not acq.running and errors == ["Saving r001_p00_c0 failed: disk full"]
+    assert sent == [b"CHAN:0\r\n"] and not progress  # CHAN:1 never sent
+
+
+def test_channels_advance_after_each_save(qapp):
+    sent, saved, rounds = [], [], []
+    acq = _acquisition(sent, saved)
+    acq.add_position(0.5, 0.25)
+    acq.channels = [0, 2]
+    acq.roundFinished.connect(lambda rnd, _dt: rounds.append(rnd))
+    assert acq.start(rounds=1)
+    for _ in range(2):
+        acq._on_settled()
+        acq.frame_arrived()
+    assert sent == [b"MOVE:0.5000,0.2500\r\n", b"CHAN:0\r\n", b"CHAN:2\r\n"]
+    assert saved == ["r001_p00_c0", "r001_p00_c2"] and rounds == [1] and not acq.running
@@ -0,0 +1,176 @@
+# This Python file uses the following encoding: utf-8
+import math
+import time
+
+import numpy as np
+
+import autofocus
+from autofocus import Autofocus, FocusTracker
+
+
+def _curve(peak, width=600.0, floor=0.05):
+    return lambda pos: floor + math.exp(-0.5 * ((pos - peak) / width) ** 2)
+
+
+def _run(af, curve, limit=100):
+    """Drive the steps synchronously: settle at once, measure curve(position)."""
+    while af.running and limit:
+        af._settle_timer.stop()
+        af._on_settled()
+        af._on_measured(curve(af.position), 0.1)
+        limit -= 1
+
+
+def _autofocus(sent):
+    af = Autofocus(send=lambda data: sent.append(data) or True)
+    af.settle_ms = 0
+    return af
+
+
+def test_coarse_to_fine_search_finds_the_peak(qapp):
+    sent, done = [], []
+    af = _autofocus(sent)
+    af.finished.connect(lambda pos, metric, summary: done.append((pos, summary)))
+    af.start(0)
+    _run(af, _curve(837, 300))
+    pos, summary = done[0]
+    assert abs(pos - 837) <= 5 and not af.running
+    assert sent[-1] == f"FOCUS:{pos}\r\n".encode("utf-8")
+    coarse = [s["position"] for s in af.steps if s["phase"] == "coarse"]
+    fine = [s["position"] for s in af.steps if s["phase"] == "fine"]
+    # the coarse scan stops two steps past the peak, the fine pass stays around it
+    assert coarse[0] == -2000 and coarse[-1] == 1500
+    assert fine and all(abs(p - 750) <= 250 and p % 25 == 0 for p in fine)
+    assert summary["coarse_steps"] == len(coarse) and summary["fine_steps"] == len(fine)
+
+
+def test_noise_floor_does_not_end_the_coarse_scan(qapp):
+    sent, done = [], []
+    af = _autofocus(sent)
+    af.finished.connect(lambda pos, metric, summary: done.append(pos))
+    af.start(0)
+    # flat, slightly noisy far from focus: falls there must not count
+    noise = {p: 0.05 * (1 + 0.3 * ((p // 250) % 2)) for p in range(-2000, 2001, 25)}
+    _run(af, lambda pos: noise[pos] + _curve(1600, 150, 0.0)(pos))
+    assert abs(done[0] - 1600) <= 25
+
+
+def test_parabola_refinement(qapp):
+    af = _autofocus([])
+
+    def parabola(vertex):
+        return lambda x: 100.0 - (x - vertex) ** 2 / 50.0
+
+    y = parabola(1010)
+    af._samples = {x: y(x) for x in (975, 1000, 1025, 1100)}
+    assert af._refine(1000) == 1010
+    y = parabola(992)
+    af._samples = {x: y(x) for x in (950, 1000, 1025)}  # uneven spacing
+    assert af._refine(1000) == 992
+    af._samples = {975: 1.0, 1000: 2.0, 1025: 3.0}  # no maximum between the neighbours
+    assert af._refine(1000) == 1000
+    af._samples = {1000: 2.0, 1025: 1.0}  # best at the edge of the scan
+    assert af._refine(1000) == 1000
+
+
+def test_unsent_focus_command_ends_with_error(qapp):
+    sent, done, errors = [], [], []
+    af = _autofocus(sent)
+    af.finished.connect(lambda *args: done.append(args))
+    af.error.connect(errors.append)
+    af._send = lambda _data: None  # not connected
+    af.start(0)
+    assert not af.running and "not connected" in errors[0]
+    sent_ok = [0]
+
+    def send(data):
+        sent_ok[0] += 1
+        return True if sent_ok[0] < 5 else None
+
+    af._send = send
+    af.start(0)
+    _run(af, _curve(0))
+    assert not af.running and not done and len(errors) == 2 and len(af.steps) == 4
+
+
+def test_missing_frame_ends_with_error(qapp):
+    done, errors = [], []
+    af = _autofocus([])
+    af.frame_timeout_ms = 20
+    af.finished.connect(lambda *args: done.append(args))
+    af.error.connect(errors.append)
+    af.start(0)
+    deadline = time.monotonic() + 2.0
+    while af.running and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.002)
+    assert not af.running and not done
+    assert errors == ["No frame within 20 ms at focus -2000"]
+    af.analyze(np.zeros((16, 16), np.uint8), 8, {})  # a late frame is ignored
+    qapp.processEvents()
+    assert not af.steps
+
+
+def _tracker(sent, metric, monkeypatch):
+    monkeypatch.setattr(autofocus, "focus_metric", metric)
+    tr = FocusTracker(send=lambda data: sent.append(data) or True)
+    tr.every_n = 1
+    tr.start(500)
+    return tr
+
+
+def _feed(tr, n):
+    img = np.zeros((64, 64), np.uint8)
+    for _ in range(n):
+        tr.analyze(img, 8, {})
+
+
+def test_tracker_stays_within_its_time_budget(qapp, monkeypatch):
+    stats = []
+
+    def slow(_img, _method, _roi, side):
+        time.sleep(0.003)
+        return float(side)
+
+    tr = _tracker([], slow, monkeypatch)
+    tr.budget_ms = 1.0
+    tr.statsUpdated.connect(stats.append)
+    _feed(tr, 3)
+    # over budget: the ROI shrinks to min_side first ...
+    assert [s["side"] for s in stats] == [64, 32, 32] and tr._stride == 2
+    _feed(tr, 100)
+    # ... then fewer frames are measured, up to every_n * 16
+    assert tr._stride == 16 and tr._side == 32
+    monkeypatch.setattr(autofocus, "focus_metric", lambda *_args: 1.0)
+    _feed(tr, 16 + 8 + 4 + 2 + 1 + 1 + 1)
+    # well under budget: the stride comes back first, then the ROI size
+    assert tr._stride == 1 and tr._side == 128
+
+
+def test_tracker_climbs_back_to_focus(qapp, monkeypatch):
+    sent, corrected = [], []
+    peak = [500]
+    tr = _tracker(sent, lambda *_args: 0.0, monkeypatch)
+    tr.corrected.connect(lambda pos, metric: corrected.append(pos))
+
+    def measure(n=1):
+        for _ in range(n):
+            tr._on_measured(_curve(peak[0], 40.0)(tr.position), 0.1)
+
+    measure(3)
+    assert not sent and tr._state == "hold"
+    peak[0] = 530  # sample expanded
+    measure(20)
+    assert corrected == [530] and tr.position == 530 and tr._state == "hold"
+    # up past the peak, back once, then onto the best position seen
+    assert sent[0] == b"FOCUS:510\r\n" and sent[-1] == b"FOCUS:530\r\n"
+
+
+def test_tracker_stops_when_focus_cannot_be_sent(qapp, monkeypatch):
+    errors = []
+    tr = _tracker([], lambda *_args: 0.0, monkeypatch)
+    tr.error.connect(errors.append)
+    tr._send = lambda _data: None  # not connected
+    tr._on_measured(1.0, 0.1)
+    tr._on_measured(0.5, 0.1)  # below tolerance: starts a search
+    assert not tr.enabled and tr._state == "hold" and "not connected" in errors[0]
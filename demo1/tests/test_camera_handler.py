@@ -0,0 +1,61 @@
+# This Python file uses the following encoding: utf-8
+import numpy as np
+import pytest
+
+from camera_worker import CameraWorker
+from sim import synthetic_camera
+
+
+class _Cam:
+    def queue_frame(self, _frame):
+        pass
+
+
+def _frame(fid, w=8, h=4):
+    f = synthetic_camera.Frame()
+    f._buf = np.full(w * h, fid, np.uint8)
+    f._id, f._w, f._h = fid, w, h
+    return f
+
+
+@pytest.fixture
+def session(qapp):
+    worker = CameraWorker(ring_depth=2)
+    session = worker._session
+    session.api = synthetic_camera
+    return worker, session
+
+
+def test_failed_copy_frees_the_ring_slot(session, monkeypatch):
+    worker, session = session
+    writable = worker.ring.writable
+
+    def failing(*_args, **_kw):
+        raise MemoryError
+
+    monkeypatch.setattr(worker.ring, "writable", failing)
+    for fid in range(1, 4):
+        with pytest.raises(MemoryError):
+            session._handler(_Cam(), None, _frame(fid))
+    monkeypatch.setattr(worker.ring, "writable", writable)
+    session._handler(_Cam(), None, _frame(4))
+    slot, _seq, img = worker.ring.acquire_latest()
+    assert img[0, 0] == 4 and worker.ring.meta(slot)["frame_id"] == 4
+
+
+def test_failing_tap_is_removed_and_frame_published(session):
+    worker, session = session
+    seen, errors = [], []
+
+    def bad_tap(_raw, _meta):
+        raise MemoryError
+
+    worker.add_frame_tap(bad_tap)
+    worker.add_frame_tap(lambda _raw, meta: seen.append(meta["frame_id"]))
+    worker.tapFailed.connect(lambda tap, msg: errors.append(tap))
+    for fid in range(1, 4):
+        session._handler(_Cam(), None, _frame(fid))
+    assert seen == [1, 2, 3]
+    assert len(worker._taps) == 1 and errors == [bad_tap]
+    _slot, _seq, img = worker.ring.acquire_latest()
+    assert img[0, 0] == 3
@@ -0,0 +1,90 @@
+# This Python file uses the following encoding: utf-8
+import pytest
+
+from camera_worker import CameraWorker
+from sim import synthetic_camera
+
+
+@pytest.fixture
+def streaming(qapp):
+    """Session on a streaming 1024x768 synthetic camera; counts stream pauses."""
+    worker = CameraWorker(ring_depth=2)
+    session = worker._session
+    session.api = synthetic_camera
+    cam = synthetic_camera.Camera("SIM-ROI", {**synthetic_camera._CONFIG, 'width': 1024, 'height': 768,
+                                              'fps': 200.0, 'bank': 1})
+    cam.__enter__()
+    session.cam = cam
+    pauses = []
+    stop = cam.stop_streaming
+    cam.stop_streaming = lambda: (pauses.append(1), stop())
+    session._start_streaming()
+    session.streaming = True
+    events = {'reconfigured': [], 'failed': []}
+    worker.reconfigured.connect(lambda ms, applied: events['reconfigured'].append((ms, applied)))
+    worker.reconfigureFailed.connect(events['failed'].append)
+    yield session, cam, pauses, events
+    stop()
+
+
+def _roi(cam):
+    return {n: getattr(cam, n).get() for n in
+            ('Width', 'Height', 'OffsetX', 'OffsetY', 'BinningHorizontal', 'BinningVertical')}
+
+
+def test_zoom_sets_roi_and_binning_in_one_pause(streaming):
+    session, cam, pauses, events = streaming
+    session.set_viewport_roi(0.25, 0.25, 0.5, 0.5, 256, 192)
+    # 512x384 sensor pixels still cover the 256x192 display at 2x2 binning
+    assert _roi(cam) == {'Width': 256, 'Height': 192, 'OffsetX': 128, 'OffsetY': 96,
+                         'BinningHorizontal': 2, 'BinningVertical': 2}
+    assert len(pauses) == 1 and session.streaming and cam.is_streaming()
+    assert session._resume_applied['OffsetX'] == 128 and not events['failed']
+
+
+def test_pan_moves_offsets_without_pausing(streaming):
+    session, cam, pauses, events = streaming
+    session.set_viewport_roi(0.25, 0.25, 0.5, 0.5, 256, 192)
+    pauses.clear()
+    session.set_viewport_roi(0.5, 0.25, 0.5, 0.5, 256, 192)
+    assert not pauses
+    assert events['reconfigured'][-1] == (0.0, {'OffsetX': 256})
+    assert _roi(cam)['OffsetX'] == 256 and _roi(cam)['Width'] == 256
+
+
+def test_zoom_out_restores_the_full_sensor(streaming):
+    session, cam, _pauses, events = streaming
+    session.set_viewport_roi(0.5, 0.5, 0.5, 0.5, 128, 96)
+    session.set_viewport_roi(0.0, 0.0, 1.0, 1.0, 0, 0)
+    assert _roi(cam) == {'Width': 1024, 'Height': 768, 'OffsetX': 0, 'OffsetY': 0,
+                         'BinningHorizontal': 1, 'BinningVertical': 1}
+    assert not events['failed']
+
+
+def test_rejected_live_feature_is_reported_without_pausing(streaming):
+    session, cam, pauses, events = streaming
+    session.reconfigure({'Gain': 3.0, 'NoSuchFeature': 1})
+    assert not pauses and session.streaming
+    assert events['failed'] == [{'NoSuchFeature': 1}]
+    assert events['reconfigured'] == [(0.0, {'Gain': 3.0})]
+    assert cam.Gain.get() == 3.0
+
+
+def test_failed_buffer_restart_reports_and_leaves_stream_stopped(streaming, monkeypatch):
+    session, cam, pauses, _events = streaming
+    worker = session._worker
+    errors, stopped = [], []
+    worker.error.connect(errors.append)
+    worker.stoppedStreaming.connect(lambda: stopped.append(1))
+    session.set_stream_buffers(16, 'AnnounceFrame')
+    assert session.streaming and cam.is_streaming() and worker.buffer_count == 16
+
+    def refuse(*_args, **_kw):
+        raise RuntimeError("out of buffers")
+
+    monkeypatch.setattr(cam, "start_streaming", refuse)
+    session.set_stream_buffers(64, 'AllocAndAnnounceFrame')
+    assert not session.streaming and not cam.is_streaming()
+    assert stopped == [1] and len(errors) == 1 and "out of buffers" in errors[0]
+    session.stop_stream()  # nothing left to stop
+    assert stopped == [1] and len(pauses) == 2
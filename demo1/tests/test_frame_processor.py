@@ -0,0 +1,95 @@
+# This Python file uses the following encoding: utf-8
+import time
+
+import numpy as np
+import pytest
+from PySide6.QtCore import QSize, Qt
+
+from frame_processor import FrameProcessor, PreviewScaler
+from frame_ring import FrameRing
+
+
+def _publish(ring, value, meta=None):
+    slot = ring.acquire_write(64 * 64)
+    dst = ring.writable(slot, (64, 64), np.uint8, meta=meta or {'fmt': 'Mono8', 'w': 64, 'h': 64})
+    dst[:] = value
+    ring.publish(slot)
+
+
+def _wait(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return cond()
+
+
+@pytest.fixture
+def processor(qapp):
+    source = FrameRing(3, latest_only=True)
+    proc = FrameProcessor(source)
+    proc.start()
+    yield source, proc
+    proc.stop()
+
+
+def test_bad_frame_is_skipped_and_loop_survives(processor):
+    source, proc = processor
+    errors = []
+    proc.error.connect(errors.append, Qt.DirectConnection)
+    _publish(source, 1, {'fmt': 'Bogus8', 'w': 64, 'h': 64})
+    proc.notify()
+    assert _wait(lambda: proc.failed == 1)
+    _publish(source, 2)
+    proc.notify()
+    assert _wait(lambda: proc.processed == 1)
+    assert proc.isRunning() and len(errors) == 1
+    # the failed frame's slot went back to the ring
+    assert all(source.acquire_write(1) >= 0 for _ in range(2))
+
+
+def test_failing_analyzer_is_removed(processor):
+    source, proc = processor
+    seen = []
+
+    def bad(_native, _bits, _meta):
+        raise ZeroDivisionError
+
+    proc.add_analyzer(bad)
+    proc.add_analyzer(lambda native, bits, meta: seen.append(int(native[0, 0])))
+    for value in (3, 4):
+        _publish(source, value)
+        proc.notify()
+        assert _wait(lambda: len(seen) == value - 2)
+    assert seen == [3, 4] and len(proc._analyzers) == 1
+    assert proc.processed == 2
+
+
+def test_equalize_lut_travels_with_the_frame(processor):
+    source, proc = processor
+    proc.set_chain(["equalize_lut"])
+    slot = source.acquire_write(64 * 64)
+    img = source.writable(slot, (64, 64), np.uint8, meta={'fmt': 'Mono8', 'w': 64, 'h': 64})
+    img[:] = np.arange(64, dtype=np.uint8)[None, :] // 2
+    source.publish(slot)
+    proc.notify()
+    assert _wait(lambda: proc.processed == 1)
+    out_slot, _seq, out = proc.output.acquire_latest()
+    lut = proc.output.meta(out_slot)['lut']
+    assert lut.shape == (256,) and lut[0] == 0 and lut[31] == 255
+    assert out[0, 63] == 31  # image itself left for the shader
+
+
+@pytest.mark.parametrize("mode", ["auto", "decimate", "area"])
+def test_preview_size_matches_qt_keep_aspect_ratio(mode):
+    # the GUI only skips its own rescale when the sizes agree exactly
+    scaler = PreviewScaler(mode)
+    sources = [(1936, 1216), (2048, 1536), (1024, 768), (2592, 1944), (1280, 1024), (720, 1280)]
+    viewports = [(557, 348), (555, 348), (640, 480), (801, 599), (333, 777), (1000, 101), (1919, 1079)]
+    for w, h in sources:
+        img = np.zeros((h, w), np.uint8)
+        for vw, vh in viewports:
+            if w <= vw and h <= vh:
+                continue
+            out = scaler.scale(img, (vw, vh))
+            want = QSize(w, h).scaled(QSize(vw, vh), Qt.KeepAspectRatio)
+            assert (out.shape[1], out.shape[0]) == (want.width(), want.height()), (w, h, vw, vh)
@@ -0,0 +1,97 @@
+# This Python file uses the following encoding: utf-8
+import numpy as np
+import pytest
+
+from frame_ring import FrameRing
+
+
+def _write(ring, value, n=16):
+    slot = ring.acquire_write(n)
+    assert slot >= 0
+    ring.writable(slot, (n,), meta={'v': value})[:] = value
+    return slot, ring.publish(slot)
+
+
+def test_slot_life_cycle():
+    ring = FrameRing(2)
+    slot = ring.acquire_write(16)
+    assert ring._state[slot] == FrameRing.WRITING
+    ring.writable(slot, (4, 4), meta={'v': 7})[:] = 7
+    assert ring.pending() == 0 and ring.published == 0
+    seq = ring.publish(slot)
+    assert seq == 1 and ring._state[slot] == FrameRing.READY
+    assert ring.pending() == 1 and ring.published == 1
+    got_slot, got_seq, view = ring.acquire_latest()
+    assert (got_slot, got_seq) == (slot, seq) and view.shape == (4, 4)
+    assert np.all(view == 7) and ring.meta(slot) == {'v': 7}
+    assert ring._state[slot] == FrameRing.HELD and ring.pending() == 0
+    ring.release(slot)
+    assert ring._state[slot] == FrameRing.FREE
+    assert ring.acquire_latest() is None
+
+
+def test_abort_write_frees_the_slot():
+    ring = FrameRing(2)
+    a = ring.acquire_write(16)
+    b = ring.acquire_write(16)
+    assert ring.acquire_write(16) == -1  # both WRITING, nothing READY to reclaim
+    ring.abort_write(a)
+    assert ring.acquire_write(16) == a
+    ring.abort_write(b)
+    ring.abort_write(b)  # idempotent
+    assert ring.published == 0 and ring.pending() == 0
+
+
+def test_drop_oldest_when_reader_falls_behind():
+    ring = FrameRing(3)
+    s1, _ = _write(ring, 1)
+    _write(ring, 2)
+    _write(ring, 3)
+    s4, _ = _write(ring, 4)  # no FREE slot: oldest READY frame is recycled
+    assert s4 == s1 and ring.dropped == 1 and ring.pending() == 3
+    slot, seq, view = ring.acquire_latest()
+    assert view[0] == 4 and seq == 4
+    assert ring.dropped == 3  # acquire_latest recycles the older unread ones
+
+
+def test_latest_only_keeps_one_waiting_frame():
+    ring = FrameRing(3, latest_only=True)
+    for v in range(1, 6):
+        _write(ring, v)
+        assert ring.pending() == 1
+    assert ring.dropped == 4 and ring.published == 5
+    _slot, _seq, view = ring.acquire_latest()
+    assert view[0] == 5
+
+
+def test_writer_never_touches_a_held_slot():
+    ring = FrameRing(2)
+    held, _ = _write(ring, 1)
+    ring.acquire_latest()  # reader holds it
+    other, _ = _write(ring, 2)
+    assert other != held
+    # only the held slot and a READY one remain: the READY one is recycled
+    again, _ = _write(ring, 3)
+    assert again == other and ring.dropped == 1
+    assert ring._view(held)[0] == 1
+    # held + WRITING: nothing available
+    ring.acquire_write(16)
+    assert ring.acquire_write(16) == -1
+    ring.release(held)
+    assert ring.acquire_write(16) == held
+
+
+def test_slot_grows_for_larger_frames():
+    ring = FrameRing(2)
+    slot = ring.acquire_write(8)
+    small = ring._bufs[slot]
+    ring.abort_write(slot)
+    slot = ring.acquire_write(64)
+    assert ring._bufs[slot].nbytes >= 64 and ring._bufs[slot] is not small
+    view = ring.writable(slot, (4, 8), np.uint16)
+    assert view.dtype == np.uint16 and view.shape == (4, 8)
+
+
+def test_needs_two_slots():
+    with pytest.raises(ValueError):
+        FrameRing(1)
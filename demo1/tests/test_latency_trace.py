@@ -0,0 +1,48 @@
+# This Python file uses the following encoding: utf-8
+import pytest
+
+from camera_worker import CameraWorker
+from latency_trace import LatencyTrace
+from sim import synthetic_camera
+from sim.synthetic_camera import _Feature
+
+
+def _frame(fid, ts, host_t):
+    return {'frame_id': fid, 'timestamp': ts, 'host_t': host_t}
+
+
+def test_fallback_uses_the_camera_tick():
+    tick = [1e-6]  # 1 MHz timestamp clock
+    trace = LatencyTrace(tick=lambda: tick[0])
+    # device t = 2 s, transport 3..5 ms, shown 10 ms after exposure
+    for fid, transport in enumerate((0.005, 0.003, 0.004)):
+        ts = 2_000_000 + fid * 10_000
+        trace.on_frame(None, _frame(fid, ts, 100.0 + ts * 1e-6 + transport))
+    trace.on_shown(_frame(2, 2_020_000, None), t_shown=100.0 + 2.02 + 0.010 + 0.003)
+    assert trace.records[-1][3] == pytest.approx(10.0)
+    assert trace.summary()["clock"] == "min-delay estimate"
+    # another camera ticking in ns: the estimate starts over in its units
+    tick[0] = 1e-9
+    trace.on_frame(None, _frame(3, 5 * 10 ** 9, 50.0))
+    trace.on_shown(_frame(3, 5 * 10 ** 9, None), t_shown=50.002)
+    assert trace.records[-1][3] == pytest.approx(2.0)
+
+
+def test_latched_clock_wins_over_the_estimate():
+    clock = {'scale': 1e-6, 'offset': 10.0, 'method': 'latch'}
+    trace = LatencyTrace(clock=lambda: clock, tick=lambda: 1e-6)
+    trace.on_frame(None, _frame(0, 1_000_000, 5.0))  # would suggest offset 4.0
+    trace.on_shown(_frame(0, 1_000_000, None), t_shown=11.020)
+    assert trace.records[-1][3] == pytest.approx(20.0)
+    assert trace.summary()["clock"] == "latch"
+
+
+def test_tick_frequency_is_read_without_a_latch(qapp):
+    worker = CameraWorker(ring_depth=2)
+    session = worker._session
+    cam = synthetic_camera.Camera("SIM-TICK", dict(synthetic_camera._CONFIG))
+    del cam._features['TimestampLatch'], cam._features['TimestampLatchValue']
+    cam._features['GevTimestampTickFrequency'] = _Feature(cam, 'GevTimestampTickFrequency', 125_000_000)
+    session.cam = cam
+    session._sync_clock()
+    assert worker.tick_s == pytest.approx(8e-9) and worker.clock is None
@@ -0,0 +1,51 @@
+# This Python file uses the following encoding: utf-8
+import numpy as np
+import pytest
+
+from pixel_unpack import payload_size, unpack
+from sim.synthetic_camera import encode
+
+# position of the red pixel in the 2x2 GenICam pattern
+RED_AT = {'BayerRG': (0, 0), 'BayerGR': (0, 1), 'BayerGB': (1, 0), 'BayerBG': (1, 1)}
+
+
+@pytest.mark.parametrize("pattern", sorted(RED_AT))
+def test_bayer_pure_red_uses_red_weight(pattern):
+    h, w = 16, 16
+    mosaic = np.zeros((h, w), np.uint8)
+    r, c = RED_AT[pattern]
+    mosaic[r::2, c::2] = 200
+    gray = unpack(mosaic.reshape(-1), pattern + '8', w, h)
+    # interior pixels: 0.299 * 200 (red), not 0.114 * 200 (blue)
+    assert np.all(np.abs(gray[4:-4, 4:-4].astype(int) - 60) <= 1)
+
+
+def _pack_12packed(values) -> np.ndarray:
+    # GigE Vision Mono12Packed, written out per pixel pair: high byte of p0,
+    # low nibbles of p0 | p1 << 4, high byte of p1
+    out = bytearray()
+    vals = [int(v) for v in values]
+    if len(vals) % 2:
+        vals.append(0)
+    for p0, p1 in zip(vals[::2], vals[1::2]):
+        out += bytes((p0 >> 4, (p0 & 0x0F) | ((p1 & 0x0F) << 4), p1 >> 4))
+    return np.frombuffer(bytes(out[:(len(values) * 12 + 7) // 8]), np.uint8)
+
+
+def _image(h, w, bits, seed=0):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 1 << bits, (h, w), dtype=np.uint16)
+    img.flat[:4] = (0, (1 << bits) - 1, 1 << (bits - 1), 1)  # extremes and single bits
+    return img
+
+
+@pytest.mark.parametrize("fmt,bits", [("Mono10p", 10), ("Mono12p", 12), ("Mono12Packed", 12)])
+@pytest.mark.parametrize("h,w", [(4, 8), (3, 5), (1, 7), (17, 31)])  # odd sizes end mid-group
+def test_packed_formats_round_trip(fmt, bits, h, w):
+    img = _image(h, w, bits, seed=h * w)
+    raw = _pack_12packed(img.ravel()) if fmt == "Mono12Packed" else encode(img, fmt)
+    assert raw.size == payload_size(fmt, w, h)
+    got = unpack(raw, fmt, w, h)
+    assert got.dtype == np.uint16 and np.array_equal(got, img)
+    out = np.full((h, w), 0xFFFF, np.uint16)
+    assert unpack(raw, fmt, w, h, out=out) is out and np.array_equal(out, img)
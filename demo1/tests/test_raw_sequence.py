@@ -0,0 +1,73 @@
+# This Python file uses the following encoding: utf-8
+import numpy as np
+import pytest
+
+from raw_sequence import HEADER_SIZE, INDEX_DTYPE, RawSequence, RawSequenceWriter
+
+
+def _frames(n, shape=(6, 10), dtype=np.uint16):
+    base = np.arange(np.prod(shape)).reshape(shape)
+    return [((base * (i + 1)) % np.iinfo(dtype).max).astype(dtype) for i in range(n)]
+
+
+def _write(path, frames, close=True, **kw):
+    w = RawSequenceWriter(str(path), frames[0].shape, frames[0].dtype, **kw)
+    for i, img in enumerate(frames):
+        w.append(img, frame_id=100 + i, timestamp=10 ** 9 * i, host_time=1.5 * i,
+                 exposure_us=1000.0 + i, gain_db=0.5, channel=i % 3, objective=1)
+    if close:
+        w.close()
+    else:
+        w._f.flush()
+    return w
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "a.rawseq"
+    frames = _frames(300)  # more than the initial index capacity
+    _write(path, frames, bits=12, metadata={"channels": ["DAPI", "绿"]})
+    seq = RawSequence(str(path))
+    assert seq.shape == (6, 10) and seq.dtype == np.dtype("<u2") and seq.bits == 12
+    assert seq.metadata == {"channels": ["DAPI", "绿"]}
+    assert len(seq) == 300 and isinstance(seq.frames, np.memmap)
+    assert np.array_equal(seq[0], frames[0]) and np.array_equal(seq[299], frames[299])
+    assert np.array_equal(seq.frames[10:13], np.stack(frames[10:13]))
+    assert seq.index.dtype == INDEX_DTYPE and isinstance(seq.index, np.memmap)
+    assert list(seq.index["frame_id"][:3]) == [100, 101, 102]
+    assert seq.record(7) == {"frame_id": 107, "timestamp": 7 * 10 ** 9, "host_time": 10.5,
+                             "exposure_us": 1007.0, "gain_db": 0.5, "channel": 1, "objective": 1}
+    size = HEADER_SIZE + 300 * 6 * 10 * 2 + 300 * INDEX_DTYPE.itemsize
+    assert path.stat().st_size == size
+
+
+def test_empty_sequence(tmp_path):
+    path = tmp_path / "e.rawseq"
+    RawSequenceWriter(str(path), (4, 4), np.uint8).close()
+    seq = RawSequence(str(path))
+    assert len(seq) == 0 and seq.frames.shape == (0, 4, 4) and len(seq.index) == 0 and seq.record(0) == {}
+
+
+def test_unfinished_file_keeps_complete_frames(tmp_path):
+    path = tmp_path / "u.rawseq"
+    frames = _frames(5, dtype=np.uint8)
+    writer = _write(path, frames, close=False)
+    seq = RawSequence(str(path))  # writer still open: no index yet
+    assert len(seq) == 5 and len(seq.index) == 0 and seq.record(0) == {}
+    assert np.array_equal(seq[4], frames[4])
+    del seq
+    writer._f.close()
+    # a half-written last frame is ignored
+    with open(path, "r+b") as f:
+        f.truncate(HEADER_SIZE + 4 * 60 + 17)
+    seq = RawSequence(str(path))
+    assert len(seq) == 4 and np.array_equal(seq[3], frames[3])
+
+
+def test_rejects_other_files_and_shapes(tmp_path):
+    bad = tmp_path / "bad.rawseq"
+    bad.write_bytes(b"not a sequence")
+    with pytest.raises(ValueError):
+        RawSequence(str(bad))
+    with RawSequenceWriter(str(tmp_path / "s.rawseq"), (4, 4), np.uint8) as w:
+        with pytest.raises(ValueError):
+            w.append(np.zeros((4, 5), np.uint8))
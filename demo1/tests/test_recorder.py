@@ -0,0 +1,15 @@
+# This Python file uses the following encoding: utf-8
+import numpy as np
+
+from recorder import FrameRecorder
+
+
+def test_pool_is_bounded_in_bytes(tmp_path):
+    rec = FrameRecorder(str(tmp_path / "rec"), queue_size=64, max_bytes=10 * 4096)
+    rec._running = True  # offer() only; the writer thread is not started
+    frame = np.zeros((64, 64), np.uint8)
+    meta = {'fmt': 'Mono8', 'w': 64, 'h': 64}
+    accepted = sum(rec.offer(frame, meta) for _ in range(64))
+    assert accepted == 10
+    assert rec.dropped == 54
+    assert rec.stats()["pool_mb"] <= 10 * 4096 / 1e6
@@ -0,0 +1,199 @@
+# This Python file uses the following encoding: utf-8
+import sys
+import time
+
+import pytest
+
+from serial_link import DeviceError, LineParser, SerialLink, _Command, parse_reply
+
+needs_pty = pytest.mark.skipif(sys.platform == "win32", reason="simulator needs a pty")
+
+
+def _wait(qapp, cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.002)
+    return cond()
+
+
+def test_line_parser_reassembles_fragments():
+    parser = LineParser()
+    lines = []
+    for b in b"OK CHAN\r\nTEMP:25.1,":
+        lines += parser.feed(bytes([b]))
+    assert lines == [b"OK CHAN"]
+    assert parser.feed(b"24.9\r") == []
+    assert parser.feed(b"\n\nOK\nER") == [b"TEMP:25.1,24.9", b"", b"OK"]
+    assert parser.feed(b"R:busy\n") == [b"ERR:busy"]
+
+
+def test_line_parser_drops_overlong_garbage():
+    parser = LineParser(max_line=16)
+    assert parser.feed(b"\xff\x00" * 20) == [] and parser.overflows == 1
+    assert parser.feed(b"still garbage") == [] and parser.overflows == 1
+    assert parser.feed(b"...\nOK F\xcfCUS\n") == [b"OK F\xcfCUS"]
+    parser.feed(b"partial")
+    parser.clear()
+    assert parser.feed(b"OK\n") == [b"OK"]
+
+
+@pytest.mark.parametrize("line, expected", [
+    (b"OK", (None, True)),
+    (b"ack\r", (None, True)),
+    (b"ERR:busy", (None, False)),
+    (b"OK CHAN:1", ("CHAN", True)),
+    (b"ERR FOCUS", ("FOCUS", False)),
+    (b"OK 12", (None, True)),
+    (b"CHAN:OK", ("CHAN", True)),
+    (b"MOVE:ERR,limit", ("MOVE", False)),
+    (b"TEMP:25.1,24.9", ("TEMP", None)),
+    (b"25.1", (None, None)),
+    (b"", (None, None)),
+])
+def test_parse_reply(line, expected):
+    assert parse_reply(line) == expected
+
+
+def _outstanding(session, *specs):
+    cmds = []
+    for cid, (data, expect_reply) in enumerate(specs, 1):
+        cmd = _Command(cid, ("#", cid), data, expect_reply, 500)
+        cmd.future.set_running_or_notify_cancel()
+        cmd.t_sent = time.perf_counter()
+        if expect_reply:
+            session._waiting += 1
+        else:
+            cmd.future.set_result(len(data))
+        session._outstanding.append(cmd)
+        cmds.append(cmd)
+    return cmds
+
+
+def test_replies_are_matched_by_kind_then_in_order(qapp):
+    link = SerialLink()  # not started: the session is driven directly, without a port
+    session = link._session
+    replied, unsolicited = [], []
+    link.replied.connect(lambda cid, line: replied.append(cid))
+    link.lineReceived.connect(unsolicited.append)
+    focus, temp, chan, pos = _outstanding(session, (b"FOCUS:5\r\n", False), (b"?TEMP\r\n", True),
+                                          (b"?CHAN\r\n", True), (b"?POS\r\n", True))
+    session._on_line(b"CHAN:2")      # names its command: not the oldest
+    session._on_line(b"OK FOCUS")    # ack of a fire-and-forget command
+    session._on_line(b"25.1,24.9")   # bare data: oldest command waiting for a reply
+    session._on_line(b"ERR:args")    # bare error: the next one
+    session._on_line(b"OK")          # nothing left to answer
+    assert replied == [chan.id, focus.id, temp.id, pos.id] and unsolicited == [b"OK"]
+    assert chan.future.result() == b"CHAN:2" and temp.future.result() == b"25.1,24.9"
+    with pytest.raises(DeviceError):
+        pos.future.result()
+    assert not session._outstanding and session._waiting == 0
+    assert link.latency_stats()["POS"]["errors"] == 1
+
+
+def test_position_commands_are_coalesced(qapp):
+    link = SerialLink()
+    futs = [link.send(b"FOCUS:1\r\n"), link.send(b"MOVE:1,2\r\n"), link.send(b"FOCUS:2\r\n"),
+            link.send(b"CHAN:1\r\n"), link.send(b"CHAN:2\r\n"), link.send(b"?CHAN\r\n"),
+            link.send(b"?CHAN\r\n"), link.send(b"FOCUS:3\r\n", coalesce=False)]
+    assert [f.cancelled() for f in futs] == [True, False, False, True, False, False, False, False]
+    assert link.pending() == 6 and link.coalesced == 2
+    # the newest payload takes the slot of the first request
+    assert [link._take().data for _ in range(6)] == [b"FOCUS:2\r\n", b"MOVE:1,2\r\n", b"CHAN:2\r\n",
+                                                     b"?CHAN\r\n", b"?CHAN\r\n", b"FOCUS:3\r\n"]
+
+
+def test_close_fails_pending_futures(qapp):
+    link = SerialLink()
+    session = link._session
+    fire, reply = _outstanding(session, (b"FOCUS:5\r\n", False), (b"?POS\r\n", True))
+    queued = link.send(b"?TEMP\r\n", expect_reply=True)
+    session.close_port()
+    assert fire.future.result() == len(b"FOCUS:5\r\n")  # already written: stays resolved
+    for fut in (reply.future, queued):
+        with pytest.raises(ConnectionError):
+            fut.result(0)
+    assert link.pending() == 0 and not session._outstanding and session._waiting == 0
+
+
+@pytest.fixture
+def sim():
+    from sim.serial_device import SerialDeviceSimulator
+
+    sim = SerialDeviceSimulator(latency_ms=1.0, seed=1)
+    sim.start()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def link(qapp, sim):
+    link = SerialLink()
+    opened = []
+    link.opened.connect(opened.append)
+    link.open_port(sim.port)
+    assert _wait(qapp, lambda: opened)
+    yield link, sim
+    link.stop()
+
+
+@needs_pty
+def test_commands_sent_before_open_wait_for_the_port(qapp, sim):
+    link = SerialLink()
+    try:
+        futs = [link.send(b"FOCUS:7\r\n"), link.send(b"?FOCUS\r\n", expect_reply=True)]
+        link.open_port(sim.port)
+        assert _wait(qapp, lambda: all(f.done() for f in futs))
+        assert futs[1].result() == b"FOCUS:7"
+        # reopening fails the command awaiting a reply on the old port but keeps the queue
+        sim.move_speed = 1.0  # MOVE:0.3,0.4 is answered after 0.5 s
+        moving = link.send(b"MOVE:0.3,0.4\r\n", expect_reply=True, timeout_ms=2000)
+        queued = link.send(b"?CHAN\r\n", expect_reply=True, timeout_ms=2000)
+        assert _wait(qapp, lambda: sim.stats["commands"] == 3)
+        link.open_port(sim.port)
+        assert _wait(qapp, lambda: queued.done())
+        assert queued.result() == b"CHAN:0"
+        with pytest.raises(ConnectionError):
+            moving.result(0)
+    finally:
+        link.stop()
+
+
+@needs_pty
+def test_failed_open_fails_queued_commands(qapp):
+    link = SerialLink()
+    errors = []
+    link.errorOccurred.connect(errors.append)
+    try:
+        fut = link.send(b"?POS\r\n", expect_reply=True)
+        link.open_port("/dev/no-such-port")
+        assert _wait(qapp, lambda: fut.done() and errors)
+        with pytest.raises(ConnectionError):
+            fut.result()
+        assert not link.is_open and link.pending() == 0
+    finally:
+        link.stop()
+
+
+@needs_pty
+def test_fragmented_replies_resolve_in_order(qapp, link):
+    link, sim = link
+    sim.fragment = True
+    link.max_inflight = 3
+    futs = [link.send(q, expect_reply=True, timeout_ms=2000) for q in (b"?CHAN\r\n", b"?FOCUS\r\n", b"?POS\r\n")]
+    assert _wait(qapp, lambda: all(f.done() for f in futs))
+    assert [f.result() for f in futs] == [b"CHAN:0", b"FOCUS:0", b"POS:0.0000,0.0000"]
+
+
+@needs_pty
+def test_setpoints_to_different_zones_are_not_coalesced(qapp, link):
+    link, sim = link
+    futs = [link.send(b"TEMP:L,50\r\n"), link.send(b"TEMP:R,60\r\n"),
+            link.send(b"HEAT:L,1\r\n"), link.send(b"HEAT:R,1\r\n")]
+    focus = [link.send(f"FOCUS:{i}\r\n".encode()) for i in range(20)]
+    assert _wait(qapp, lambda: all(f.done() for f in futs + focus))
+    assert not any(f.cancelled() for f in futs)
+    assert _wait(qapp, lambda: sim.state["temp_set"] == {"L": 50.0, "R": 60.0})
+    assert sim.state["heat"] == {"L": True, "R": True}
+    assert focus[-1].result() > 0
+    assert _wait(qapp, lambda: sim.state["focus"] == 19)
@@ -0,0 +1,71 @@
+# This Python file uses the following encoding: utf-8
+import json
+import struct
+import sys
+import zlib
+
+import cv2
+import numpy as np
+import pytest
+
+from snapshot import SnapshotService, encode_png, encode_tiff
+
+META = {"bits": 12, "channel": "绿", "frame_id": 42}
+
+
+def _image():
+    return (np.arange(48 * 64, dtype=np.uint16).reshape(48, 64) * 7) % 4096
+
+
+def _chunks(data: bytes):
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos:pos + 4])
+        kind = data[pos + 4:pos + 8]
+        body = data[pos + 8:pos + 8 + length]
+        (crc,) = struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])
+        yield kind, body, crc == zlib.crc32(kind + body)
+        pos += 12 + length
+
+
+def test_png_carries_metadata_in_itxt():
+    img = _image()
+    data = encode_png(img, 3, META)
+    chunks = list(_chunks(data))
+    assert [k for k, _b, _ok in chunks[:2]] == [b"IHDR", b"iTXt"]
+    assert all(ok for _k, _b, ok in chunks)
+    keyword, rest = chunks[1][1].split(b"\x00", 1)
+    assert keyword == b"Description" and rest[:4] == b"\x00\x00\x00\x00"
+    assert json.loads(rest[4:].decode("utf-8")) == META
+    assert np.array_equal(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED), img)
+
+
+def test_png_without_metadata_is_plain():
+    data = encode_png(_image(), 3, None)
+    assert b"iTXt" not in [k for k, _b, _ok in _chunks(data)]
+
+
+def test_tiff_without_tifffile_returns_a_sidecar(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tifffile", None)  # import fails
+    img = _image()
+    data, sidecar = encode_tiff(img, 6, META)
+    assert json.loads(sidecar) == META
+    assert np.array_equal(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED), img)
+    assert encode_tiff(img, 0, None)[1] is None
+
+
+def test_service_creates_folders_and_writes_sidecar(qapp, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "tifffile", None)
+    service = SnapshotService()
+    saved, failed = [], []
+    service.saved.connect(lambda path, _ms: saved.append(path))
+    service.failed.connect(failed.append)
+    base = tmp_path / "acq" / "p0_c1" / "img"
+    path = service.save(_image(), str(base), "tiff", 6, META)
+    assert path == str(base) + ".tif"
+    assert service.wait(5000)
+    qapp.processEvents()
+    assert saved == [path] and not failed and service.pending() == 0
+    assert json.loads((base.parent / "img.json").read_text(encoding="utf-8")) == META
+    assert not list(base.parent.glob("*.part"))
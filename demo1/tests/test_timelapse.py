@@ -0,0 +1,40 @@
+# This Python file uses the following encoding: utf-8
+import time
+
+from timelapse import TimeLapseScheduler
+
+
+def test_failing_trigger_is_missed_and_series_continues(qapp):
+    calls, errors = [], []
+
+    def trigger(index):
+        calls.append(index)
+        if index == 0:
+            raise RuntimeError("no frame")
+        return index != 1  # slot 1: round could not start
+
+    tl = TimeLapseScheduler(trigger)
+    tl.error.connect(errors.append)
+    tl.start(interval_s=0.01, count=3)
+    deadline = time.monotonic() + 2.0
+    while tl.running and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.002)
+    assert not tl.running
+    assert calls == [0, 1, 2]
+    assert [r["missed"] for r in tl.records] == [True, True, False]
+    assert tl.missed == 2 and len(errors) == 1
+
+
+def test_slots_never_fire_early(qapp):
+    fired = []
+    tl = TimeLapseScheduler(lambda index: fired.append(time.monotonic()))
+    tl.start(interval_s=0.0137, count=25)  # not a whole number of ms
+    deadline = time.monotonic() + 5.0
+    while tl.running and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.0005)
+    assert not tl.running and len(fired) == 25 - tl.missed
+    late = [r["late_ms"] for r in tl.records if not r["missed"]]
+    assert late and min(late) >= 0.0
+    assert all(t >= tl.planned(r["index"]) for t, r in zip(fired, (r for r in tl.records if not r["missed"])))
@@ -0,0 +1,54 @@
+# This Python file uses the following encoding: utf-8
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PySide6.QtOpenGLWidgets")
+
+from widgets.video_surface import GLVideoSurface  # noqa: E402
+
+
+@pytest.fixture
+def surface(qapp):
+    # Needs a GL context, e.g. Xvfb + LIBGL_ALWAYS_SOFTWARE=1 (Mesa llvmpipe);
+    # the offscreen platform has none, and the test is skipped there
+    s = GLVideoSurface()
+    s.resize(64, 48)
+    failures = []
+    s.failed.connect(failures.append)
+    s.show()
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline and not failures and not s.isValid():
+        qapp.processEvents()
+        time.sleep(0.01)
+    qapp.processEvents()
+    if failures or not s.isValid():
+        s.close()
+        pytest.skip(f"no OpenGL context: {failures[0] if failures else 'invalid'}")
+    yield s
+    s.close()
+
+
+def _center(surface, arr) -> tuple[int, int, int]:
+    surface.set_frame(arr)
+    img = surface.grabFramebuffer()
+    r, g, b, _a = img.pixelColor(img.width() // 2, img.height() // 2).getRgb()
+    return r, g, b
+
+
+def test_renders_frame_through_window_lut_and_tint(surface):
+    frame = np.full((48, 64), 200, np.uint8)
+    assert _center(surface, frame) == pytest.approx((200, 200, 200), abs=2)
+
+    surface.set_lut(255 - np.arange(256, dtype=np.uint8))
+    assert _center(surface, frame) == pytest.approx((55, 55, 55), abs=2)
+    surface.set_lut(None)
+
+    surface.set_window(0.0, 0.5)  # 200/255 is past the window top
+    assert _center(surface, frame) == pytest.approx((255, 255, 255), abs=2)
+    surface.set_window(0.0, 1.0)
+
+    surface.set_tint((255, 0, 0))
+    assert _center(surface, frame) == pytest.approx((200, 0, 0), abs=2)
+    assert surface.ok
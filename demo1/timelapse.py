@@ -0,0 +1,134 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import csv
+import math
+import time
+
+from PySide6.QtCore import QObject, Qt, QTimer, Signal
+
+
+class TimeLapseScheduler(QObject):
+    """
+    Fires capture rounds at t0 + k * interval on the monotonic clock.
+    Every slot is planned from t0 (never from the previous firing), so timer
+    jitter and slow rounds do not accumulate into drift. A slot is missed when
+    the previous round is still busy at its planned time or when the event
+    loop was blocked past the following slot; missed slots are counted, not
+    made up later.
+
+    - trigger(index)  starts round index (0-based); must return quickly.
+                      Returning False or raising counts the slot as missed
+                      (reported through error); the series goes on.
+    - busy()          True while the previous round is still capturing
+    records holds one dict per slot: index, planned_s, actual_s, late_ms,
+    missed (times relative to start).
+    """
+
+    roundTriggered = Signal(int, float)  # slot index, lateness in ms
+    slotMissed = Signal(int)             # slot index
+    error = Signal(str)
+    finished = Signal()
+
+    def __init__(self, trigger, busy=None, parent=None):
+        super().__init__(parent)
+        self._trigger = trigger
+        self._busy = busy or (lambda: False)
+        self.interval_s = 60.0
+        self.count = 10
+        self.records: list[dict] = []
+        self.missed = 0
+        self.running = False
+        self._t0 = 0.0
+        self._next = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_timer)
+
+    def start(self, interval_s: float | None = None, count: int | None = None):
+        if interval_s is not None:
+            self.interval_s = max(0.001, float(interval_s))
+        if count is not None:
+            self.count = max(1, int(count))
+        self.records = []
+        self.missed = 0
+        self._next = 0
+        self._t0 = time.monotonic()
+        self.running = True
+        self._on_timer()  # slot 0 fires right away
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._timer.stop()
+        self.finished.emit()
+
+    def planned(self, index: int) -> float:
+        """Planned monotonic time of a slot."""
+        return self._t0 + index * self.interval_s
+
+    def lateness_stats(self) -> dict:
+        late = [r['late_ms'] for r in self.records if not r['missed']]
+        if not late:
+            return {"rounds": 0, "missed": self.missed, "late_mean_ms": 0.0, "late_max_ms": 0.0}
+        return {
+            "rounds": len(late),
+            "missed": self.missed,
+            "late_mean_ms": sum(late) / len(late),
+            "late_max_ms": max(late),
+        }
+
+    def save_log(self, path: str):
+        """Write the planned vs actual times of every slot as CSV."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=["index", "planned_s", "actual_s", "late_ms", "missed"])
+            w.writeheader()
+            w.writerows(self.records)
+
+    def _on_timer(self):
+        if not self.running:
+            return
+        now = time.monotonic()
+        if now < self.planned(self._next):
+            self._arm()  # woke up early (timer and monotonic clocks differ slightly)
+            return
+        # slots whose successor is already due were lost (event loop blocked)
+        while self._next + 1 < self.count and self.planned(self._next + 1) <= now:
+            self._record(self._next, None)
+            self._next += 1
+        index = self._next
+        if self._busy():
+            self._record(index, None)
+        else:
+            try:
+                started = self._trigger(index) is not False
+            except Exception as e:
+                started = False
+                self.error.emit(f"Slot {index}: {e}")
+            self._record(index, now if started else None)
+        self._next += 1
+        if self._next >= self.count:
+            self.running = False
+            self.finished.emit()
+            return
+        self._arm()
+
+    def _arm(self):
+        # rounded up: the timer has ms resolution and must not fire before the slot
+        delay = self.planned(self._next) - time.monotonic()
+        self._timer.start(max(0, math.ceil(delay * 1000.0)))
+
+    def _record(self, index: int, actual: float | None):
+        planned = self.planned(index) - self._t0
+        if actual is None:
+            self.missed += 1
+            self.records.append({"index": index, "planned_s": planned, "actual_s": None,
+                                 "late_ms": None, "missed": True})
+            self.slotMissed.emit(index)
+            return
+        late_ms = (actual - self.planned(index)) * 1000.0
+        self.records.append({"index": index, "planned_s": planned, "actual_s": actual - self._t0,
+                             "late_ms": late_ms, "missed": False})
+        self.roundTriggered.emit(index, late_ms)
@@ -22,14 +22,13 @@ from PySide6.QtWidgets import (
     QGridLayout,
     QSpacerItem,
 )
-from PySide6.QtGui import QImage, QPixmap, QPainter, QPen, QColor, QFont, QIcon
-from PySide6.QtCore import Qt, QPoint, QRect, QSize, Signal
+from PySide6.QtGui import QPixmap, QPainter, QPen, QColor, QFont, QIcon
+from PySide6.QtCore import Qt, QPoint, QRect, QSize, QTimer, Signal
 from PySide6.QtWidgets import QSplitter, QSizePolicy, QGraphicsDropShadowEffect
 from PySide6.QtWidgets import QWidget as _QW
-from PySide6.QtSerialPort import QSerialPort, QSerialPortInfo
 import numpy as np
-import cv2
 import os
+import time
 
 # Important:
 # You need to run the following command to generate the ui_form.py file
@@ -37,12 +36,21 @@ import os
 #     pyside2-uic form.ui -o ui_form.py
 from ui_form import Ui_Widget
 from camera_worker import CameraWorker
+from frame_processor import FrameProcessor, CHANNEL_TINTS, equalize_lut, to_qimage
+from pixel_unpack import DEFAULT_PREFERENCE, HIGH_DEPTH_PREFERENCE
+from perf_probe import probes
+from latency_trace import LatencyTrace
 from widgets.arrow_buttons import make_arrow_btn
 from widgets.grid_preview import GridPreviewWidget
 from tabs.temp_tab import build_temp_tab
 from tabs.pump_tab import build_pump_tab
 from tabs.misc_tab import build_misc_tab
 from tabs.video_tab import build_video_tab
+from controllers.serial_panel import SerialPanel
+from controllers.snapshot_panel import SnapshotPanel
+from controllers.recording_panel import RecordingPanel
+from controllers.acquisition_panel import AcquisitionPanel
+from controllers.focus_panel import FocusPanel
 
 class JoystickWidget(_QW):
     """A lightweight placeholder joystick. Emits no signals yet; visual only."""
@@ -328,6 +336,25 @@ class Widget(QWidget):
         # Preserve aspect ratio on resize (we draw scaled pixmap in resizeEvent)
         self.image_label.setScaledContents(False)
         self._last_qimage = None
+        # Processing stage (worker ring -> processor -> display ring) and the
+        # display-ring slot currently on screen
+        self.processor = None
+        self._frame_ring = None
+        self._held_slot = None
+        self._last_array = None
+        self._paused_frame = None  # full-depth (array, bits) kept after stop
+        # Latest-frame-wins display: a timer pulls the newest frame at most at
+        # display_max_fps (further capped to the monitor refresh rate)
+        self.display_max_fps = 60.0
+        self._frames_shown = 0
+        self._render_timer = QTimer(self)
+        self._render_timer.setTimerType(Qt.PreciseTimer)
+        self._render_timer.timeout.connect(self._render_tick)
+        self.display_fps_spin = QSpinBox(self)
+        self.display_fps_spin.setRange(1, 240)
+        self.display_fps_spin.setValue(int(self.display_max_fps))
+        self.display_fps_spin.setSuffix(" fps")
+        self.display_fps_spin.setToolTip("实时画面的最高刷新率（不超过显示器刷新率）；不影响采集和录制")
 
         # Controls for exposure/gain/gamma and display enhancement
         self.exposure_auto_cb = QComboBox(self)
@@ -352,6 +379,51 @@ class Widget(QWidget):
         self.enhance_chk = QCheckBox("Enhance Contrast")
         self.enhance_chk.setChecked(True)
         self.enhance_contrast = True
+        self.enhance_mode_cb = QComboBox(self)
+        self.enhance_mode_cb.addItems(["Equalize", "CLAHE"])
+        # Optional OpenGL live view (QLabel stays as the fallback display)
+        self.video_surface = None
+        self._gl_active = False
+        self.gl_chk = QCheckBox("OpenGL")
+        self.gl_chk.setToolTip("使用 OpenGL 显示实时画面（失败时自动回退）")
+        # Sensor-side ROI/binning follows the grid preview viewport
+        self.sensor_roi_chk = QCheckBox("传感器ROI")
+        self.sensor_roi_chk.setToolTip("只传输网格视窗内的像素（相机 ROI + binning）")
+        self._roi_timer = QTimer(self)
+        self._roi_timer.setSingleShot(True)
+        self._roi_timer.setInterval(120)  # debounce drags/nudges
+        self._roi_timer.timeout.connect(self._apply_sensor_roi)
+        # Per-stage timing of the frame path, shown as an overlay on the live view
+        self.perf_chk = QCheckBox("性能叠加")
+        self.perf_chk.setToolTip("显示帧率、延迟、丢帧和各阶段耗时（p95）")
+        self.perf_overlay = QLabel(self)
+        self.perf_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 150); color: #d8dde3; border-radius: 4px;"
+            " padding: 4px 6px; font-family: monospace; font-size: 11px;"
+        )
+        self.perf_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.perf_overlay.hide()
+        self._perf_timer = QTimer(self)
+        self._perf_timer.setInterval(500)
+        self._perf_timer.timeout.connect(self._update_perf_overlay)
+        self._perf_last = None  # (perf_counter, shown, processed, published) at the previous update
+        # Glass-to-glass latency / missing frames from the camera timestamps
+        self.latency_trace = LatencyTrace(clock=lambda: self.worker.clock if self.worker is not None else None,
+                                          tick=lambda: self.worker.tick_s if self.worker is not None else 1e-9)
+        self.latency_export_btn = QPushButton("导出延迟")
+        self.latency_export_btn.setToolTip("导出玻璃到玻璃延迟直方图、丢帧记录（JSON）和逐帧数据（CSV）")
+        # Bit depth of the acquisition and display window/level (full depth is kept for saving)
+        self.bit_depth_cb = QComboBox(self)
+        self.bit_depth_cb.addItems(["8 bit", "高位深"])
+        self.bit_depth_cb.setToolTip("高位深: Mono12/Mono16 采集，显示时按窗宽映射到 8 bit")
+        self.window_auto_chk = QCheckBox("自动窗宽")
+        self.window_lo_spin = QSpinBox(self)
+        self.window_lo_spin.setRange(0, 99)
+        self.window_lo_spin.setSuffix(" %")
+        self.window_hi_spin = QSpinBox(self)
+        self.window_hi_spin.setRange(1, 100)
+        self.window_hi_spin.setValue(100)
+        self.window_hi_spin.setSuffix(" %")
 
         # Wire local UI state (spin <-> slider)
         self.exposure_slider.valueChanged.connect(self.exposure_spin.setValue)
@@ -375,6 +447,7 @@ class Widget(QWidget):
         left_box.setContentsMargins(0, 0, 0, 0)
         left_box.setSpacing(8)
         left_box.addWidget(self.image_label, 1)
+        self._video_box = left_box
         self.splitter.addWidget(left_container)
 
         # Right: tabs container (fixed width)
@@ -408,10 +481,20 @@ class Widget(QWidget):
         self.obj_buttons = video_refs.get("obj_buttons", [])
         self.channel_group = video_refs.get("channel_group")
         self.channel_buttons = video_refs.get("channel_buttons", [])
+        self.capture_btn = video_refs.get("capture_btn")
+        self.save_image_btn = video_refs.get("save_image_btn")
+        # Feature controllers; each owns its engine, handlers and rows of the 其他设置 tab
+        # Serial I/O runs in its own thread; commands are queued, never awaited here
+        self.serial_panel = SerialPanel(self, self.s)
+        self.snapshot_panel = SnapshotPanel(self, self.capture_btn, self.s)
+        self.recording_panel = RecordingPanel(self, self.save_image_btn, self.s)
+        self.acquisition_panel = AcquisitionPanel(self, video_refs, self.snapshot_panel, self.serial_panel.send, self.s)
+        self.focus_panel = FocusPanel(self, video_refs, self.serial_panel.send, self.s)
 
         # Wire channel buttons to send serial messages
         for i, btn in enumerate(self.channel_buttons):
             btn.clicked.connect(lambda _checked=False, i=i: self._on_channel_button_clicked(i))
+        self.obj_group.buttonClicked.connect(lambda _b: self.recording_panel.update_context())
 
         # Tab 1 UI content is provided by build_video_tab(); subsections removed from here
 
@@ -460,41 +543,16 @@ class Widget(QWidget):
         device_layout.addLayout(row_cam)
 
         # Row B: Serial controls
-        self.serial = QSerialPort(self)
-        self.serial.setBaudRate(115200)
-        self.serial.setDataBits(QSerialPort.Data8)
-        self.serial.setParity(QSerialPort.NoParity)
-        self.serial.setStopBits(QSerialPort.OneStop)
-        self.serial.setFlowControl(QSerialPort.NoFlowControl)
-        self.serial.errorOccurred.connect(lambda _e: None)
-        self._serial_signals_wired = False
-        self.port_cb = QComboBox(self)
-        self.port_refresh_btn = QPushButton("刷新", self)
-        self.port_toggle_btn = QPushButton("连接", self)
-        self.port_toggle_btn.setCheckable(True)
-        self.port_status_lbl = QLabel("未连接", self)
-        self.port_status_lbl.setStyleSheet("color:#9aa1a9;")
-        self.port_refresh_btn.clicked.connect(self._refresh_serial_ports)
-        self.port_toggle_btn.toggled.connect(self._on_serial_toggle)
-        row_serial = QHBoxLayout()
-        row_serial.setContentsMargins(0, 0, 0, 0)
-        row_serial.setSpacing(self.s(10))
-        row_serial.addWidget(QLabel("串口:"))
-        row_serial.addWidget(self.port_cb, 1)
-        row_serial.addWidget(self.port_refresh_btn)
-        row_serial.addWidget(self.port_toggle_btn)
-        row_serial.addWidget(self.port_status_lbl)
-        device_layout.addLayout(row_serial)
+        device_layout.addLayout(self.serial_panel.row)
 
         # Slightly relaxed control heights for better look
         nice_h = self.s(34)
-        for w in (self.cam_mode_btn, self.port_cb, self.port_refresh_btn, self.port_toggle_btn):
+        for w in (self.cam_mode_btn, self.serial_panel.port_cb, self.serial_panel.refresh_btn, self.serial_panel.toggle_btn):
             w.setMinimumHeight(nice_h)
             w.setMaximumHeight(nice_h)
 
         tab4_layout.addWidget(device_card)
         tab4_layout.addSpacing(self.s(10))
-        self._refresh_serial_ports()
 
         # Exposure controls row
         m1 = QHBoxLayout()
@@ -525,9 +583,50 @@ class Widget(QWidget):
         m3.addWidget(self.gamma_chk)
         m3.addSpacing(12)
         m3.addWidget(self.enhance_chk)
+        m3.addWidget(self.enhance_mode_cb)
+        m3.addSpacing(12)
+        m3.addWidget(self.gl_chk)
+        m3.addSpacing(12)
+        m3.addWidget(self.sensor_roi_chk)
         m3.addStretch(1)
         tab4_layout.addLayout(m3)
 
+        # Bit depth + display window row
+        m_depth = QHBoxLayout()
+        m_depth.setContentsMargins(0, 0, 0, 0)
+        m_depth.setSpacing(self.s(6))
+        m_depth.addWidget(QLabel("位深:"))
+        m_depth.addWidget(self.bit_depth_cb)
+        m_depth.addSpacing(12)
+        m_depth.addWidget(QLabel("显示窗口:"))
+        m_depth.addWidget(self.window_lo_spin)
+        m_depth.addWidget(QLabel("-"))
+        m_depth.addWidget(self.window_hi_spin)
+        m_depth.addWidget(self.window_auto_chk)
+        m_depth.addStretch(1)
+        tab4_layout.addLayout(m_depth)
+
+        # Stream buffers (VmbPy transport) + acquisition statistics
+        self.buffer_count_spin = QSpinBox(self)
+        self.buffer_count_spin.setRange(2, 64)
+        self.buffer_count_spin.setValue(10)
+        self.alloc_mode_cb = QComboBox(self)
+        self.alloc_mode_cb.addItems(["AnnounceFrame", "AllocAndAnnounceFrame"])
+        self.stream_stats_lbl = QLabel("--", self)
+        self.stream_stats_lbl.setStyleSheet("color:#9aa1a9;")
+        m_buf = QHBoxLayout()
+        m_buf.setContentsMargins(0, 0, 0, 0)
+        m_buf.setSpacing(self.s(6))
+        m_buf.addWidget(QLabel("流缓冲:"))
+        m_buf.addWidget(self.buffer_count_spin)
+        m_buf.addWidget(self.alloc_mode_cb)
+        m_buf.addWidget(self.stream_stats_lbl, 1)
+        m_buf.addWidget(QLabel("显示:"))
+        m_buf.addWidget(self.display_fps_spin)
+        m_buf.addWidget(self.perf_chk)
+        m_buf.addWidget(self.latency_export_btn)
+        tab4_layout.addLayout(m_buf)
+
         # Image save path chooser
         self.image_save_dir = os.path.expanduser("~/Pictures")
         self.save_path_edit = QLineEdit(self)
@@ -543,6 +642,13 @@ class Widget(QWidget):
         m_path.addWidget(self.save_path_btn)
         tab4_layout.addLayout(m_path)
 
+        # Recording, snapshot, multi-position/time-lapse and autofocus rows
+        tab4_layout.addLayout(self.recording_panel.row)
+        tab4_layout.addLayout(self.snapshot_panel.row)
+        tab4_layout.addLayout(self.acquisition_panel.acq_row)
+        tab4_layout.addLayout(self.acquisition_panel.tl_row)
+        tab4_layout.addLayout(self.focus_panel.row)
+
         # Place Start/Stop close to previous row
         tab4_layout.addSpacing(self.s(6))
         tab4_layout.addWidget(self.ui.pushButton, 0, Qt.AlignLeft)
@@ -612,6 +718,23 @@ class Widget(QWidget):
         self.gain_spin.valueChanged.connect(self._on_gain_changed)
         self.gamma_chk.toggled.connect(self._on_gamma_toggled)
         self.enhance_chk.toggled.connect(self._on_enhance_toggled)
+        self.enhance_mode_cb.currentTextChanged.connect(lambda _t: self._apply_processing_chain())
+        self.gl_chk.toggled.connect(self._set_gl_display)
+        self.sensor_roi_chk.toggled.connect(lambda _on: self._apply_sensor_roi())
+        self.buffer_count_spin.valueChanged.connect(lambda _v: self._apply_stream_buffers())
+        self.alloc_mode_cb.currentTextChanged.connect(lambda _t: self._apply_stream_buffers())
+        self.bit_depth_cb.currentIndexChanged.connect(lambda _i: self._apply_bit_depth())
+        self.window_lo_spin.valueChanged.connect(lambda _v: self._apply_display_window())
+        self.window_hi_spin.valueChanged.connect(lambda _v: self._apply_display_window())
+        self.window_auto_chk.toggled.connect(lambda _on: self._apply_display_window())
+        self.grid_label.viewportChanged.connect(self._on_grid_viewport_changed)
+        self.display_fps_spin.valueChanged.connect(self.set_display_rate)
+        if os.environ.get("PCR_VIDEO_SURFACE", "").lower() == "gl":
+            self.gl_chk.setChecked(True)
+        self.perf_chk.toggled.connect(self._set_perf_overlay)
+        self.latency_export_btn.clicked.connect(self.export_latency_trace)
+        if os.environ.get("PCR_PERF", "") not in ("", "0"):
+            self.perf_chk.setChecked(True)
 
     def _set_exposure_controls_enabled(self, enabled: bool):
         self.exposure_slider.setEnabled(enabled)
@@ -630,45 +753,345 @@ class Widget(QWidget):
     def start_camera(self):
         if self.worker is not None and self.worker.isRunning():
             return
-        self.worker = CameraWorker()
-        self.worker.frameReady.connect(self.on_frame)
+        self.worker = CameraWorker(
+            buffer_count=self.buffer_count_spin.value(),
+            allocation_mode=self.alloc_mode_cb.currentText(),
+            pixel_format_preference=self._pixel_format_preference(),
+        )
+        self.worker.statsUpdated.connect(self._on_stream_stats)
+        self.processor = FrameProcessor(self.worker.ring)
+        self.worker.frameReady.connect(self.processor.notify, Qt.DirectConnection)
+        self.processor.error.connect(self.stream_stats_lbl.setToolTip)  # frames are skipped, not fatal
+        self.acquisition_panel.attach(self.processor)
+        self.focus_panel.attach(self.processor)
+        self.latency_trace.reset()
+        self.worker.add_frame_tap(self.latency_trace.on_frame)
+        self._apply_processing_chain()
+        self._apply_channel_tint()
+        self._apply_display_window()
+        self._update_processor_viewport()
+        self._release_held_frame()
+        self._frame_ring = self.processor.output
+        self._frames_shown = 0
         self.worker.error.connect(self.on_error)
+        self.worker.tapFailed.connect(self._on_tap_failed)
+        self.worker.reconfigureFailed.connect(self._on_reconfigure_failed)
         self.worker.startedStreaming.connect(lambda: self.ui.pushButton.setText("Stop"))
         self.worker.stoppedStreaming.connect(lambda: self.ui.pushButton.setText("Start"))
         self.streaming = True
         self.ui.pushButton.setText("Starting...")
+        self.processor.start()
         self.worker.start()
+        self._render_timer.start(self._render_interval_ms())
+        self.focus_panel.apply_tracking()
 
         # Apply current UI settings to camera
         self._apply_all_controls_to_worker()
 
     def stop_camera(self):
+        self._render_timer.stop()
+        self.recording_panel.stop()
+        self.acquisition_panel.stop()
+        self.focus_panel.stop()
         if self.worker is not None:
             self.worker.stop()
             self.worker = None
+        if self.processor is not None:
+            self.processor.stop()
+            self._paused_frame = self.processor.native_frame()
+            # Paused: swap the decimated preview for a full-resolution still
+            still = self.processor.still_frame()
+            if still is not None:
+                self._release_held_frame()
+                self._show_array(still)
+            self.processor = None
         self.streaming = False
         self.ui.pushButton.setText("Start")
+        self.update_video_label()
 
-    def on_frame(self, arr: np.ndarray, w: int, h: int, bytes_per_line: int):
-        # arr is already an owned numpy array (Mono8). Optionally enhance contrast.
+    def set_display_rate(self, fps: float):
+        """Change the render cap (frames per second) of the live view."""
+        self.display_max_fps = max(1.0, float(fps))
+        if self._render_timer.isActive():
+            self._render_timer.start(self._render_interval_ms())
+
+    def _render_interval_ms(self) -> int:
+        fps = self.display_max_fps
+        screen = self.screen()
+        if screen is not None and screen.refreshRate() > 0:
+            fps = min(fps, screen.refreshRate())
+        return max(1, int(round(1000.0 / fps)))
+
+    def display_counters(self) -> dict:
+        """Frames published by the worker, processed, shown on screen, dropped, and waiting."""
+        ring = self._frame_ring
+        cam_ring = self.worker.ring if self.worker is not None else None
+        if ring is None or cam_ring is None:
+            return {"published": 0, "processed": 0, "shown": 0, "dropped": 0, "queue_depth": 0}
+        return {
+            "published": cam_ring.published,
+            "processed": ring.published,
+            "shown": self._frames_shown,
+            "dropped": cam_ring.dropped + ring.dropped,
+            "queue_depth": cam_ring.pending() + ring.pending(),
+        }
+
+    def _render_tick(self):
+        # Pull only the newest processed image; it is already sized to the viewport.
+        ring = self._frame_ring
+        if ring is None:
+            return
+        latest = ring.acquire_latest()
+        if latest is None:
+            return
+        slot, _seq, arr = latest
+        meta = ring.meta(slot)
+        self._show_array(arr, meta)
+        self._release_held_frame()
+        self._held_slot = slot  # stays held while on screen
+        self._frames_shown += 1
+        self.latency_trace.on_shown(meta)
+        if probes.enabled:
+            if meta and 'host_time' in meta:
+                # camera callback -> on screen (host clock)
+                probes.add('latency', time.time() - meta['host_time'])
+
+    def _show_array(self, arr: np.ndarray, meta: dict | None = None):
+        """meta: output ring meta of a live frame; None for stills and re-shown frames."""
+        self._last_array = arr  # keeps the buffer behind the image alive
+        if self._gl_active:
+            # Contrast LUT and tint are applied by the shader; live frames bring
+            # their LUT from the processor ('equalize_lut'), one-off stills get it here
+            if meta is not None:
+                lut = meta.get('lut')
+            elif self.enhance_contrast and self.enhance_mode_cb.currentText() == "Equalize":
+                lut = equalize_lut(arr)
+            else:
+                lut = None
+            self.video_surface.set_lut(lut)
+            self.video_surface.set_frame(arr)  # 'paint' is timed in paintGL, around the upload
+            return
+        timed = probes.enabled
+        if timed:
+            t0 = time.perf_counter()
+        self._last_qimage = to_qimage(arr)
+        if timed:
+            t1 = time.perf_counter()
+            probes.add('qimage', t1 - t0)
+        self.update_video_label()
+        if timed:
+            probes.add('paint', time.perf_counter() - t1)
+
+    def _apply_processing_chain(self):
+        if self.processor is None:
+            return
+        chain = ["downscale"]
+        clahe = self.enhance_mode_cb.currentText() == "CLAHE"
+        if self.enhance_contrast:
+            if clahe:
+                chain.append("clahe")
+            else:
+                chain.append("equalize_lut" if self._gl_active else "equalize")
+        if not self._gl_active:
+            chain.append("pseudocolor")
+        self.processor.set_chain(chain)
+
+    def _apply_channel_tint(self):
+        tint = None
+        if self.camera_mode_fluorescence:
+            for b in self.channel_buttons:
+                if b.isChecked():
+                    tint = CHANNEL_TINTS.get(b.text())
+                    break
+        if self.video_surface is not None:
+            self.video_surface.set_tint(tint)
+        if self.processor is not None:
+            self.processor.set_tint(None if self._gl_active else tint)
+
+    def _display_widget(self):
+        return self.video_surface if self._gl_active else self.image_label
+
+    def _update_processor_viewport(self):
+        if self.processor is not None:
+            size = self._display_widget().size()
+            self.processor.set_viewport(size.width(), size.height())
+
+    def _set_gl_display(self, on: bool):
+        if on and self.video_surface is None:
+            try:
+                from widgets.video_surface import GLVideoSurface
+            except ImportError as e:
+                self._on_gl_failed(f"OpenGL support missing: {e}")
+                return
+            self.video_surface = GLVideoSurface(self)
+            self.video_surface.setMinimumSize(self.s(320), self.s(240))
+            self.video_surface.failed.connect(self._on_gl_failed)
+            self._video_box.addWidget(self.video_surface, 1)
+        self._gl_active = bool(on)
+        if self.video_surface is not None:
+            self.video_surface.setVisible(self._gl_active)
+        self.image_label.setVisible(not self._gl_active)
+        self._apply_processing_chain()
+        self._apply_channel_tint()
+        self._update_processor_viewport()
+        if self._last_array is not None and self._last_array.ndim == 2:
+            self._show_array(self._last_array)
+
+    def select_channel(self, idx: int):
+        """Mirror a channel switch made over serial (CHAN: already sent) in the UI."""
+        if 0 <= idx < len(self.channel_buttons):
+            self.channel_buttons[idx].setChecked(True)
+            self._apply_channel_tint()
+            self.recording_panel.update_context()
+
+    def _pixel_format_preference(self):
+        return HIGH_DEPTH_PREFERENCE if self.bit_depth_cb.currentIndex() == 1 else DEFAULT_PREFERENCE
+
+    def _apply_bit_depth(self):
+        if self.worker:
+            self.worker.setPixelFormatPreference.emit(self._pixel_format_preference())
+
+    def _apply_display_window(self):
+        auto = self.window_auto_chk.isChecked()
+        self.window_lo_spin.setEnabled(not auto)
+        self.window_hi_spin.setEnabled(not auto)
+        if self.processor is None:
+            return
+        lo = self.window_lo_spin.value()
+        hi = max(lo + 1, self.window_hi_spin.value())
+        self.processor.set_window(lo / 100.0, hi / 100.0)
+        self.processor.set_auto_window(auto)
+
+    def current_frame(self):
+        """Last acquired frame at full bit depth as (array, bits), or None."""
+        if self.processor is not None:
+            return self.processor.native_frame()
+        return self._paused_frame
+
+    def _apply_stream_buffers(self):
+        if self.worker:
+            self.worker.setStreamBuffers.emit(self.buffer_count_spin.value(), self.alloc_mode_cb.currentText())
+
+    def _on_stream_stats(self, st: dict):
+        self.stream_stats_lbl.setText(
+            f"{st['fps']:.1f} fps  不完整 {st['incomplete']}  丢失 {st['lost']}  丢弃 {st['dropped']}  "
+            f"回调 {st['handler_mean_ms']:.2f}/{st['handler_p95_ms']:.2f} ms"
+        )
+        # Callback busy for most of the frame period: it is the bottleneck
+        self.stream_stats_lbl.setStyleSheet("color:#e0a040;" if st['handler_load'] > 0.8 else "color:#9aa1a9;")
+
+    # --- performance overlay ---
+    _PERF_STAGES = (
+        ('camera', '相机间隔'), ('handler', '回调'), ('decode', '解码'), ('analyze', '分析'),
+        ('equalize', '均衡'), ('equalize_lut', '均衡LUT'), ('clahe', 'CLAHE'), ('downscale', '缩放'), ('pseudocolor', '伪彩'),
+        ('publish', '发布'), ('qimage', 'QImage'), ('paint', '绘制'),
+    )
+
+    def _set_perf_overlay(self, on: bool):
+        probes.enabled = on
+        probes.reset()
+        self._perf_last = None
+        self.perf_overlay.setVisible(on)
+        if on:
+            self._update_perf_overlay()
+            self._perf_timer.start()
+        else:
+            self._perf_timer.stop()
+
+    def _update_perf_overlay(self):
+        now = time.perf_counter()
+        c = self.display_counters()
+        snap = probes.snapshot()
+        stages = snap['stages']
+        lines = []
+        last = self._perf_last
+        self._perf_last = (now, c['shown'], c['processed'], c['published'])
+        if last is not None and now > last[0]:
+            dt = now - last[0]
+            # counters restart with the camera; never show negative rates
+            rate = [max(0, c[k] - last[i]) / dt for i, k in ((1, 'shown'), (2, 'processed'), (3, 'published'))]
+            lines.append(f"显示 {rate[0]:5.1f} fps  处理 {rate[1]:5.1f}  相机 {rate[2]:5.1f}")
+        lat = stages.get('latency')
+        if lat:
+            lines.append(f"延迟 p50 {lat['p50_ms']:.1f}  p95 {lat['p95_ms']:.1f}  max {lat['max_ms']:.1f} ms")
+        g2g = self.latency_trace.summary(last=512).get('glass_to_glass_ms')
+        if g2g:
+            lines.append(f"玻璃到玻璃 p50 {g2g['p50']:.1f}  p95 {g2g['p95']:.1f}  max {g2g['max']:.1f} ms")
+        lost = self.worker.stats.snapshot()['lost'] if self.worker is not None else 0
+        lines.append(f"丢帧 {c['dropped']}  排队 {c['queue_depth']}  丢失 {lost}  缺号 {self.latency_trace.missing}")
+        for key, label in self._PERF_STAGES:
+            st = stages.get(key)
+            if st:
+                lines.append(f"{label:<8}{st['p95_ms']:7.2f} ms")
+        self.perf_overlay.setText("\n".join(lines))
+        self.perf_overlay.adjustSize()
+        area = self._display_widget()
+        self.perf_overlay.move(area.mapTo(self, QPoint(8, 8)))
+        self.perf_overlay.raise_()
+
+    def export_latency_trace(self):
+        """Write the latency histogram / gap log (JSON) and per-frame records (CSV) to the save folder."""
+        if self.latency_trace.shown == 0:
+            self.stream_stats_lbl.setText("没有可导出的延迟数据")
+            return
+        base = os.path.join(self.image_save_dir, time.strftime("latency_%Y%m%d_%H%M%S"))
         try:
-            if self.enhance_contrast:
-                arr = cv2.equalizeHist(arr)
-            qimg = QImage(arr.data, w, h, bytes_per_line, QImage.Format_Grayscale8).copy()
-            self._last_qimage = qimg
-            self.update_video_label()
-        except Exception:
-            qimg = QImage(arr.tobytes(), w, h, w, QImage.Format_Grayscale8).copy()
-            self._last_qimage = qimg
-            self.update_video_label()
+            os.makedirs(self.image_save_dir, exist_ok=True)
+            paths = self.latency_trace.export(base)
+        except OSError as e:
+            self.stream_stats_lbl.setText(f"导出失败: {e}")
+            return
+        g2g = self.latency_trace.summary().get('glass_to_glass_ms', {})
+        self.stream_stats_lbl.setText(
+            f"已导出延迟 p50 {g2g.get('p50', 0):.1f} ms  缺号 {self.latency_trace.missing}: {os.path.basename(paths[0])}"
+        )
+        self.stream_stats_lbl.setToolTip("\n".join(paths))
+
+    def _on_grid_viewport_changed(self, *_rect):
+        if self.sensor_roi_chk.isChecked():
+            self._roi_timer.start()
+
+    def _apply_sensor_roi(self):
+        if not self.worker:
+            return
+        if self.sensor_roi_chk.isChecked():
+            x, y, w, h = self.grid_label.viewport_rect()
+            size = self._display_widget().size()
+            self.worker.setViewportRoi.emit(x, y, w, h, size.width(), size.height())
+        else:
+            # back to the full, unbinned sensor
+            self.worker.setViewportRoi.emit(0.0, 0.0, 1.0, 1.0, 0, 0)
+
+    def _on_gl_failed(self, msg: str):
+        self.gl_chk.blockSignals(True)
+        self.gl_chk.setChecked(False)
+        self.gl_chk.blockSignals(False)
+        self.gl_chk.setToolTip(msg)
+        self._set_gl_display(False)
+
+    def _release_held_frame(self):
+        if self._held_slot is not None and self._frame_ring is not None:
+            self._frame_ring.release(self._held_slot)
+        self._held_slot = None
 
     def on_error(self, msg: str):
         self.image_label.setText(f"Error: {msg}")
         self.stop_camera()
 
+    def _on_tap_failed(self, tap, msg: str):
+        # the worker already removed the tap; the stream keeps running
+        if not self.recording_panel.tap_failed(tap, msg):
+            self.stream_stats_lbl.setToolTip(msg)
+
+    def _on_reconfigure_failed(self, failed: dict):
+        # rejected features (e.g. an ROI outside the sensor); the stream keeps running
+        self.stream_stats_lbl.setToolTip("相机未接受: " + ", ".join(f"{k}={v}" for k, v in failed.items()))
+
     def closeEvent(self, event):
         try:
             self.stop_camera()
+            self.serial_panel.stop()
+            self.snapshot_panel.wait(5000)  # let queued snapshots reach the disk
         finally:
             return super().closeEvent(event)
 
@@ -691,20 +1114,24 @@ class Widget(QWidget):
         else:
             # relax height when normal size
             self.first_row_widget.setMaximumHeight(self.s(240))
+        self._update_processor_viewport()
+        if self.sensor_roi_chk.isChecked():
+            self._roi_timer.start()  # binning depends on the display size
         self.update_video_label()
 
     def update_video_label(self):
-        if self._last_qimage is None:
+        if self._gl_active or self._last_qimage is None:
             return
-        # Scale to fit while preserving aspect ratio and smooth transform
         target = self.image_label.size()
         if target.width() <= 0 or target.height() <= 0:
             return
-        pm = QPixmap.fromImage(self._last_qimage).scaled(
-            target,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation,
-        )
+        pm = QPixmap.fromImage(self._last_qimage)
+        # Live frames are already decimated to the label by the processor; only
+        # a resize in flight needs a quick rescale. Smooth scaling is reserved
+        # for the full-resolution still shown while paused.
+        if self._last_qimage.size().scaled(target, Qt.KeepAspectRatio) != pm.size():
+            mode = Qt.FastTransformation if self.streaming else Qt.SmoothTransformation
+            pm = pm.scaled(target, Qt.KeepAspectRatio, mode)
         self.image_label.setPixmap(pm)
 
     # ----- UI -> Worker handlers -----
@@ -723,6 +1150,9 @@ class Widget(QWidget):
             self.worker.setGain.emit(self.gain_spin.value() / 10.0)
         # Gamma
         self.worker.setGammaEnable.emit(self.gamma_chk.isChecked())
+        # Sensor ROI
+        if self.sensor_roi_chk.isChecked():
+            self._apply_sensor_roi()
 
     def _on_exposure_auto_changed(self, text: str):
         off = (text == "Off")
@@ -754,12 +1184,14 @@ class Widget(QWidget):
 
     def _on_enhance_toggled(self, checked: bool):
         self.enhance_contrast = checked
+        self._apply_processing_chain()
 
     # --- Misc tab handlers ---
     def _on_cam_mode_toggled(self, on: bool):
         # True -> 荧光, False -> 黑白
         self.camera_mode_fluorescence = on
         self.cam_mode_btn.setText("荧光" if on else "黑白")
+        self._apply_channel_tint()
         # If future: notify worker about color mode
         # if self.worker:
         #     self.worker.setColorMode.emit("fluorescence" if on else "mono")
@@ -770,120 +1202,15 @@ class Widget(QWidget):
             self.image_save_dir = d
             self.save_path_edit.setText(d)
 
-    # --- Serial helpers ---
-    def _refresh_serial_ports(self):
-        cur = self.port_cb.currentData() if hasattr(self, 'port_cb') else None
-        self.port_cb.blockSignals(True)
-        try:
-            self.port_cb.clear()
-            for info in QSerialPortInfo.availablePorts():
-                name = info.portName()
-                sysloc = info.systemLocation() or name
-                desc = info.description() or ""
-                label = f"{name}  {desc}" if desc else name
-                # store both info object and props for robust opening
-                self.port_cb.addItem(label, {"name": name, "sysloc": sysloc, "info": info})
-            # try restore selection
-            if cur is not None:
-                # find by sysloc
-                idx = -1
-                for i in range(self.port_cb.count()):
-                    d = self.port_cb.itemData(i)
-                    if isinstance(d, dict) and d.get("sysloc") == cur:
-                        idx = i
-                        break
-                if idx >= 0:
-                    self.port_cb.setCurrentIndex(idx)
-        finally:
-            self.port_cb.blockSignals(False)
-
-    def _on_serial_toggle(self, on: bool):
-        if on:
-            # open
-            data = self.port_cb.currentData()
-            if not data:
-                self.port_toggle_btn.blockSignals(True)
-                self.port_toggle_btn.setChecked(False)
-                self.port_toggle_btn.blockSignals(False)
-                self.port_status_lbl.setText("未选择端口")
-                return
-            if self.serial.isOpen():
-                self.serial.close()
-            # Prefer using QSerialPortInfo when available
-            info = data.get("info") if isinstance(data, dict) else None
-            if info is not None:
-                try:
-                    self.serial.setPort(info)
-                except Exception:
-                    pass
-            # Fallback path
-            sysloc = data.get("sysloc") if isinstance(data, dict) else str(data)
-            name = data.get("name") if isinstance(data, dict) else None
-            target = sysloc or name or ""
-            if not self.serial.isOpen():
-                try:
-                    self.serial.setPortName(target)
-                except Exception:
-                    pass
-            ok = self.serial.open(QSerialPort.ReadWrite)
-            if not ok:
-                self.port_toggle_btn.blockSignals(True)
-                self.port_toggle_btn.setChecked(False)
-                self.port_toggle_btn.blockSignals(False)
-                self.port_toggle_btn.setText("连接")
-                self.port_status_lbl.setText(f"连接失败: {self.serial.errorString()}")
-            else:
-                self.port_toggle_btn.setText("断开")
-                self.port_status_lbl.setText(f"已连接: {name or target}")
-                # Optional: basic readyRead to show data length (silent)
-                # wire signals once
-                if not self._serial_signals_wired:
-                    self.serial.readyRead.connect(self._on_serial_ready_read)
-                    self.serial.bytesWritten.connect(lambda n: self.port_status_lbl.setText(f"已发送 {n}B"))
-                    self._serial_signals_wired = True
-                # Some devices need DTR/RTS asserted
-                try:
-                    self.serial.setDataTerminalReady(True)
-                    self.serial.setRequestToSend(True)
-                except Exception:
-                    pass
-        else:
-            if self.serial.isOpen():
-                self.serial.close()
-            self.port_toggle_btn.setText("连接")
-            self.port_status_lbl.setText("未连接")
-
-    def _send_serial(self, data: bytes):
-        if self.serial and self.serial.isOpen():
-            try:
-                print(f"[SERIAL TX] {data!r}")
-                n = self.serial.write(data)
-                # ensure it is flushed to OS driver
-                self.serial.waitForBytesWritten(100)
-                # update status label briefly
-                disp = data if len(data) < 24 else (data[:21] + b"...")
-                self.port_status_lbl.setText(f"已发送 {n}B: {disp!r}")
-            except Exception:
-                self.port_status_lbl.setText("发送失败")
-        else:
-            self.port_status_lbl.setText("未连接，无法发送")
-
-    def _on_serial_ready_read(self):
-        try:
-            data = bytes(self.serial.readAll())
-            # optional: print to console for now
-            if data:
-                print(f"[SERIAL RX] {data!r}")
-        except Exception:
-            pass
-
     def _on_channel_button_clicked(self, idx: int):
+        self._apply_channel_tint()
+        self.recording_panel.update_context()
         # 构造一个简单串口消息，例如: CHAN:<index>\r\n（多数设备使用 CRLF 结尾）
         try:
             msg = f"CHAN:{idx}\r\n".encode("utf-8")
         except Exception:
             msg = b"CHAN:0\r\n"
-        self._send_serial(msg)
+        self.serial_panel.send(msg)
 
 
 if __name__ == "__main__":
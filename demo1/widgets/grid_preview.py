@@ -1,4 +1,4 @@
-from PySide6.QtCore import Qt, QPoint, QRect, QSize
+from PySide6.QtCore import Qt, QPoint, QRect, QSize, Signal
 from PySide6.QtGui import QPainter, QPen, QColor
 from PySide6.QtWidgets import QWidget
 
@@ -7,7 +7,11 @@ class GridPreviewWidget(QWidget):
     """
     Fine-grid background with a movable inner rectangle (viewport).
     Supports mouse drag, easing pan updates, and nudge(dx, dy).
+    viewportChanged reports the inner rectangle as normalized (x, y, w, h) of
+    the full field, e.g. to drive a sensor ROI.
     """
+    viewportChanged = Signal(float, float, float, float)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMinimumSize(220, 150)
@@ -39,6 +43,25 @@ class GridPreviewWidget(QWidget):
         self._panx = (1 - a) * self._panx + a * tx
         self._pany = (1 - a) * self._pany + a * ty
         self.update()
+        self.viewportChanged.emit(*self.viewport_rect())
+
+    def pan(self) -> tuple[float, float]:
+        """Current pan (normalized [-1, 1]); used as the stored stage position."""
+        return self._panx, self._pany
+
+    def jumpTo(self, x: float, y: float):
+        """Place the viewport at a pan position without easing (e.g. a stored position)."""
+        self._panx = max(-1.0, min(1.0, float(x)))
+        self._pany = max(-1.0, min(1.0, float(y)))
+        self.update()
+        self.viewportChanged.emit(*self.viewport_rect())
+
+    def viewport_rect(self) -> tuple[float, float, float, float]:
+        """Inner viewport as normalized (x, y, w, h) within the full field."""
+        r = self._inner_ratio
+        x = 0.5 + self._panx * (1.0 - r) / 2.0 - r / 2.0
+        y = 0.5 + self._pany * (1.0 - r) / 2.0 - r / 2.0
+        return x, y, r, r
 
     # --- painting ---
     def paintEvent(self, e):
@@ -161,3 +184,4 @@ class GridPreviewWidget(QWidget):
         self._panx = max(-1.0, min(1.0, self._panx + dx))
         self._pany = max(-1.0, min(1.0, self._pany + dy))
         self.update()
+        self.viewportChanged.emit(*self.viewport_rect())
@@ -0,0 +1,275 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import annotations
+
+import time
+
+import numpy as np
+from PySide6.QtCore import QTimer, Signal
+from PySide6.QtGui import QSurfaceFormat
+from PySide6.QtOpenGL import (
+    QOpenGLBuffer,
+    QOpenGLShader,
+    QOpenGLShaderProgram,
+    QOpenGLTexture,
+    QOpenGLVertexArrayObject,
+)
+from PySide6.QtOpenGLWidgets import QOpenGLWidget
+
+from perf_probe import probes
+
+# GL enums not exposed as Python constants
+GL_TEXTURE_2D = 0x0DE1
+GL_UNSIGNED_BYTE = 0x1401
+GL_LUMINANCE = 0x1909
+GL_RED = 0x1903
+GL_R8 = 0x8229
+GL_RGBA = 0x1908
+GL_UNPACK_ALIGNMENT = 0x0CF5
+GL_TRIANGLE_STRIP = 0x0005
+GL_COLOR_BUFFER_BIT = 0x00004000
+GL_FLOAT = 0x1406
+
+# GLSL kept to the 1.10 / ES 2.0 common subset so it also compiles on Mesa
+# llvmpipe (software rendering on headless CI).
+_VERT = """
+attribute vec2 a_pos;
+attribute vec2 a_uv;
+uniform vec2 u_scale;
+varying vec2 v_uv;
+void main() {
+    v_uv = a_uv;
+    gl_Position = vec4(a_pos * u_scale, 0.0, 1.0);
+}
+"""
+
+_FRAG = """
+#ifdef GL_ES
+precision mediump float;
+#endif
+uniform sampler2D u_frame;
+uniform sampler2D u_lut;
+uniform vec2 u_window;
+uniform vec3 u_tint;
+varying vec2 v_uv;
+void main() {
+    float v = texture2D(u_frame, v_uv).r;
+    v = clamp((v - u_window.x) * u_window.y, 0.0, 1.0);
+    v = texture2D(u_lut, vec2(v * (255.0 / 256.0) + 0.5 / 256.0, 0.5)).r;
+    gl_FragColor = vec4(v * u_tint, 1.0);
+}
+"""
+
+# x, y, u, v for a full-screen strip (v flipped: row 0 of the frame is the top)
+_QUAD = np.array([
+    -1.0, -1.0, 0.0, 1.0,
+     1.0, -1.0, 1.0, 1.0,
+    -1.0,  1.0, 0.0, 0.0,
+     1.0,  1.0, 1.0, 0.0,
+], dtype=np.float32)
+
+
+class GLVideoSurface(QOpenGLWidget):
+    """
+    OpenGL live view for Mono8 frames.
+    The frame is uploaded into a persistent single-channel texture (reallocated
+    only when the frame size changes) and the fragment shader applies the
+    contrast window, a 256-entry LUT and the pseudo-colour tint. Scaling to the
+    widget keeps aspect ratio and is done by the GPU sampler.
+    Emits failed(str) if the context or shaders cannot be set up, so the caller
+    can fall back to the QLabel display.
+    Headless CI: run under Xvfb with LIBGL_ALWAYS_SOFTWARE=1 (Mesa llvmpipe).
+    """
+
+    failed = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        fmt = QSurfaceFormat()
+        fmt.setVersion(2, 1)  # compatibility profile; fine for llvmpipe
+        fmt.setSwapInterval(0)  # pacing is done by the render timer
+        self.setFormat(fmt)
+        self.setMinimumSize(64, 48)
+        self._program = None
+        self._vbo = None
+        self._vao = None
+        self._frame_tex = None
+        self._lut_tex = None
+        self._tex_size = (0, 0)
+        self._single_channel = (GL_LUMINANCE, GL_LUMINANCE)
+        self._frame: np.ndarray | None = None
+        self._frame_dirty = False
+        self._lut = np.arange(256, dtype=np.uint8)
+        self._lut_rgba = np.empty((256, 4), dtype=np.uint8)
+        self._lut_dirty = True
+        self._window = (0.0, 1.0)
+        self._tint = (1.0, 1.0, 1.0)
+        self.ok = True
+
+    # --- public API (GUI thread) ---
+    def set_frame(self, arr: np.ndarray):
+        """Queue a Mono8 (h, w) frame for upload on the next paint."""
+        if arr.ndim != 2 or arr.dtype != np.uint8:
+            raise ValueError("GLVideoSurface expects a 2-D uint8 frame")
+        self._frame = arr
+        self._frame_dirty = True
+        self.update()
+
+    def set_lut(self, lut: np.ndarray | None):
+        """256-entry uint8 tone curve (e.g. equalization); None restores identity."""
+        self._lut = np.arange(256, dtype=np.uint8) if lut is None else np.asarray(lut, dtype=np.uint8)
+        self._lut_dirty = True
+        self.update()
+
+    def set_window(self, lo: float, hi: float):
+        """Contrast window in normalized [0, 1] input units."""
+        span = max(1e-6, float(hi) - float(lo))
+        self._window = (float(lo), 1.0 / span)
+        self.update()
+
+    def set_tint(self, rgb: tuple[int, int, int] | None):
+        self._tint = (1.0, 1.0, 1.0) if rgb is None else tuple(c / 255.0 for c in rgb)
+        self.update()
+
+    # --- QOpenGLWidget hooks ---
+    def showEvent(self, e):
+        super().showEvent(e)
+        # Context creation failures never reach initializeGL; check once shown
+        QTimer.singleShot(0, self._check_context)
+
+    def _check_context(self):
+        if self.ok and not self.isValid():
+            self._fail("No valid OpenGL context")
+
+    def initializeGL(self):
+        ctx = self.context()
+        if ctx is None or not ctx.isValid():
+            self._fail("No valid OpenGL context")
+            return
+        fmt = ctx.format()
+        if not ctx.isOpenGLES() and fmt.profile() == QSurfaceFormat.CoreProfile:
+            self._single_channel = (GL_R8, GL_RED)
+        elif ctx.isOpenGLES() and fmt.majorVersion() >= 3:
+            self._single_channel = (GL_R8, GL_RED)
+
+        prog = QOpenGLShaderProgram(self)
+        if not prog.addShaderFromSourceCode(QOpenGLShader.Vertex, _VERT):
+            self._fail(prog.log())
+            return
+        if not prog.addShaderFromSourceCode(QOpenGLShader.Fragment, _FRAG):
+            self._fail(prog.log())
+            return
+        prog.bindAttributeLocation("a_pos", 0)
+        prog.bindAttributeLocation("a_uv", 1)
+        if not prog.link():
+            self._fail(prog.log())
+            return
+        self._program = prog
+
+        self._vao = QOpenGLVertexArrayObject(self)
+        self._vao.create()  # may be unsupported on GL 2.1; attributes are then set per draw
+        self._vbo = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self._vbo.create()
+        self._vbo.bind()
+        self._vbo.allocate(_QUAD.tobytes(), _QUAD.nbytes)
+        if self._vao.isCreated():
+            self._vao.bind()
+            self._set_attributes()
+            self._vao.release()
+        self._vbo.release()
+
+        self._frame_tex = self._make_texture()
+        self._lut_tex = self._make_texture()
+        self._tex_size = (0, 0)
+        self._frame_dirty = self._frame is not None
+        self._lut_dirty = True
+
+    def paintGL(self):
+        f = self.context().functions()
+        f.glClearColor(0.063, 0.071, 0.078, 1.0)  # #101214, matches the label
+        f.glClear(GL_COLOR_BUFFER_BIT)
+        if self._program is None or self._frame is None:
+            return
+        timed = probes.enabled
+        if timed:
+            t0 = time.perf_counter()
+        f.glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        if self._frame_dirty:
+            self._upload_frame(f)
+        if self._lut_dirty:
+            self._upload_lut(f)
+
+        fh, fw = self._frame.shape
+        ww, wh = max(1, self.width()), max(1, self.height())
+        s = min(ww / fw, wh / fh)
+        self._program.bind()
+        self._program.setUniformValue("u_scale", fw * s / ww, fh * s / wh)
+        self._program.setUniformValue("u_window", *self._window)
+        self._program.setUniformValue("u_tint", *self._tint)
+        f.glActiveTexture(0x84C0)  # GL_TEXTURE0
+        self._frame_tex.bind()
+        self._program.setUniformValue1i("u_frame", 0)
+        f.glActiveTexture(0x84C1)  # GL_TEXTURE1
+        self._lut_tex.bind()
+        self._program.setUniformValue1i("u_lut", 1)
+        if self._vao.isCreated():
+            self._vao.bind()
+            f.glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+            self._vao.release()
+        else:
+            self._vbo.bind()
+            self._set_attributes()
+            f.glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+            self._vbo.release()
+        self._program.release()
+        if timed:
+            # texture upload + draw submission (the GPU may still be drawing)
+            probes.add('paint', time.perf_counter() - t0)
+
+    # --- helpers ---
+    def _make_texture(self) -> QOpenGLTexture:
+        tex = QOpenGLTexture(QOpenGLTexture.Target2D)
+        tex.create()
+        tex.bind()
+        tex.setMinificationFilter(QOpenGLTexture.Linear)
+        tex.setMagnificationFilter(QOpenGLTexture.Linear)
+        tex.setWrapMode(QOpenGLTexture.ClampToEdge)
+        tex.release()
+        return tex
+
+    def _set_attributes(self):
+        p = self._program
+        p.enableAttributeArray(0)
+        p.enableAttributeArray(1)
+        p.setAttributeBuffer(0, GL_FLOAT, 0, 2, 16)
+        p.setAttributeBuffer(1, GL_FLOAT, 8, 2, 16)
+
+    def _upload_frame(self, f):
+        arr = self._frame
+        if not arr.flags.c_contiguous:
+            arr = np.ascontiguousarray(arr)
+        h, w = arr.shape
+        internal, fmt = self._single_channel
+        self._frame_tex.bind()
+        if self._tex_size != (w, h):
+            # (re)allocate storage only when the frame size changes
+            f.glTexImage2D(GL_TEXTURE_2D, 0, internal, w, h, 0, fmt, GL_UNSIGNED_BYTE, 0)
+            self._tex_size = (w, h)
+        f.glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, w, h, fmt, GL_UNSIGNED_BYTE, arr.ctypes.data)
+        self._frame_tex.release()
+        self._frame_dirty = False
+
+    def _upload_lut(self, f):
+        self._lut_rgba[:, 0] = self._lut
+        self._lut_rgba[:, 1] = self._lut
+        self._lut_rgba[:, 2] = self._lut
+        self._lut_rgba[:, 3] = 255
+        self._lut_tex.bind()
+        f.glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, 256, 1, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                       self._lut_rgba.ctypes.data)
+        self._lut_tex.release()
+        self._lut_dirty = False
+
+    def _fail(self, msg: str):
+        self.ok = False
+        self._program = None
+        self.failed.emit(f"OpenGL video surface unavailable: {msg}")